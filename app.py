@@ -1,574 +1,71 @@
 from flask import Flask, render_template, request, jsonify
-import ast
-from static.py.js_parser import parse_javascript
-from static.py.cs_parser import parse_csharp
+import os
+import threading
+import zipfile
+from itertools import chain
+from urllib.parse import quote
+from static.py.dispatch import (PARSER_VERSION, ParseError, build_flowchart, detect_extension, dumps, export_source,
+                                index_source, outline_source, parse_source, reparse_source, stream_source)
+from static.py.batch import iter_archive, run_batch
+from static.py.compression import DecompressRequestMiddleware, StreamCompressor, compress, negotiate_encoding
+from static.py.document_store import DocumentStore
+from static.py.export import stream_zip
+from static.py.metrics import (BYTES_BUCKETS, NODES_BUCKETS, NULL_TIMER, SECONDS_BUCKETS, PhaseTimer, Registry,
+                               count_nodes, result_nodes, timed)
+from static.py.result_cache import ResultCache
+from static.py.worker_pool import WorkerError, WorkerPool
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 1 * 1024 * 1024
+app.config['RESULT_CACHE_MAX_BYTES'] = 64 * 1024 * 1024
+app.config['BATCH_MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024
+app.config['BATCH_MAX_FILES'] = 500
+app.config['PARSE_WORKERS'] = os.cpu_count()
+app.config['PARSE_TIMEOUT'] = 10                   # секунд на один файл
+app.config['PARSE_QUEUE_TIMEOUT'] = 30             # сколько ждать свободного обработчика, с (потом 503)
+app.config['PARSE_RETRY_AFTER'] = 5                # Retry-After ответа 503, с
+app.config['PARSE_MAX_RSS'] = 512 * 1024 * 1024    # память процесса-обработчика
+app.config['DOCUMENT_TTL'] = 30 * 60               # сколько хранить исходник для outline-режима, с
+app.config['DOCUMENT_STORE_MAX_BYTES'] = 256 * 1024 * 1024
+app.config['METRICS'] = os.environ.get('FLOWCHART_METRICS', '1') != '0'  # Server-Timing и /metrics
 
-SUPPORTED_EXTENSIONS = {'.py', '.js', '.cs'}
+# Тело запроса можно прислать сжатым (Content-Encoding: gzip); лимит - на распакованное
+app.wsgi_app = DecompressRequestMiddleware(app.wsgi_app, app.config['BATCH_MAX_CONTENT_LENGTH'])
 
+result_cache = ResultCache(app.config['RESULT_CACHE_MAX_BYTES'])
+documents = DocumentStore(app.config['DOCUMENT_TTL'], app.config['DOCUMENT_STORE_MAX_BYTES'])
 
-class FlowchartBuilder:
-    """Строитель блок-схем"""
-    
-    def __init__(self):
-        self.nodes = []
-        self.edges = []
-        self.node_id = 0
-        
-    def add_node(self, node_type, text):
-        """Добавить узел"""
-        node = {
-            'id': self.node_id,
-            'type': node_type,
-            'text': text
-        }
-        self.nodes.append(node)
-        self.node_id += 1
-        return node['id']
-    
-    def add_edge(self, from_id, to_id, label='', branch=''):
-        """Добавить связь"""
-        for edge in self.edges:
-            if edge['from'] == from_id and edge['to'] == to_id:
-                if label and not edge['label']:
-                    edge['label'] = label
-                    edge['branch'] = branch
-                return edge
-        
-        edge = {
-            'from': from_id,
-            'to': to_id,
-            'label': label,
-            'branch': branch
-        }
-        self.edges.append(edge)
-        return edge
-    
-    def build_function(self, node):
-        """Построить блок-схему функции"""
-        start_id = self.add_node('start', f'начало {node.name}()')
-        prev_ids = [start_id]
-        
-        if node.args.args:
-            params = ', '.join([arg.arg for arg in node.args.args])
-            param_id = self.add_node('input', f'Параметры: {params}')
-            self.add_edge(start_id, param_id)
-            prev_ids = [param_id]
-        
-        body = [stmt for stmt in node.body 
-                if not (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant))]
-        
-        last_ids = self.process_body(body, prev_ids)
-        
-        end_id = self.add_node('end', '')
-        for lid in last_ids:
-            if lid is None:
-                continue
-            if isinstance(lid, tuple) and lid[0] == 'no_empty':
-                self.add_edge(lid[1], end_id, 'нет', 'no')
-            elif isinstance(lid, tuple) and lid[0] == 'from_no_branch':
-                self.add_edge(lid[1], end_id, '', 'from_no')
-            elif isinstance(lid, tuple) and lid[0] == 'return':
-                self.add_edge(lid[1], end_id)  # return напрямую к end
-            else:
-                self.add_edge(lid, end_id)
-    
-    def build_class(self, node):
-        """Построить блок-схему класса - от полей веером к методам"""
-        class_id = self.add_node('class_start', node.name)
-        
-        fields = []
-        methods = []
-        
-        for item in node.body:
-            if isinstance(item, ast.FunctionDef):
-                methods.append(item.name)
-                if item.name == '__init__':
-                    for stmt in item.body:
-                        if isinstance(stmt, ast.Assign):
-                            for target in stmt.targets:
-                                if isinstance(target, ast.Attribute) and \
-                                   isinstance(target.value, ast.Name) and \
-                                   target.value.id == 'self':
-                                    fields.append(target.attr)
-            elif isinstance(item, ast.Assign):
-                for target in item.targets:
-                    if isinstance(target, ast.Name):
-                        fields.append(target.id)
-        
-        # Блок полей
-        if fields:
-            fields_text = ', '.join(fields)
-            fields_id = self.add_node('input', f'Поля: {fields_text}')
-            self.add_edge(class_id, fields_id)
-            source_id = fields_id
-        else:
-            source_id = class_id
-        
-        # Все методы соединены от полей ВЕЕРОМ (не линейно!)
-        for i, method_name in enumerate(methods):
-            method_id = self.add_node('method', method_name + '()')
-            # Каждый метод напрямую от source_id с указанием позиции
-            self.add_edge(source_id, method_id, '', f'fan_{i}')
-    
-    def process_body(self, statements, prev_ids):
-        """Обработать список операторов"""
-        current_prev_ids = prev_ids
-        return_ids = []  # Собираем return маркеры
-        
-        for stmt in statements:
-            if isinstance(stmt, (ast.FunctionDef, ast.ClassDef)):
-                continue
-            
-            # Фильтруем return из текущих prev_ids
-            non_return_ids = [p for p in current_prev_ids if not (isinstance(p, tuple) and p[0] == 'return')]
-            new_return_ids = [p for p in current_prev_ids if isinstance(p, tuple) and p[0] == 'return']
-            return_ids.extend(new_return_ids)
-            
-            if non_return_ids:
-                new_prev_ids = self.process_statement(stmt, non_return_ids)
-                current_prev_ids = new_prev_ids
-            else:
-                # Все пути закончились return - не обрабатываем дальше
-                break
-        
-        # Возвращаем все return и текущие выходы
-        return current_prev_ids + return_ids
-    
-    def process_statement(self, stmt, prev_ids):
-        """Обработать один оператор"""
-        
-        # Вспомогательная функция для добавления рёбер с учётом маркеров
-        def add_edges_from_prev(target_id):
-            for pid in prev_ids:
-                if pid is None:
-                    continue
-                if isinstance(pid, tuple) and pid[0] == 'no_empty':
-                    # Это ветка "нет" от условия без else
-                    self.add_edge(pid[1], target_id, 'нет', 'no')
-                elif isinstance(pid, tuple) and pid[0] == 'from_no_branch':
-                    # Это выход из ветки "нет" - рисуем обходной путь
-                    self.add_edge(pid[1], target_id, '', 'from_no')
-                else:
-                    self.add_edge(pid, target_id)
-        
-        if isinstance(stmt, ast.Assign):
-            targets = ', '.join([self.get_name(t) for t in stmt.targets])
-            value = self.get_expr_text(stmt.value)
-            node_id = self.add_node('process', f'{targets} = {value}')
-            add_edges_from_prev(node_id)
-            return [node_id]
-        
-        elif isinstance(stmt, ast.AugAssign):
-            target = self.get_name(stmt.target)
-            op = self.get_op(stmt.op)
-            value = self.get_expr_text(stmt.value)
-            node_id = self.add_node('process', f'{target} {op}= {value}')
-            add_edges_from_prev(node_id)
-            return [node_id]
-        
-        elif isinstance(stmt, ast.Expr):
-            if isinstance(stmt.value, ast.Call):
-                func_name = self.get_name(stmt.value.func)
-                args = ', '.join([self.get_expr_text(arg) for arg in stmt.value.args])
-                
-                if func_name in ['print', 'output']:
-                    node_id = self.add_node('output', f'{func_name}({args})')
-                elif func_name == 'input':
-                    node_id = self.add_node('input', 'Ввод данных')
-                else:
-                    node_id = self.add_node('process', f'{func_name}({args})')
-                    
-                add_edges_from_prev(node_id)
-                return [node_id]
-            return prev_ids
-        
-        elif isinstance(stmt, ast.If):
-            return self.process_if(stmt, prev_ids)
-        
-        elif isinstance(stmt, ast.While):
-            return self.process_while(stmt, prev_ids)
-        
-        elif isinstance(stmt, ast.For):
-            return self.process_for(stmt, prev_ids)
-        
-        elif isinstance(stmt, ast.Try):
-            return self.process_try(stmt, prev_ids)
-        
-        elif isinstance(stmt, ast.Return):
-            if stmt.value:
-                value = self.get_expr_text(stmt.value)
-                node_id = self.add_node('output', f'return {value}')
-            else:
-                node_id = self.add_node('output', 'return')
-            add_edges_from_prev(node_id)
-            return [('return', node_id)]  # Маркер return
-        
-        elif isinstance(stmt, ast.Raise):
-            if stmt.exc:
-                exc_text = self.get_expr_text(stmt.exc)
-                node_id = self.add_node('process', f'raise {exc_text}')
-            else:
-                node_id = self.add_node('process', 'raise')
-            add_edges_from_prev(node_id)
-            return [None]
-        
-        elif isinstance(stmt, ast.Break):
-            node_id = self.add_node('process', 'break')
-            add_edges_from_prev(node_id)
-            return [None]
-        
-        elif isinstance(stmt, ast.Continue):
-            node_id = self.add_node('process', 'continue')
-            add_edges_from_prev(node_id)
-            return [None]
-        
-        elif isinstance(stmt, ast.Pass):
-            return prev_ids
-        
-        return prev_ids
-    
-    def process_if(self, stmt, prev_ids):
-        """IF - ромб, да вниз, нет вправо"""
-        condition = self.get_expr_text(stmt.test)
-        cond_id = self.add_node('condition', condition + '?')
-        
-        for pid in prev_ids:
-            if pid is None:
-                continue
-            if isinstance(pid, tuple) and pid[0] == 'no_empty':
-                self.add_edge(pid[1], cond_id, 'нет', 'no')
-            elif isinstance(pid, tuple) and pid[0] == 'from_no_branch':
-                self.add_edge(pid[1], cond_id, '', 'from_no')
-            elif isinstance(pid, tuple) and pid[0] == 'return':
-                pass  # return не соединяется
-            else:
-                self.add_edge(pid, cond_id)
-        
-        exit_ids = []
-        
-        # Ветка "да"
-        if stmt.body:
-            edge_idx = len(self.edges)
-            yes_ids = self.process_body(stmt.body, [cond_id])
-            
-            for i in range(edge_idx, len(self.edges)):
-                if self.edges[i]['from'] == cond_id and not self.edges[i]['label']:
-                    self.edges[i]['label'] = 'да'
-                    self.edges[i]['branch'] = 'yes'
-                    break
-            
-            # Добавляем выходы из ветки "да"
-            for yid in yes_ids:
-                if yid is not None:
-                    exit_ids.append(yid)
-        
-        # Ветка "нет"
-        if stmt.orelse:
-            edge_idx = len(self.edges)
-            
-            if len(stmt.orelse) == 1 and isinstance(stmt.orelse[0], ast.If):
-                no_ids = self.process_if(stmt.orelse[0], [cond_id])
-            else:
-                no_ids = self.process_body(stmt.orelse, [cond_id])
-            
-            for i in range(edge_idx, len(self.edges)):
-                if self.edges[i]['from'] == cond_id and not self.edges[i]['label']:
-                    self.edges[i]['label'] = 'нет'
-                    self.edges[i]['branch'] = 'no'
-                    break
-            
-            # Когда есть else, выходы из ветки "нет" - обычные (без маркеров)
-            # Они сливаются с выходами из "да" к следующему блоку
-            for nid in no_ids:
-                if nid is not None:
-                    if isinstance(nid, tuple) and nid[0] == 'return':
-                        exit_ids.append(nid)  # return сохраняем
-                    elif isinstance(nid, tuple):
-                        # Передаём маркеры как есть
-                        exit_ids.append(nid)
-                    else:
-                        # Обычный выход - без маркера from_no_branch
-                        exit_ids.append(nid)
-        else:
-            # Нет else - помечаем условие как имеющее "пустую" ветку нет
-            exit_ids.append(('no_empty', cond_id))
-        
-        # Фильтруем exit_ids, но сохраняем кортежи
-        exit_ids = [eid for eid in exit_ids if eid is not None]
-        return exit_ids if exit_ids else [None]
-    
-    def process_while(self, stmt, prev_ids):
-        """WHILE - шестиугольник, обратная связь слева, выход справа"""
-        condition = self.get_expr_text(stmt.test)
-        # Тип loop - будет шестиугольник
-        loop_id = self.add_node('loop', condition)
-        
-        for pid in prev_ids:
-            if pid is None:
-                continue
-            if isinstance(pid, tuple) and pid[0] == 'no_empty':
-                self.add_edge(pid[1], loop_id, 'нет', 'no')
-            elif isinstance(pid, tuple) and pid[0] == 'from_no_branch':
-                self.add_edge(pid[1], loop_id, '', 'from_no')
-            else:
-                self.add_edge(pid, loop_id)
-        
-        if stmt.body:
-            edge_idx = len(self.edges)
-            body_ids = self.process_body(stmt.body, [loop_id])
-            
-            # Вход в тело - "да" вниз
-            for i in range(edge_idx, len(self.edges)):
-                if self.edges[i]['from'] == loop_id and not self.edges[i]['label']:
-                    self.edges[i]['label'] = ''
-                    self.edges[i]['branch'] = 'loop_body'
-                    break
-            
-            # Обратная связь от конца тела к циклу (слева)
-            for bid in body_ids:
-                if bid is None:
-                    continue
-                if isinstance(bid, tuple) and bid[0] == 'no_empty':
-                    # Без метки - просто loop_back
-                    self.add_edge(bid[1], loop_id, '', 'loop_back')
-                elif isinstance(bid, tuple) and bid[0] == 'from_no_branch':
-                    self.add_edge(bid[1], loop_id, '', 'loop_back')
-                elif isinstance(bid, tuple) and bid[0] == 'return':
-                    # return внутри цикла не возвращается к циклу
-                    pass
-                else:
-                    self.add_edge(bid, loop_id, '', 'loop_back')
-        
-        # Выход из цикла будет справа от шестиугольника
-        return [loop_id]  # loop_id как точка выхода (справа)
-    
-    def process_for(self, stmt, prev_ids):
-        """FOR - шестиугольник"""
-        target = self.get_name(stmt.target)
-        iter_val = self.get_expr_text(stmt.iter)
-        
-        # Шестиугольник цикла
-        loop_id = self.add_node('loop', f'для {target} в {iter_val}')
-        
-        for pid in prev_ids:
-            if pid is None:
-                continue
-            if isinstance(pid, tuple) and pid[0] == 'no_empty':
-                self.add_edge(pid[1], loop_id, 'нет', 'no')
-            elif isinstance(pid, tuple) and pid[0] == 'from_no_branch':
-                self.add_edge(pid[1], loop_id, '', 'from_no')
-            else:
-                self.add_edge(pid, loop_id)
-        
-        if stmt.body:
-            edge_idx = len(self.edges)
-            body_ids = self.process_body(stmt.body, [loop_id])
-            
-            for i in range(edge_idx, len(self.edges)):
-                if self.edges[i]['from'] == loop_id and not self.edges[i]['label']:
-                    self.edges[i]['branch'] = 'loop_body'
-                    break
-            
-            for bid in body_ids:
-                if bid is None:
-                    continue
-                if isinstance(bid, tuple) and bid[0] == 'no_empty':
-                    # Без метки - просто loop_back
-                    self.add_edge(bid[1], loop_id, '', 'loop_back')
-                elif isinstance(bid, tuple) and bid[0] == 'from_no_branch':
-                    self.add_edge(bid[1], loop_id, '', 'loop_back')
-                elif isinstance(bid, tuple) and bid[0] == 'return':
-                    # return внутри цикла не возвращается к циклу
-                    pass
-                else:
-                    self.add_edge(bid, loop_id, '', 'loop_back')
-        
-        return [loop_id]
-    
-    def process_try(self, stmt, prev_ids):
-        """TRY/EXCEPT"""
-        try_id = self.add_node('try_start', 'try')
-        
-        for pid in prev_ids:
-            if pid is None:
-                continue
-            if isinstance(pid, tuple) and pid[0] == 'no_empty':
-                self.add_edge(pid[1], try_id, 'нет', 'no')
-            elif isinstance(pid, tuple) and pid[0] == 'from_no_branch':
-                self.add_edge(pid[1], try_id, '', 'from_no')
-            else:
-                self.add_edge(pid, try_id)
-        
-        exit_ids = []
-        
-        if stmt.body:
-            try_body_ids = self.process_body(stmt.body, [try_id])
-            exit_ids.extend(try_body_ids)
-        
-        for handler in stmt.handlers:
-            if handler.type:
-                exc_name = self.get_name(handler.type)
-                if handler.name:
-                    exc_text = f'except {exc_name} as {handler.name}'
-                else:
-                    exc_text = f'except {exc_name}'
-            else:
-                exc_text = 'except'
-            
-            except_id = self.add_node('except', exc_text)
-            self.add_edge(try_id, except_id, 'ошибка', 'exception')
-            
-            if handler.body:
-                except_body_ids = self.process_body(handler.body, [except_id])
-                exit_ids.extend(except_body_ids)
-        
-        if stmt.finalbody:
-            finally_id = self.add_node('finally', 'finally')
-            
-            # Собираем return маркеры отдельно
-            return_markers = []
-            for eid in exit_ids:
-                if eid is None:
-                    continue
-                if isinstance(eid, tuple) and eid[0] == 'return':
-                    # Return идёт в finally, но сохраняем маркер
-                    self.add_edge(eid[1], finally_id)
-                    return_markers.append(eid)
-                elif isinstance(eid, tuple):
-                    self.add_edge(eid[1], finally_id)
-                else:
-                    self.add_edge(eid, finally_id)
-            
-            finally_body_ids = self.process_body(stmt.finalbody, [finally_id])
-            
-            # Если были return в try/except, они должны пройти через finally и потом к end
-            # Возвращаем выходы из finally + return маркеры
-            result = []
-            for fid in finally_body_ids:
-                if fid is not None:
-                    result.append(fid)
-            
-            # Добавляем return маркеры - они уже прошли через finally
-            result.extend(return_markers)
-            
-            return result if result else [None]
-        
-        exit_ids = [eid for eid in exit_ids if eid is not None]
-        return exit_ids if exit_ids else [None]
-    
-    def get_name(self, node):
-        if isinstance(node, ast.Name):
-            return node.id
-        elif isinstance(node, ast.Attribute):
-            return f'{self.get_name(node.value)}.{node.attr}'
-        elif isinstance(node, ast.Subscript):
-            return f'{self.get_name(node.value)}[{self.get_expr_text(node.slice)}]'
-        elif isinstance(node, ast.Tuple):
-            return ', '.join([self.get_name(e) for e in node.elts])
-        return 'var'
-    
-    def get_expr_text(self, node):
-        if isinstance(node, ast.Constant):
-            if isinstance(node.value, str):
-                s = node.value
-                if len(s) > 20:
-                    s = s[:17] + '...'
-                return f'"{s}"'
-            return str(node.value)
-        elif isinstance(node, ast.Name):
-            return node.id
-        elif isinstance(node, ast.BinOp):
-            left = self.get_expr_text(node.left)
-            right = self.get_expr_text(node.right)
-            op = self.get_op(node.op)
-            return f'{left} {op} {right}'
-        elif isinstance(node, ast.UnaryOp):
-            operand = self.get_expr_text(node.operand)
-            op = self.get_unary_op(node.op)
-            return f'{op}{operand}'
-        elif isinstance(node, ast.Compare):
-            left = self.get_expr_text(node.left)
-            parts = [left]
-            for op, comp in zip(node.ops, node.comparators):
-                parts.append(self.get_op(op))
-                parts.append(self.get_expr_text(comp))
-            return ' '.join(parts)
-        elif isinstance(node, ast.BoolOp):
-            op = ' and ' if isinstance(node.op, ast.And) else ' or '
-            values = [self.get_expr_text(v) for v in node.values]
-            return op.join(values)
-        elif isinstance(node, ast.Call):
-            func = self.get_name(node.func)
-            args = ', '.join([self.get_expr_text(arg) for arg in node.args])
-            return f'{func}({args})'
-        elif isinstance(node, ast.List):
-            elements = ', '.join([self.get_expr_text(e) for e in node.elts])
-            return f'[{elements}]'
-        elif isinstance(node, ast.Tuple):
-            elements = ', '.join([self.get_expr_text(e) for e in node.elts])
-            return f'({elements})'
-        elif isinstance(node, ast.Dict):
-            items = []
-            for k, v in zip(node.keys, node.values):
-                if k is not None:
-                    items.append(f'{self.get_expr_text(k)}: {self.get_expr_text(v)}')
-            return '{' + ', '.join(items) + '}'
-        elif isinstance(node, ast.Subscript):
-            return f'{self.get_expr_text(node.value)}[{self.get_expr_text(node.slice)}]'
-        elif isinstance(node, ast.Attribute):
-            return f'{self.get_expr_text(node.value)}.{node.attr}'
-        elif isinstance(node, ast.IfExp):
-            return f'{self.get_expr_text(node.body)} if {self.get_expr_text(node.test)} else {self.get_expr_text(node.orelse)}'
-        elif isinstance(node, ast.ListComp):
-            return '[...]'
-        elif isinstance(node, ast.Slice):
-            lower = self.get_expr_text(node.lower) if node.lower else ''
-            upper = self.get_expr_text(node.upper) if node.upper else ''
-            return f'{lower}:{upper}'
-        elif isinstance(node, ast.JoinedStr):
-            # f-string - собираем части
-            parts = []
-            for val in node.values:
-                if isinstance(val, ast.Constant):
-                    parts.append(str(val.value))
-                elif isinstance(val, ast.FormattedValue):
-                    parts.append('{' + self.get_expr_text(val.value) + '}')
-                else:
-                    parts.append(self.get_expr_text(val))
-            result = ''.join(parts)
-            if len(result) > 25:
-                result = result[:22] + '...'
-            return f'f"{result}"'
-        return 'expr'
-    
-    def get_op(self, op):
-        ops = {
-            ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/',
-            ast.Mod: '%', ast.Pow: '**', ast.FloorDiv: '//',
-            ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=',
-            ast.Gt: '>', ast.GtE: '>=', 
-            ast.And: 'and', ast.Or: 'or',
-            ast.In: 'in', ast.NotIn: 'not in',
-            ast.Is: 'is', ast.IsNot: 'is not',
-        }
-        return ops.get(type(op), '?')
-    
-    def get_unary_op(self, op):
-        ops = {
-            ast.Not: 'not ',
-            ast.UAdd: '+',
-            ast.USub: '-',
-        }
-        return ops.get(type(op), '?')
-    
-    def get_flowchart_data(self):
-        return {
-            'nodes': self.nodes,
-            'edges': self.edges
-        }
+# Метрики для Prometheus; язык - расширение файла без точки
+metrics_registry = Registry()
+request_seconds = metrics_registry.histogram(
+    'flowchart_request_seconds', 'Время обработки запроса', SECONDS_BUCKETS, ('endpoint', 'language'))
+phase_seconds = metrics_registry.histogram(
+    'flowchart_phase_seconds', 'Время фаз обработки запроса', SECONDS_BUCKETS, ('language', 'phase'))
+input_bytes = metrics_registry.histogram(
+    'flowchart_input_bytes', 'Размер загруженного файла', BYTES_BUCKETS, ('language',))
+flowchart_nodes = metrics_registry.histogram(
+    'flowchart_nodes', 'Узлов во всех блок-схемах ответа', NODES_BUCKETS, ('language',))
+errors_total = metrics_registry.counter('flowchart_errors_total', 'Ответы с ошибкой', ('endpoint', 'status'))
+metrics_registry.gauges('flowchart_result_cache', 'Кэш ответов', result_cache.stats)
+metrics_registry.gauges('flowchart_documents', 'Документы outline-режима', lambda: {'count': len(documents)})
+
+parse_pool = None
+parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool():
+    """Пул процессов-обработчиков; сервер запускает его при старте, иначе - первый разбор"""
+    global parse_pool
+    with parse_pool_lock:
+        if parse_pool is None:
+            parse_pool = WorkerPool(
+                app.config['PARSE_WORKERS'],
+                timeout=app.config['PARSE_TIMEOUT'],
+                acquire_timeout=app.config['PARSE_QUEUE_TIMEOUT'],
+                max_rss=app.config['PARSE_MAX_RSS'],
+                preload=('static.py.dispatch',)
+            )
+        return parse_pool
 
 
 @app.route('/')
@@ -578,113 +75,353 @@ def index():
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
+    timer = start_timer()
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'Файл не найден'}), 400
+        with timer.phase('read'):
+            file = request.files.get('file')
         
-        file = request.files['file']
+        if file is None:
+            return error_response('upload', 'Файл не найден', 400)
         
         if file.filename == '':
-            return jsonify({'error': 'Файл не выбран'}), 400
+            return error_response('upload', 'Файл не выбран', 400)
         
         # Определяем расширение файла
-        filename = file.filename.lower()
-        ext = None
-        for e in SUPPORTED_EXTENSIONS:
-            if filename.endswith(e):
-                ext = e
-                break
+        ext = detect_extension(file.filename)
         
         if not ext:
-            return jsonify({'error': 'Разрешены файлы: .py, .js, .cs'}), 400
-
-        code = file.read().decode('utf-8')
-        
-        if len(code) > 1024 * 1024:
-            return jsonify({'error': 'Файл слишком большой'}), 400
-
-        # Парсинг в зависимости от языка
-        if ext == '.py':
-            return parse_python(code)
-        elif ext == '.js':
-            result = parse_javascript(code)
-            return jsonify(result)
-        elif ext == '.cs':
-            result = parse_csharp(code)
-            return jsonify(result)
-        
+            return error_response('upload', 'Разрешены файлы: .py, .js, .cs', 400)
+        
+        with timer.phase('read'):
+            data = file.read()
+        
+        # Вариант ответа: компактный формат, эхо кода, сжатие
+        compact, with_code = wire_options()
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+        variant = f'{int(compact)}{int(with_code)}-{encoding}'
+        
+        if request.values.get('mode') == 'stream':
+            return stream_response(data, ext, compact, with_code, encoding, variant, timer)
+        
+        # Outline-режим: только оглавление, схемы строятся по запросу /flowchart
+        outline = request.values.get('mode') == 'outline'
+        if outline:
+            doc_id = ResultCache.make_key(data, ext, PARSER_VERSION)
+            documents.put(doc_id, data, ext)
+            endpoint, handler, args = 'outline', outline_source, (with_code,)
+            version = f'{PARSER_VERSION}-outline-{variant}'
+        else:
+            endpoint, handler, args = 'upload', parse_source, (compact, with_code)
+            version = f'{PARSER_VERSION}-{variant}'
+        
+        # Повторная загрузка того же файла - отдаём готовый ответ
+        with timer.phase('cache'):
+            cache_key = ResultCache.make_key(data, ext, version)
+            cached = result_cache.get(cache_key)
+        if cached is not None:
+            return finish(encoded_response(cached, encoding), timer, endpoint, ext, data)
+        
+        # Парсинг в отдельном процессе с лимитами времени и памяти (ошибки не кэшируем)
+        try:
+            result = run_parser(timer, handler, data, ext, *args)
+        except (ParseError, WorkerError) as e:
+            return error_response(endpoint, e.message, e.status)
+        
+        if outline:
+            result['doc_id'] = doc_id
+        
+        with timer.phase('serialize'):
+            body = dumps(result)
+        with timer.phase('compress'):
+            body = compress(body, encoding)
+        result_cache.put(cache_key, body)
+        nodes = None if outline else result_nodes(result)
+        return finish(encoded_response(body, encoding), timer, endpoint, ext, data, nodes)
+    
     except Exception as e:
         import traceback
         print(f"Error: {traceback.format_exc()}")
-        return jsonify({'error': f'Ошибка: {str(e)}'}), 500
+        return error_response('upload', f'Ошибка: {str(e)}', 500)
+
+
+def start_timer():
+    """Замер фаз запроса (пустой, если метрики выключены)"""
+    return PhaseTimer() if app.config['METRICS'] else NULL_TIMER
+
+
+def run_parser(timer, func, *args):
+    """Вызов в пуле; с замером фазы процесса-обработчика добавляются к фазам запроса"""
+    pool = get_parse_pool()
+    if timer is NULL_TIMER:
+        return pool.run(func, *args)
+    with timer.phase('worker'):
+        result, phases = pool.run(timed, func, *args)
+    timer.merge(phases)
+    return result
+
+
+def record_metrics(timer, endpoint, ext, data, nodes=None):
+    """Наблюдения запроса в гистограммы /metrics"""
+    language = ext[1:]
+    request_seconds.observe(timer.elapsed(), endpoint, language)
+    for name, seconds in timer.phases.items():
+        phase_seconds.observe(seconds, language, name)
+    input_bytes.observe(len(data), language)
+    if nodes is not None:
+        flowchart_nodes.observe(nodes, language)
+
+
+def finish(response, timer, endpoint, ext, data, nodes=None):
+    """Заголовок Server-Timing и метрики успешного ответа"""
+    if timer is not NULL_TIMER:
+        response.headers['Server-Timing'] = timer.header()
+        record_metrics(timer, endpoint, ext, data, nodes)
+    return response
+
+
+def error_response(endpoint, message, status):
+    """JSON с текстом ошибки; учитывается в flowchart_errors_total"""
+    if app.config['METRICS']:
+        errors_total.inc(endpoint, status)
+    response = jsonify({'error': message})
+    if status == 503:
+        # Все обработчики заняты - запрос не выполнялся, его можно повторить
+        response.headers['Retry-After'] = str(app.config['PARSE_RETRY_AFTER'])
+    return response, status
+
+
+def wire_options():
+    """Параметры format=compact и code=0 запроса: (компактный формат, эхо кода)"""
+    return request.values.get('format') == 'compact', request.values.get('code', '1') != '0'
+
+
+def encoded_response(body, encoding, mimetype='application/json'):
+    """Ответ из готовых (возможно, сжатых) байтов"""
+    response = app.response_class(body, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def stream_response(data, ext, compact, with_code, encoding, variant, timer):
+    """NDJSON: запись на каждую блок-схему, как только она построена, затем код и done"""
+    # Версия для /upload/incremental: её doc_id приходит в записи done
+    doc_id = ResultCache.make_key(data, ext, PARSER_VERSION)
+    documents.put(doc_id, data, ext)
+    
+    cache_key = ResultCache.make_key(data, ext, f'{PARSER_VERSION}-stream-{variant}')
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return finish(encoded_response(cached, encoding, 'application/x-ndjson'), timer, 'stream', ext, data)
+    
+    records = get_parse_pool().stream(stream_source, data, ext, compact, with_code)
+    
+    # Первую запись ждём до ответа: синтаксическая ошибка и лимиты - обычным статусом
+    try:
+        with timer.phase('first'):
+            first = next(records)
+    except (ParseError, WorkerError) as e:
+        return error_response('stream', e.message, e.status)
+    
+    def generate():
+        compressor = StreamCompressor(encoding)
+        chunks = []
+        nodes = 0
+        
+        def emit(record, last=False):
+            chunk = compressor.compress(dumps(record) + b'\n')
+            if last:
+                chunk += compressor.finish()
+            chunks.append(chunk)
+            return chunk
+        
+        try:
+            for record in chain([first], records):
+                if 'flowchart' in record:
+                    nodes += count_nodes(record['flowchart'])
+                yield emit(record)
+        except (ParseError, WorkerError) as e:
+            yield emit({'type': 'error', 'error': e.message, 'status': e.status}, last=True)
+            return
+        except Exception as e:
+            yield emit({'type': 'error', 'error': f'Ошибка: {str(e)}', 'status': 500}, last=True)
+            return
+        
+        yield emit({'type': 'done', 'doc_id': doc_id}, last=True)
+        result_cache.put(cache_key, b''.join(chunks))
+        # Заголовки уже отправлены: в Server-Timing только фазы до первой записи
+        if timer is not NULL_TIMER:
+            record_metrics(timer, 'stream', ext, data, nodes)
+    
+    response = encoded_response(generate(), encoding, 'application/x-ndjson')
+    # Не буферизовать поток на обратном прокси
+    response.headers['X-Accel-Buffering'] = 'no'
+    if timer is not NULL_TIMER:
+        response.headers['Server-Timing'] = timer.header()
+    return response
 
 
-def parse_python(code):
-    """Парсинг Python кода"""
+@app.route('/flowchart/<doc_id>/<path:name>')
+def flowchart(doc_id, name):
+    """Блок-схема одного объявления из документа, загруженного в outline-режиме"""
+    timer = start_timer()
+    document = documents.get(doc_id)
+    if document is None:
+        return error_response('flowchart', 'Документ не найден или устарел, загрузите файл снова', 404)
+    
+    data, ext = document
+    compact, _ = wire_options()
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+    
+    cache_key = ResultCache.make_key(data, f'{ext}\0{name}',
+                                     f'{PARSER_VERSION}-flowchart-{int(compact)}-{encoding}')
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return finish(encoded_response(cached, encoding), timer, 'flowchart', ext, data)
+    
     try:
-        tree = ast.parse(code)
-    except SyntaxError as e:
-        return jsonify({'error': f'Синтаксическая ошибка: строка {e.lineno}'}), 400
+        entry = run_parser(timer, build_flowchart, data, ext, name, compact)
+    except (ParseError, WorkerError) as e:
+        return error_response('flowchart', e.message, e.status)
+    
+    with timer.phase('serialize'):
+        body = dumps(entry)
+    with timer.phase('compress'):
+        body = compress(body, encoding)
+    result_cache.put(cache_key, body)
+    return finish(encoded_response(body, encoding), timer, 'flowchart', ext, data, count_nodes(entry['flowchart']))
 
-    functions = []
-    classes = []
+
+@app.route('/upload/incremental', methods=['POST'])
+def upload_incremental():
+    """Новая версия файла: схемы только для объявлений, изменившихся с версии doc_id"""
+    timer = start_timer()
+    with timer.phase('read'):
+        file = request.files.get('file')
+    if file is None or file.filename == '':
+        return error_response('incremental', 'Файл не найден', 400)
+    
+    ext = detect_extension(file.filename)
+    if not ext:
+        return error_response('incremental', 'Разрешены файлы: .py, .js, .cs', 400)
     
-    for node in tree.body:
-        if isinstance(node, ast.FunctionDef):
-            builder = FlowchartBuilder()
-            builder.build_function(node)
-            functions.append({
-                'name': node.name,
-                'type': 'function',
-                'flowchart': builder.get_flowchart_data()
-            })
-        elif isinstance(node, ast.ClassDef):
-            class_builder = FlowchartBuilder()
-            class_builder.build_class(node)
-            classes.append({
-                'name': node.name,
-                'type': 'class',
-                'flowchart': class_builder.get_flowchart_data()
-            })
-            
-            for item in node.body:
-                if isinstance(item, ast.FunctionDef):
-                    method_builder = FlowchartBuilder()
-                    method_builder.build_function(item)
-                    functions.append({
-                        'name': f'{node.name}.{item.name}',
-                        'type': 'method',
-                        'flowchart': method_builder.get_flowchart_data()
-                    })
+    with timer.phase('read'):
+        data = file.read()
+    compact, _ = wire_options()
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
     
-    main_builder = FlowchartBuilder()
-    main_body = [stmt for stmt in tree.body 
-                 if not isinstance(stmt, (ast.FunctionDef, ast.ClassDef))]
+    # Без прошлой версии (или если она устарела) все объявления считаются добавленными
+    base = request.values.get('doc_id', '')
+    old_index = documents.index(base) if base else None
+    old_document = documents.get(base) if base and old_index is None else None
+    
+    try:
+        # Версия из потока или оглавления хранится без индекса - он строится по её исходнику
+        if old_document is not None:
+            try:
+                old_index = run_parser(timer, index_source, *old_document)
+            except ParseError:
+                pass  # прошлая версия не разбирается - все объявления новые
+        delta = run_parser(timer, reparse_source, data, ext, old_index or {}, compact)
+    except (ParseError, WorkerError) as e:
+        return error_response('incremental', e.message, e.status)
     
-    main_flowchart = {'nodes': [], 'edges': []}
-    if main_body:
-        start_id = main_builder.add_node('start', 'начало main()')
-        last_ids = main_builder.process_body(main_body, [start_id])
-        end_id = main_builder.add_node('end', '')
-        for lid in last_ids:
-            if lid is None:
-                continue
-            if isinstance(lid, tuple) and lid[0] == 'no_empty':
-                main_builder.add_edge(lid[1], end_id, 'нет', 'no')
-            elif isinstance(lid, tuple) and lid[0] == 'from_no_branch':
-                main_builder.add_edge(lid[1], end_id, '', 'from_no')
-            else:
-                main_builder.add_edge(lid, end_id)
-        main_flowchart = main_builder.get_flowchart_data()
-
-    return jsonify({
+    doc_id = ResultCache.make_key(data, ext, PARSER_VERSION)
+    documents.put(doc_id, data, ext, delta.pop('index'))
+    
+    result = {
         'success': True,
-        'main_flowchart': main_flowchart,
-        'functions': functions,
-        'classes': classes,
-        'code': code
-    })
+        'doc_id': doc_id,
+        'base': base if old_index is not None else None,
+        **delta
+    }
+    with timer.phase('serialize'):
+        body = dumps(result)
+    with timer.phase('compress'):
+        body = compress(body, encoding)
+    nodes = sum(count_nodes(e['flowchart']) for e in delta['added'] + delta['changed'])
+    return finish(encoded_response(body, encoding), timer, 'incremental', ext, data, nodes)
+
+
+@app.route('/export', methods=['POST'])
+def export_file():
+    """Все блок-схемы файла в SVG одним zip-архивом; архив отдаётся по мере отрисовки"""
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        return error_response('export', 'Файл не найден', 400)
+    
+    ext = detect_extension(file.filename)
+    if not ext:
+        return error_response('export', 'Разрешены файлы: .py, .js, .cs', 400)
+    
+    files = get_parse_pool().stream(export_source, file.read(), ext)
+    
+    # Первую схему ждём до ответа: синтаксическая ошибка и лимиты - обычным статусом
+    try:
+        first = [next(files)]
+    except StopIteration:
+        first = []
+    except (ParseError, WorkerError) as e:
+        return error_response('export', e.message, e.status)
+    
+    def entries():
+        try:
+            yield from chain(first, files)
+        except (ParseError, WorkerError) as e:
+            # Статус уже отправлен - ошибка остаётся в архиве отдельным файлом
+            yield 'ERROR.txt', e.message.encode('utf-8')
+    
+    response = app.response_class(stream_zip(entries()), mimetype='application/zip')
+    # Имя архива может быть не ASCII - filename* по RFC 6266, как в send_file
+    download_name = f'{os.path.splitext(os.path.basename(file.filename))[0]}_flowcharts.zip'
+    response.headers.set('Content-Disposition', 'attachment',
+                         filename=download_name.encode('ascii', 'replace').decode('ascii'),
+                         **{'filename*': f"UTF-8''{quote(download_name)}"})
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/upload/batch', methods=['POST'])
+def upload_batch():
+    """Много файлов (поле files) или zip-архив - ответ NDJSON, строка на файл"""
+    # Пакет больше одиночного файла - свой лимит на размер запроса
+    request.max_content_length = app.config['BATCH_MAX_CONTENT_LENGTH']
+    
+    uploads = request.files.getlist('files') + request.files.getlist('file')
+    uploads = [f for f in uploads if f.filename]
+    if not uploads:
+        return jsonify({'error': 'Файлы не найдены'}), 400
+    
+    items = []
+    for file in uploads:
+        data = file.read()
+        if not file.filename.lower().endswith('.zip'):
+            items.append((file.filename, data))
+            continue
+        try:
+            items.extend(iter_archive(data))
+        except zipfile.BadZipFile:
+            return jsonify({'error': f'Повреждённый архив: {file.filename}'}), 400
+    
+    if len(items) > app.config['BATCH_MAX_FILES']:
+        return jsonify({'error': f'Слишком много файлов (максимум {app.config["BATCH_MAX_FILES"]})'}), 400
+    
+    lines = run_batch(items, get_parse_pool(), result_cache, f'{PARSER_VERSION}-batch')
+    return app.response_class(lines, mimetype='application/x-ndjson')
+
+
+@app.route('/metrics')
+def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    if not app.config['METRICS']:
+        return jsonify({'error': 'Метрики выключены'}), 404
+    return app.response_class(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
 
 
 if __name__ == '__main__':
+    # Обработчики запускаются и импортируют парсеры до первого запроса. С debug=True Flask
+    # перезапускает скрипт в дочернем процессе (WERKZEUG_RUN_MAIN) - пул нужен только в нём
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_parse_pool()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,75 @@
+"""
+Бенчмарк пакетной обработки: пропускная способность run_batch
+на сотнях файлов при разном числе процессов
+
+Запуск: python -m benchmarks.bench_batch
+"""
+import os
+import time
+
+from static.py.batch import run_batch
+from static.py.result_cache import ResultCache
+from static.py.worker_pool import WorkerPool
+
+FILES = 300
+
+
+def generate_corpus(count):
+    """Смесь файлов Python, JavaScript и C# с ветвлениями и циклами"""
+    items = []
+    for i in range(count):
+        funcs = []
+        kind = i % 3
+        for j in range(20):
+            if kind == 0:
+                funcs.append(f'def f{j}(a, b):\n    for k in range(a):\n'
+                             f'        if k % {j + 2} == 0:\n            b += k\n'
+                             f'        else:\n            b -= 1\n    return b\n')
+            elif kind == 1:
+                funcs.append(f'function f{j}(a, b) {{\n  for (let k = 0; k < a; k++) {{\n'
+                             f'    if (k % {j + 2} === 0) {{ b += k; }} else {{ b--; }}\n  }}\n  return b;\n}}\n')
+            else:
+                funcs.append(f'    public int F{j}(int a, int b) {{\n'
+                             f'        for (int k = 0; k < a; k++) {{\n'
+                             f'            if (k % {j + 2} == 0) {{ b += k; }} else {{ b--; }}\n'
+                             f'        }}\n        return b;\n    }}\n')
+        if kind == 0:
+            items.append((f'task{i}.py', '\n'.join(funcs).encode('utf-8')))
+        elif kind == 1:
+            items.append((f'task{i}.js', '\n'.join(funcs).encode('utf-8')))
+        else:
+            code = f'class Task{i} {{\n' + '\n'.join(funcs) + '}\n'
+            items.append((f'task{i}.cs', code.encode('utf-8')))
+    return items
+
+
+def bench(items, workers):
+    pool = WorkerPool(workers, timeout=60, preload=('static.py.dispatch',))
+    # Прогрев: процессы запускаются и импортируют парсеры до замера
+    while pool.idle.qsize() < workers:
+        time.sleep(0.05)
+    
+    cache = ResultCache(64 * 1024 * 1024)
+    start = time.perf_counter()
+    lines = sum(1 for _ in run_batch(items, pool, cache, 'bench'))
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+    return elapsed, lines
+
+
+def main():
+    items = generate_corpus(FILES)
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+    
+    print(f'run_batch, {len(items)} файлов, ядер: {cores}')
+    base = None
+    for workers in counts:
+        elapsed, lines = bench(items, workers)
+        rate = lines / elapsed
+        base = base or rate
+        print(f'  {workers:>3} процессов  {elapsed * 1000:8.1f} мс  {rate:8.1f} файлов/с  x{rate / base:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Бенчмарк разбора C#: время parse_csharp должно расти линейно
+с числом классов в файле
+
+Запуск: python -m benchmarks.bench_cs_declarations
+"""
+import time
+
+from static.py.cs_parser import parse_csharp
+
+SIZES = [250, 500, 1000, 2000, 4000]
+
+
+def generate_file(classes):
+    """Файл из пространства имён с множеством небольших классов и структур"""
+    lines = ['using System;', 'using System.Collections.Generic;', '', 'namespace Generated', '{']
+    for i in range(classes):
+        kind = 'struct' if i % 5 == 4 else 'class'
+        lines.append(f'    public {kind} Item{i}')
+        lines.append('    {')
+        lines.append(f'        private List<int> values{i} = new List<int>();')
+        lines.append(f'        public int Value {{ get {{ return {i}; }} }}')
+        lines.append(f'        public int Compute(int a)')
+        lines.append('        {')
+        lines.append(f'            if (a > {i}) {{ a = a - {i}; }}')
+        lines.append('            return a;')
+        lines.append('        }')
+        lines.append('    }')
+    lines.append('}')
+    return '\n'.join(lines)
+
+
+def bench_parse(classes):
+    code = generate_file(classes)
+    start = time.perf_counter()
+    result = parse_csharp(code)
+    return time.perf_counter() - start, len(code), len(result['classes'])
+
+
+def main():
+    print('parse_csharp')
+    base = None
+    for n in SIZES:
+        elapsed, size, found = bench_parse(n)
+        per_class = elapsed / max(found, 1) * 1e6
+        base = base or per_class
+        print(f'  {n:>5} классов  {size / 1024:8.1f} КБ  {elapsed * 1000:8.1f} мс  '
+              f'{per_class:7.1f} мкс/класс  x{per_class / base:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Бенчмарк хранилища рёбер: время построения блок-схемы
+для функций из тысяч операторов должно расти линейно
+
+Запуск: python -m benchmarks.bench_edge_store
+"""
+import ast
+import time
+
+from static.py.py_parser import FlowchartBuilder
+from static.py.js_parser import JSFlowchartBuilder
+from static.py.cs_parser import CSharpFlowchartBuilder
+
+SIZES = [1000, 2000, 4000, 8000, 16000]
+
+
+def generate_function(statements):
+    """Функция из чередующихся присваиваний и if/else"""
+    lines = ['def generated(a, b):']
+    for i in range(statements):
+        if i % 4 == 3:
+            lines.append(f'    if a > {i}:')
+            lines.append(f'        a = a - {i}')
+            lines.append('    else:')
+            lines.append(f'        b = b + {i}')
+        else:
+            lines.append(f'    a = a + b * {i}')
+    lines.append('    return a')
+    return ast.parse('\n'.join(lines)).body[0]
+
+
+def bench_python_builder(statements):
+    node = generate_function(statements)
+    start = time.perf_counter()
+    builder = FlowchartBuilder()
+    builder.build_function(node)
+    return time.perf_counter() - start, builder.edge_count
+
+
+def bench_graph(builder_class, statements):
+    """Цепочка рёбер с повторными вставками, как в строителях"""
+    start = time.perf_counter()
+    builder = builder_class()
+    prev = builder.add_node('start', '')
+    for i in range(statements):
+        node = builder.add_node('process', str(i))
+        builder.add_edge(prev, node)
+        builder.add_edge(prev, node, 'да', 'yes')
+        prev = node
+    return time.perf_counter() - start, builder.edge_count
+
+
+def report(title, measure):
+    print(title)
+    base = None
+    for n in SIZES:
+        elapsed, edges = measure(n)
+        per_edge = elapsed / max(edges, 1) * 1e6
+        base = base or per_edge
+        print(f'  {n:>6} операторов  {edges:>6} рёбер  {elapsed * 1000:8.1f} мс  '
+              f'{per_edge:6.2f} мкс/ребро  x{per_edge / base:.2f}')
+
+
+def main():
+    report('FlowchartBuilder.build_function', bench_python_builder)
+    for builder_class in (FlowchartBuilder, JSFlowchartBuilder, CSharpFlowchartBuilder):
+        report(f'{builder_class.__name__}.add_edge',
+               lambda n, cls=builder_class: bench_graph(cls, n))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Бенчмарк парсеров на синтетических файлах: время, пик памяти (tracemalloc),
+число узлов и рёбер; сравнение с сохранённым базовым прогоном
+
+Запуск:  python -m benchmarks.bench_parsers [--quick] [--threshold 0.5] [--repeats 5]
+Новый базовый прогон:  python -m benchmarks.bench_parsers --save
+
+Код выхода 1, если время или память выросли больше порога, изменилось
+число узлов/рёбер (вывод парсера стал другим) или случай стал падать
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import DIMENSIONS, LANGUAGES, generate
+from static.py.cs_parser import parse_csharp
+from static.py.js_parser import parse_javascript
+from static.py.py_parser import parse_python
+
+PARSERS = {
+    'py': parse_python,
+    'js': parse_javascript,
+    'cs': parse_csharp,
+}
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baselines', 'parsers.json')
+
+REPEATS = 5
+MIN_TIME_MS = 2.0  # более быстрые случаи сравниваются по времени с этим запасом - иначе шум
+
+
+def count_graph(result):
+    """Всего узлов и рёбер во всех блок-схемах ответа"""
+    flowcharts = [result['main_flowchart']] + [e['flowchart'] for e in result['functions'] + result['classes']]
+    return sum(len(f['nodes']) for f in flowcharts), sum(len(f['edges']) for f in flowcharts)
+
+
+def measure(parse, code, repeats=REPEATS):
+    """Лучшее время из repeats прогонов и пик памяти отдельным прогоном"""
+    size = len(code.encode('utf-8'))
+    best = None
+    for _ in range(repeats):
+        # Как в timeit: сборщик мусора не вмешивается в замер
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        try:
+            result = parse(code)
+        except (RecursionError, MemoryError, SyntaxError) as e:
+            # Предел парсера - тоже результат: фиксируется, а не обрывает прогон
+            return {'bytes': size, 'error': type(e).__name__}
+        finally:
+            elapsed = time.perf_counter() - start
+            gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+    
+    # tracemalloc замедляет разбор - память меряется отдельно от времени
+    tracemalloc.start()
+    parse(code)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    nodes, edges = count_graph(result)
+    return {
+        'bytes': size,
+        'time_ms': round(best * 1000, 3),
+        'peak_kb': round(peak / 1024, 1),
+        'nodes': nodes,
+        'edges': edges,
+    }
+
+
+def run(quick=False, languages=LANGUAGES, dimensions=tuple(DIMENSIONS), repeats=REPEATS):
+    """Все случаи: {'язык/измерение/значение': метрики}"""
+    results = {}
+    for dimension in dimensions:
+        full, short = DIMENSIONS[dimension]
+        for value in (short if quick else full):
+            for language in languages:
+                code = generate(language, dimension, value)
+                key = f'{language}/{dimension}/{value}'
+                results[key] = measure(PARSERS[language], code, repeats)
+                m = results[key]
+                if 'error' in m:
+                    print(f'  {key:<24} {m["bytes"] / 1024:9.1f} КБ  ошибка: {m["error"]}')
+                    continue
+                print(f'  {key:<24} {m["bytes"] / 1024:9.1f} КБ  {m["time_ms"]:10.2f} мс  '
+                      f'{m["peak_kb"]:10.1f} КБ пик  {m["nodes"]:>7} узлов  {m["edges"]:>7} рёбер')
+                sys.stdout.flush()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Регрессии относительно базового прогона (список строк)"""
+    problems = []
+    for key, m in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        
+        if 'error' in m:
+            if 'error' not in base:
+                problems.append(f'{key}: {m["error"]}, раньше разбирался')
+            continue
+        if 'error' in base:
+            continue  # раньше падал - теперь разбирается, сравнивать не с чем
+        
+        if (m['nodes'], m['edges']) != (base['nodes'], base['edges']):
+            problems.append(f'{key}: узлов/рёбер {m["nodes"]}/{m["edges"]}, '
+                            f'было {base["nodes"]}/{base["edges"]}')
+        
+        limit = max(base['time_ms'], MIN_TIME_MS) * (1 + threshold)
+        if m['time_ms'] > limit:
+            problems.append(f'{key}: время {m["time_ms"]:.2f} мс, было {base["time_ms"]:.2f} мс '
+                            f'(x{m["time_ms"] / max(base["time_ms"], 1e-6):.2f})')
+        
+        if m['peak_kb'] > base['peak_kb'] * (1 + threshold) + 64:
+            problems.append(f'{key}: пик памяти {m["peak_kb"]:.0f} КБ, было {base["peak_kb"]:.0f} КБ')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк парсеров блок-схем')
+    parser.add_argument('--quick', action='store_true', help='только малые размеры')
+    parser.add_argument('--save', action='store_true', help='записать результат как базовый')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='допустимый рост времени и памяти (0.5 = +50%%)')
+    parser.add_argument('--repeats', type=int, default=REPEATS, help='прогонов на случай (берётся лучший)')
+    parser.add_argument('--baseline', default=BASELINE, help='файл базового прогона')
+    parser.add_argument('--language', choices=LANGUAGES, action='append', help='только этот язык')
+    parser.add_argument('--dimension', choices=list(DIMENSIONS), action='append', help='только это измерение')
+    args = parser.parse_args()
+    
+    results = run(args.quick, args.language or LANGUAGES, args.dimension or tuple(DIMENSIONS), args.repeats)
+    
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f).get('results', {})
+        baseline.update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': dict(sorted(baseline.items())),
+            }, f, ensure_ascii=False, indent=1)
+        print(f'Базовый прогон сохранён: {args.baseline}')
+        return 0
+    
+    if not os.path.exists(args.baseline):
+        print('Базового прогона нет - сохраните его флагом --save')
+        return 0
+    
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    
+    problems = compare(results, baseline, args.threshold)
+    if problems:
+        print(f'\nРегрессии (порог +{args.threshold:.0%}):')
+        for line in problems:
+            print('  ' + line)
+        return 1
+    
+    print(f'\nРегрессий нет (порог +{args.threshold:.0%})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Генератор синтетических исходников для бенчмарков парсеров
+Каждое измерение меняет один параметр файла, остальные остаются небольшими
+    
+    generate('py', 'nesting', 32) -> код Python с вложенностью 32
+"""
+
+LANGUAGES = ('py', 'js', 'cs')
+
+# Измерение -> значения для полного прогона и для --quick
+DIMENSIONS = {
+    'size': ([16, 64, 256, 1024], [16, 64]),        # размер файла, КБ
+    'functions': ([10, 100, 500, 2000], [10, 100]),  # число функций
+    'nesting': ([4, 16, 64, 96], [4, 16]),           # глубина вложенных if/for (Python - до 100)
+    'chain': ([100, 1000, 5000, 20000], [100, 1000]),  # операторов подряд в одной функции
+    'switch': ([8, 64, 512, 2048], [8, 64]),         # ветвей switch (if/elif в Python)
+    'literal': ([1, 16, 128, 512], [1, 16]),         # размер строкового литерала, КБ
+}
+
+
+def _indent(lines, level):
+    pad = '    ' * level
+    return [pad + line for line in lines]
+
+
+# Python
+
+def _py_function(i, body):
+    return [f'def f{i}(a, b):'] + _indent(body, 1) + ['']
+
+
+def _py_small_body(i):
+    return [
+        f'total = a + b * {i}',
+        'for k in range(a):',
+        f'    if k % {i % 7 + 2} == 0:',
+        '        total += k',
+        '    else:',
+        '        total -= 1',
+        'print(total)',
+        'return total',
+    ]
+
+
+def _py_nested(depth):
+    lines = []
+    for level in range(depth):
+        head = f'if a > {level}:' if level % 2 == 0 else f'for k{level} in range(b):'
+        lines.append('    ' * level + head)
+    lines.append('    ' * depth + 'a = a - 1')
+    return lines + ['return a']
+
+
+def _py_switch(cases):
+    lines = []
+    for k in range(cases):
+        lines.append(f'{"if" if k == 0 else "elif"} a == {k}:')
+        lines.append(f'    b = b + {k}')
+    lines += ['else:', '    b = 0', 'return b']
+    return lines
+
+
+# JavaScript и C# - общая C-подобная структура тела
+
+def _c_small_body(i, decl):
+    return [
+        f'{decl} total = a + b * {i};',
+        f'for ({decl} k = 0; k < a; k++) {{',
+        f'    if (k % {i % 7 + 2} == 0) {{',
+        '        total += k;',
+        '    } else {',
+        '        total -= 1;',
+        '    }',
+        '}',
+        'return total;',
+    ]
+
+
+def _c_nested(depth, decl):
+    lines = []
+    for level in range(depth):
+        head = f'if (a > {level}) {{' if level % 2 == 0 else f'for ({decl} k{level} = 0; k{level} < b; k{level}++) {{'
+        lines.append('    ' * level + head)
+    lines.append('    ' * depth + 'a = a - 1;')
+    for level in reversed(range(depth)):
+        lines.append('    ' * level + '}')
+    return lines + ['return a;']
+
+
+def _c_switch(cases):
+    lines = ['switch (a) {']
+    for k in range(cases):
+        lines += [f'    case {k}:', f'        b = b + {k};', '        break;']
+    lines += ['    default:', '        b = 0;', '        break;', '}', 'return b;']
+    return lines
+
+
+def _js_function(i, body):
+    return [f'function f{i}(a, b) {{'] + _indent(body, 1) + ['}', '']
+
+
+def _cs_method(i, body):
+    return [f'public int F{i}(int a, int b)', '{'] + _indent(body, 1) + ['}', '']
+
+
+def _cs_file(methods):
+    lines = ['using System;', '', 'namespace Bench', '{', '    public class Generated', '    {']
+    lines += _indent(methods, 2)
+    return '\n'.join(lines + ['    }', '}', ''])
+
+
+LANG = {
+    'py': {
+        'function': _py_function,
+        'small': _py_small_body,
+        'nested': _py_nested,
+        'switch': _py_switch,
+        'assign': lambda k: f'a = a + b * {k}',
+        'literal': lambda text: [f'message = "{text}"', 'print(message)', 'return a'],
+        'file': lambda lines: '\n'.join(lines),
+    },
+    'js': {
+        'function': _js_function,
+        'small': lambda i: _c_small_body(i, 'let'),
+        'nested': lambda depth: _c_nested(depth, 'let'),
+        'switch': _c_switch,
+        'assign': lambda k: f'a = a + b * {k};',
+        'literal': lambda text: [f'const message = "{text}";', 'console.log(message);', 'return a;'],
+        'file': lambda lines: '\n'.join(lines),
+    },
+    'cs': {
+        'function': _cs_method,
+        'small': lambda i: _c_small_body(i, 'int'),
+        'nested': lambda depth: _c_nested(depth, 'int'),
+        'switch': _c_switch,
+        'assign': lambda k: f'a = a + b * {k};',
+        'literal': lambda text: [f'string message = "{text}";', 'Console.WriteLine(message);', 'return a;'],
+        'file': _cs_file,
+    },
+}
+
+
+def generate(language, dimension, value):
+    """Исходник на языке language, где параметр dimension равен value"""
+    lang = LANG[language]
+    function = lang['function']
+    
+    if dimension == 'size':
+        # Небольшие функции, пока файл не дорастёт до value КБ
+        lines = []
+        size = 0
+        i = 0
+        while size < value * 1024:
+            chunk = function(i, lang['small'](i))
+            size += sum(len(line) + 1 for line in chunk)
+            lines += chunk
+            i += 1
+        return lang['file'](lines)
+    
+    if dimension == 'functions':
+        lines = []
+        for i in range(value):
+            lines += function(i, lang['small'](i))
+        return lang['file'](lines)
+    
+    if dimension == 'nesting':
+        return lang['file'](function(0, lang['nested'](value)))
+    
+    if dimension == 'chain':
+        body = [lang['assign'](k) for k in range(value)]
+        return lang['file'](function(0, body + [lang['literal']('')[-1]]))
+    
+    if dimension == 'switch':
+        return lang['file'](function(0, lang['switch'](value)))
+    
+    if dimension == 'literal':
+        text = ('abcdefgh' * (value * 128))[:value * 1024]
+        return lang['file'](function(0, lang['literal'](text)))
+    
+    raise ValueError(f'Неизвестное измерение: {dimension}')
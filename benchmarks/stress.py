@@ -0,0 +1,97 @@
+"""
+Стресс-тест построителей: очень длинные и очень глубокие функции не должны
+упираться в предел рекурсии - ни при разборе, ни при раскладке SVG
+
+Запуск:  python -m benchmarks.stress [--language py] [--no-svg]
+
+Код выхода 1, если какой-то случай упал
+"""
+import argparse
+import sys
+import time
+import traceback
+
+from benchmarks.corpus import LANG, LANGUAGES, generate
+from static.py.cs_parser import parse_csharp
+from static.py.js_parser import parse_javascript
+from static.py.py_parser import parse_python
+from static.py.svg_renderer import render_svg
+
+PARSERS = {
+    'py': parse_python,
+    'js': parse_javascript,
+    'cs': parse_csharp,
+}
+
+# (измерение corpus, значение); в Python отступ ограничен 100 уровнями,
+# поэтому глубину в нём дают цепочка elif и длинное выражение
+CASES = {
+    'py': [('chain', 100000), ('nesting', 96), ('switch', 2000), ('expression', 2000)],
+    'js': [('chain', 100000), ('nesting', 500), ('switch', 2000), ('expression', 2000)],
+    'cs': [('chain', 100000), ('nesting', 500), ('switch', 2000), ('expression', 2000)],
+}
+
+
+def generate_expression(language, terms):
+    """Функция с одним выражением из terms слагаемых - глубокое дерево BinOp"""
+    lang = LANG[language]
+    end = '' if language == 'py' else ';'
+    body = ['a = ' + ' + '.join(f'b * {k}' for k in range(terms)) + end, lang['literal']('')[-1]]
+    return lang['file'](lang['function'](0, body))
+
+
+def largest_flowchart(result):
+    flowcharts = [result['main_flowchart']] + [e['flowchart'] for e in result['functions'] + result['classes']]
+    return max(flowcharts, key=lambda f: len(f['nodes']))
+
+
+def run_case(language, dimension, value, svg=True):
+    """(узлов в самой большой схеме, время разбора, время SVG); исключения - наружу"""
+    if dimension == 'expression':
+        code = generate_expression(language, value)
+    else:
+        code = generate(language, dimension, value)
+    
+    start = time.perf_counter()
+    flowchart = largest_flowchart(PARSERS[language](code))
+    parse_time = time.perf_counter() - start
+    
+    svg_time = None
+    if svg:
+        start = time.perf_counter()
+        render_svg(flowchart)
+        svg_time = time.perf_counter() - start
+    return len(flowchart['nodes']), parse_time, svg_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Стресс-тест парсеров на длинных и глубоких функциях')
+    parser.add_argument('--language', choices=LANGUAGES, action='append', help='только этот язык')
+    parser.add_argument('--no-svg', dest='svg', action='store_false', help='не строить SVG')
+    args = parser.parse_args()
+    
+    failures = 0
+    for language in args.language or LANGUAGES:
+        for dimension, value in CASES[language]:
+            key = f'{language}/{dimension}/{value}'
+            try:
+                nodes, parse_time, svg_time = run_case(language, dimension, value, args.svg)
+            except Exception as e:
+                failures += 1
+                print(f'  {key:<24} ошибка: {type(e).__name__}')
+                traceback.print_exc(limit=-3)
+                continue
+            svg_text = f'  SVG {svg_time * 1000:9.1f} мс' if svg_time is not None else ''
+            print(f'  {key:<24} {nodes:>7} узлов  разбор {parse_time * 1000:9.1f} мс{svg_text}')
+            sys.stdout.flush()
+    
+    if failures:
+        print(f'\nУпало случаев: {failures}')
+        return 1
+    
+    print('\nВсе случаи построены')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
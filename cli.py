@@ -0,0 +1,152 @@
+"""
+Построение блок-схем для целого дерева исходников без сервера
+Файлы разбираются в пуле процессов, JSON пишется рядом с относительным путём файла;
+файлы, содержимое которых не изменилось с прошлого запуска, пропускаются
+
+Запуск:  python -m cli src/ -o flowcharts/ [--jobs 4] [--format compact] [--no-code] [--force]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import as_completed
+
+from static.py.dispatch import MAX_CODE_LENGTH, PARSER_VERSION, detect_extension, parse_to_json
+from static.py.result_cache import ResultCache
+from static.py.worker_pool import WorkerError, WorkerPool
+
+MANIFEST_NAME = '.flowcharts-manifest.json'
+
+# Каталоги, в которых не бывает исходников проекта
+SKIP_DIRS = {'.git', '.hg', '.svn', '__pycache__', 'node_modules', 'venv', '.venv', 'bin', 'obj'}
+
+
+def iter_sources(paths, output):
+    """Поддерживаемые файлы: (полный путь, путь относительно своего корня)"""
+    output = os.path.abspath(output)
+    for root in paths:
+        if os.path.isfile(root):
+            if detect_extension(root):
+                yield root, os.path.basename(root)
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            # Выходной каталог может лежать внутри обходимого дерева
+            dirnames[:] = sorted(d for d in dirnames
+                                 if d not in SKIP_DIRS and os.path.abspath(os.path.join(dirpath, d)) != output)
+            for filename in sorted(filenames):
+                if detect_extension(filename):
+                    path = os.path.join(dirpath, filename)
+                    yield path, os.path.relpath(path, root)
+
+
+def load_manifest(path):
+    """Хэши содержимого с прошлого запуска: {относительный путь: ключ}"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, files):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'version': PARSER_VERSION, 'files': dict(sorted(files.items()))}, f, ensure_ascii=False, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def write_result(path, body):
+    """Записать JSON атомарно: прерванный запуск не оставит обрезанный файл"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(body)
+    os.replace(path + '.tmp', path)
+
+
+def run(args):
+    manifest_path = os.path.join(args.output, MANIFEST_NAME)
+    previous = {} if args.force else load_manifest(manifest_path)
+    manifest = {}
+    variant = f'{PARSER_VERSION}-cli-{int(args.compact)}{int(args.code)}'
+    
+    processed = skipped = 0
+    total_bytes = 0
+    failures = []
+    pending = {}
+    start = time.perf_counter()
+    
+    pool = WorkerPool(args.jobs, timeout=args.timeout, max_rss=args.max_rss, preload=('static.py.dispatch',))
+    try:
+        for path, rel in iter_sources(args.paths, args.output):
+            target = os.path.join(args.output, rel + '.json')
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError as e:
+                failures.append((rel, e.strerror))
+                continue
+            
+            if len(data) > MAX_CODE_LENGTH:
+                failures.append((rel, 'Файл слишком большой'))
+                continue
+            
+            key = ResultCache.make_key(data, detect_extension(rel), variant)
+            if previous.get(rel) == key and os.path.exists(target):
+                manifest[rel] = key
+                skipped += 1
+                continue
+            
+            total_bytes += len(data)
+            pending[pool.submit(parse_to_json, data, detect_extension(rel), args.compact, args.code)] = \
+                (rel, target, key)
+        
+        for future in as_completed(pending):
+            rel, target, key = pending[future]
+            try:
+                status, body = future.result()
+            except WorkerError as e:
+                # Лимит времени или памяти - ошибка только этого файла
+                status, body = e.status, json.dumps(e.message).encode('utf-8')
+            
+            processed += 1
+            if status != 200:
+                # В манифест не попадает - при следующем запуске файл разберётся снова
+                failures.append((rel, json.loads(body)))
+                continue
+            
+            write_result(target, body)
+            manifest[rel] = key
+            if args.verbose:
+                print(f'  {rel}')
+    finally:
+        pool.shutdown()
+        os.makedirs(args.output, exist_ok=True)
+        save_manifest(manifest_path, manifest)
+    
+    elapsed = time.perf_counter() - start
+    print(f'Разобрано: {processed}, без изменений: {skipped}, ошибок: {len(failures)}')
+    print(f'{elapsed:.2f} с, {processed / elapsed:.1f} файлов/с, {total_bytes / 1024 / 1024 / elapsed:.2f} МБ/с')
+    for rel, message in sorted(failures):
+        print(f'  ошибка {rel}: {message}')
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Блок-схемы для всех .py, .js и .cs файлов каталога')
+    parser.add_argument('paths', nargs='+', help='каталоги или файлы')
+    parser.add_argument('-o', '--output', default='flowcharts', help='куда писать JSON (по умолчанию flowcharts)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='число процессов-обработчиков')
+    parser.add_argument('--format', choices=('full', 'compact'), default='full', help='формат блок-схем')
+    parser.add_argument('--no-code', dest='code', action='store_false', help='не включать исходный код в JSON')
+    parser.add_argument('--force', action='store_true', help='разобрать все файлы, не глядя на манифест')
+    parser.add_argument('--timeout', type=float, default=10, help='лимит времени на файл, с')
+    parser.add_argument('--max-rss', type=int, default=512, help='лимит памяти обработчика, МБ')
+    parser.add_argument('-v', '--verbose', action='store_true', help='печатать каждый записанный файл')
+    args = parser.parse_args()
+    args.compact = args.format == 'compact'
+    args.max_rss *= 1024 * 1024
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,472 @@
+/**
+ * FlowchartCanvasRenderer - Canvas2D-рендерер очень больших блок-схем
+ *
+ * Те же фигуры, цвета и стрелки, что у FlowchartRenderer, но вместо тысяч элементов SVG -
+ * один <canvas> размером с окно панели. Сдвиг и масштаб перерисовывают видимую часть
+ * (не чаще раза за кадр), узел под курсором ищется по сетке
+ */
+class FlowchartCanvasRenderer extends FlowchartRenderer {
+    constructor(container, viewport = container) {
+        super(container);
+        this.viewport = viewport;
+        this.canvas = null;
+        this.ctx = null;
+        this.view = { panX: 0, panY: 0, scale: 1 };
+        this.frame = null;
+        this.resizeObserver = null;
+        this.hovered = -1;
+        
+        // Ячейка сетки для поиска узла под курсором
+        this.cellSize = 256;
+        // Мельче этого (в пикселях экрана) текст не рисуется - его всё равно не прочитать
+        this.minFontSize = 4;
+        
+        this.colors.hover = { fill: '#bfdbfe', stroke: '#1d4ed8' };
+    }
+    
+    setView({ panX, panY, scale }) {
+        this.view = { panX, panY, scale };
+        this.scheduleRedraw();
+    }
+    
+    // Несколько событий за кадр (колёсико, перетаскивание) - одна перерисовка
+    scheduleRedraw() {
+        if (this.frame !== null || !this.canvas) return;
+        this.frame = requestAnimationFrame(() => {
+            this.frame = null;
+            this.redraw();
+        });
+    }
+    
+    dispose() {
+        if (this.frame !== null) cancelAnimationFrame(this.frame);
+        this.frame = null;
+        this.resizeObserver?.disconnect();
+        this.resizeObserver = null;
+        this.canvas = null;
+        this.ctx = null;
+    }
+    
+    draw(flowchartData, layout) {
+        const { nodes, edges } = flowchartData;
+        this.dispose();
+        this.container.innerHTML = '';
+        this.nodePositions = layout.positions;
+        this.data = flowchartData;
+        this.layout = layout;
+        this.hovered = -1;
+        
+        this.prepareNodes(nodes);
+        this.prepareEdges(edges, layout.paths);
+        
+        this.canvas = document.createElement('canvas');
+        this.canvas.className = 'flowchart-canvas';
+        this.ctx = this.canvas.getContext('2d');
+        this.canvas.addEventListener('mousemove', (e) => this.setHovered(this.hitTest(e.clientX, e.clientY)));
+        this.canvas.addEventListener('mouseleave', () => this.setHovered(-1));
+        this.container.appendChild(this.canvas);
+        
+        // Начало координат схемы - там, где стоял бы SVG (внутри отступов контейнера)
+        const style = getComputedStyle(this.container);
+        this.origin = { x: parseFloat(style.paddingLeft) || 0, y: parseFloat(style.paddingTop) || 0 };
+        
+        if (window.ResizeObserver) {
+            this.resizeObserver = new ResizeObserver(() => this.scheduleRedraw());
+            this.resizeObserver.observe(this.viewport);
+        }
+        this.redraw();
+        
+        return { width: layout.width, height: layout.height };
+    }
+    
+    // === ПОДГОТОВКА ===
+    
+    // Узлы с позициями, их габариты (для отсечения и поиска) и сетка
+    prepareNodes(nodes) {
+        this.nodes = nodes.filter(node => this.nodePositions.has(node.id));
+        this.nodeBoxes = new Float64Array(this.nodes.length * 4);
+        this.nodeLines = new Array(this.nodes.length);
+        this.grid = new Map();
+        
+        this.nodes.forEach((node, i) => {
+            const { x, y } = this.nodePositions.get(node.id);
+            const [w, top, bottom] = this.getNodeExtent(node.type);
+            const box = [x - w, y - top, x + w, y + bottom];
+            this.nodeBoxes.set(box, i * 4);
+            
+            const size = this.cellSize;
+            for (let cx = Math.floor(box[0] / size); cx <= Math.floor(box[2] / size); cx++) {
+                for (let cy = Math.floor(box[1] / size); cy <= Math.floor(box[3] / size); cy++) {
+                    const key = `${cx}:${cy}`;
+                    const cell = this.grid.get(key);
+                    if (cell) cell.push(i);
+                    else this.grid.set(key, [i]);
+                }
+            }
+        });
+    }
+    
+    // Рёбра группами по цвету: ломаная и наконечник каждого ребра считаются один раз
+    prepareEdges(edges, paths) {
+        this.edgeGroups = new Map();
+        this.edgeLabels = [];
+        
+        edges.forEach((edge, i) => {
+            const path = paths[i];
+            if (!path) return;
+            const color = this.getLineColor(edge);
+            const points = Float64Array.from(path.match(/-?[\d.]+(?:e[-+]?\d+)?/gi), Number);
+            
+            let group = this.edgeGroups.get(color);
+            if (!group) {
+                group = [];
+                this.edgeGroups.set(color, group);
+            }
+            group.push({ points, arrow: this.getArrowHead(points), box: this.getPointsBox(points) });
+            
+            if (edge.label) {
+                const point = this.getEdgeLabelPoint(this.nodePositions.get(edge.from), edge);
+                if (point) this.edgeLabels.push({ x: point.x, y: point.y, text: edge.label, color });
+            }
+        });
+    }
+    
+    // Треугольник маркера из SVG (viewBox 10x10, refX 9, markerWidth 6 при толщине 2),
+    // повёрнутый по последнему ненулевому отрезку
+    getArrowHead(points) {
+        const n = points.length;
+        const x = points[n - 2];
+        const y = points[n - 1];
+        let dx = 0;
+        let dy = 0;
+        for (let i = n - 4; i >= 0 && dx === 0 && dy === 0; i -= 2) {
+            dx = x - points[i];
+            dy = y - points[i + 1];
+        }
+        const length = Math.hypot(dx, dy) || 1;
+        const ux = dx / length;
+        const uy = dy / length;
+        const s = 1.2;
+        const corner = (along, across) => [x + ux * along * s - uy * across * s, y + uy * along * s + ux * across * s];
+        return [...corner(-9, -5), ...corner(1, 0), ...corner(-9, 5)];
+    }
+    
+    getPointsBox(points) {
+        let minX = Infinity, minY = Infinity, maxX = -Infinity, maxY = -Infinity;
+        for (let i = 0; i < points.length; i += 2) {
+            minX = Math.min(minX, points[i]);
+            maxX = Math.max(maxX, points[i]);
+            minY = Math.min(minY, points[i + 1]);
+            maxY = Math.max(maxY, points[i + 1]);
+        }
+        // Запас на толщину линии и наконечник
+        return [minX - 12, minY - 12, maxX + 12, maxY + 12];
+    }
+    
+    // === ПОИСК УЗЛА ===
+    
+    // Индекс узла под точкой экрана или -1
+    hitTest(clientX, clientY) {
+        if (!this.canvas) return -1;
+        const rect = this.canvas.getBoundingClientRect();
+        const { panX, panY, scale } = this.view;
+        const x = (clientX - rect.left - panX) / scale - this.origin.x;
+        const y = (clientY - rect.top - panY) / scale - this.origin.y;
+        
+        const cell = this.grid.get(`${Math.floor(x / this.cellSize)}:${Math.floor(y / this.cellSize)}`);
+        if (!cell) return -1;
+        
+        for (let k = cell.length - 1; k >= 0; k--) {
+            const i = cell[k];
+            const b = i * 4;
+            if (x < this.nodeBoxes[b] || x > this.nodeBoxes[b + 2] || y < this.nodeBoxes[b + 1] || y > this.nodeBoxes[b + 3]) continue;
+            
+            const node = this.nodes[i];
+            if (node.type === 'condition' || node.type === 'end') {
+                // Ромб: |dx| + |dy| <= половины диагонали
+                const pos = this.nodePositions.get(node.id);
+                const half = this.nodeBoxes[b + 2] - pos.x;
+                if (Math.abs(x - pos.x) + Math.abs(y - pos.y) > half) continue;
+            }
+            return i;
+        }
+        return -1;
+    }
+    
+    getNodeAt(event) {
+        const index = this.hitTest(event.clientX, event.clientY);
+        return index >= 0 ? this.nodes[index].id : null;
+    }
+    
+    setHovered(index) {
+        if (index === this.hovered) return;
+        this.hovered = index;
+        if (this.canvas) {
+            const node = index >= 0 ? this.nodes[index] : null;
+            this.canvas.title = node ? node.text || '' : '';
+            // Составной узел сворачивается щелчком - курсор как у ссылки
+            this.canvas.style.cursor = node && node.hidden !== undefined ? 'pointer' : '';
+        }
+        this.scheduleRedraw();
+    }
+    
+    // === ОТРИСОВКА ===
+    
+    redraw() {
+        const { canvas, ctx } = this;
+        if (!canvas) return;
+        
+        const ratio = window.devicePixelRatio || 1;
+        const width = this.viewport.clientWidth;
+        const height = this.viewport.clientHeight;
+        if (canvas.width !== Math.round(width * ratio) || canvas.height !== Math.round(height * ratio)) {
+            canvas.width = Math.round(width * ratio);
+            canvas.height = Math.round(height * ratio);
+            canvas.style.width = `${width}px`;
+            canvas.style.height = `${height}px`;
+        }
+        
+        ctx.setTransform(1, 0, 0, 1, 0, 0);
+        ctx.clearRect(0, 0, canvas.width, canvas.height);
+        
+        // Та же трансформация, что translate(pan) scale(scale) у панели с SVG
+        const { panX, panY, scale } = this.view;
+        const k = ratio * scale;
+        ctx.setTransform(k, 0, 0, k, ratio * (panX + scale * this.origin.x), ratio * (panY + scale * this.origin.y));
+        
+        // Видимая область в координатах схемы
+        const left = -panX / scale - this.origin.x;
+        const top = -panY / scale - this.origin.y;
+        const visible = [left, top, left + width / scale, top + height / scale];
+        const withText = 11 * scale >= this.minFontSize;
+        
+        this.drawEdges(visible, withText);
+        this.drawNodes(visible, withText);
+    }
+    
+    intersects(box, offset, visible) {
+        return box[offset] <= visible[2] && box[offset + 2] >= visible[0] &&
+            box[offset + 1] <= visible[3] && box[offset + 3] >= visible[1];
+    }
+    
+    drawEdges(visible, withText) {
+        const ctx = this.ctx;
+        ctx.lineWidth = 2;
+        ctx.setLineDash([]);
+        
+        // Один stroke и один fill на цвет
+        this.edgeGroups.forEach((group, color) => {
+            ctx.beginPath();
+            const arrows = [];
+            group.forEach(edge => {
+                if (!this.intersects(edge.box, 0, visible)) return;
+                const p = edge.points;
+                ctx.moveTo(p[0], p[1]);
+                for (let i = 2; i < p.length; i += 2) ctx.lineTo(p[i], p[i + 1]);
+                arrows.push(edge.arrow);
+            });
+            ctx.strokeStyle = color;
+            ctx.stroke();
+            
+            ctx.beginPath();
+            arrows.forEach(a => {
+                ctx.moveTo(a[0], a[1]);
+                ctx.lineTo(a[2], a[3]);
+                ctx.lineTo(a[4], a[5]);
+                ctx.closePath();
+            });
+            ctx.fillStyle = color;
+            ctx.fill();
+        });
+        
+        if (!withText) return;
+        ctx.font = 'bold 12px Arial, sans-serif';
+        ctx.textAlign = 'left';
+        ctx.textBaseline = 'alphabetic';
+        this.edgeLabels.forEach(label => {
+            if (label.x > visible[2] || label.y < visible[1] || label.x < visible[0] - 100 || label.y > visible[3] + 12) return;
+            ctx.fillStyle = label.color;
+            ctx.fillText(label.text, label.x, label.y);
+        });
+    }
+    
+    drawNodes(visible, withText) {
+        const ctx = this.ctx;
+        const shown = [];
+        for (let i = 0; i < this.nodes.length; i++) {
+            if (this.intersects(this.nodeBoxes, i * 4, visible)) shown.push(i);
+        }
+        
+        // Фигуры пачками по стилю: сплошные, пунктирные (try/except/finally), символ конца
+        const solid = [];
+        const dashed = [];
+        const ends = [];
+        shown.forEach(i => {
+            const type = this.nodes[i].type;
+            if (type === 'end') ends.push(i);
+            else if (type === 'try_start' || type === 'except' || type === 'finally') dashed.push(i);
+            else solid.push(i);
+        });
+        
+        ctx.lineWidth = 2;
+        ctx.strokeStyle = this.colors.stroke;
+        
+        ctx.setLineDash([]);
+        this.fillShapes(solid, this.colors.fill);
+        ctx.setLineDash([5, 3]);
+        this.fillShapes(dashed, this.colors.fill);
+        ctx.setLineDash([]);
+        this.fillShapes(ends, 'white');
+        
+        // Кружки: над началом и внутри символа конца
+        ctx.beginPath();
+        shown.forEach(i => {
+            const node = this.nodes[i];
+            const { x, y } = this.nodePositions.get(node.id);
+            if (node.type === 'end') this.addCircle(x, y, 6);
+            else if (node.type === 'start' || node.type === 'class_start') this.addCircle(x, y - this.nodeHeight / 2 - 15, 8);
+        });
+        ctx.fillStyle = this.colors.stroke;
+        ctx.fill();
+        
+        // Узел под курсором - поверх, с толстой рамкой
+        const hovered = this.hovered;
+        if (hovered >= 0 && this.intersects(this.nodeBoxes, hovered * 4, visible)) {
+            const type = this.nodes[hovered].type;
+            ctx.save();
+            ctx.lineWidth = 3;
+            ctx.strokeStyle = this.colors.hover.stroke;
+            if (type === 'try_start' || type === 'except' || type === 'finally') ctx.setLineDash([5, 3]);
+            this.fillShapes([hovered], type === 'end' ? 'white' : this.colors.hover.fill);
+            ctx.restore();
+        }
+        
+        if (withText) this.drawTexts(shown);
+    }
+    
+    fillShapes(indices, fill) {
+        if (indices.length === 0) return;
+        const ctx = this.ctx;
+        ctx.beginPath();
+        indices.forEach(i => {
+            const node = this.nodes[i];
+            const { x, y } = this.nodePositions.get(node.id);
+            this.addShape(node.type, x, y);
+        });
+        ctx.fillStyle = fill;
+        ctx.fill();
+        ctx.stroke();
+    }
+    
+    // Контур узла - в текущий путь (те же размеры, что в drawTerminator, drawDiamond и т.д.)
+    addShape(type, x, y) {
+        const ctx = this.ctx;
+        const w = this.nodeWidth / 2;
+        const h = this.nodeHeight / 2;
+        switch (type) {
+            case 'start':
+            case 'class_start':
+            case 'method':
+                ctx.moveTo(x - w + h, y - h);
+                ctx.lineTo(x + w - h, y - h);
+                ctx.arc(x + w - h, y, h, -Math.PI / 2, Math.PI / 2);
+                ctx.lineTo(x - w + h, y + h);
+                ctx.arc(x - w + h, y, h, Math.PI / 2, Math.PI * 3 / 2);
+                ctx.closePath();
+                break;
+            case 'end':
+                this.addPolygon([x, y - 15, x + 15, y, x, y + 15, x - 15, y]);
+                break;
+            case 'input':
+            case 'output':
+                this.addPolygon([x - w + 15, y - h, x + w + 15, y - h, x + w - 15, y + h, x - w - 15, y + h]);
+                break;
+            case 'condition': {
+                const size = this.conditionSize;
+                this.addPolygon([x, y - size, x + size, y, x, y + size, x - size, y]);
+                break;
+            }
+            case 'loop': {
+                const hw = this.hexWidth / 2;
+                const hh = this.hexHeight / 2;
+                const cut = 20;
+                this.addPolygon([x - hw + cut, y - hh, x + hw - cut, y - hh, x + hw, y,
+                    x + hw - cut, y + hh, x - hw + cut, y + hh, x - hw, y]);
+                break;
+            }
+            default:
+                ctx.rect(x - w, y - h, this.nodeWidth, this.nodeHeight);
+        }
+    }
+    
+    addPolygon(points) {
+        this.ctx.moveTo(points[0], points[1]);
+        for (let i = 2; i < points.length; i += 2) this.ctx.lineTo(points[i], points[i + 1]);
+        this.ctx.closePath();
+    }
+    
+    addCircle(x, y, r) {
+        this.ctx.moveTo(x + r, y);
+        this.ctx.arc(x, y, r, 0, Math.PI * 2);
+    }
+    
+    drawTexts(indices) {
+        const ctx = this.ctx;
+        ctx.font = '11px Arial, sans-serif';
+        ctx.textAlign = 'center';
+        ctx.textBaseline = 'middle';
+        ctx.fillStyle = this.colors.text;
+        
+        const lineHeight = 13;
+        indices.forEach(i => {
+            const node = this.nodes[i];
+            if (node.type === 'end') return;
+            // Перенос строк - один раз, при первом показе узла
+            let lines = this.nodeLines[i];
+            if (!lines) {
+                lines = this.wrapText(node.text, this.getTextWidth(node.type));
+                this.nodeLines[i] = lines;
+            }
+            const { x, y } = this.nodePositions.get(node.id);
+            const startY = y - ((lines.length - 1) * lineHeight) / 2;
+            lines.forEach((line, j) => ctx.fillText(line, x, startY + j * lineHeight));
+        });
+        
+        this.drawBadges(indices);
+    }
+    
+    drawBadges(indices) {
+        const ctx = this.ctx;
+        const badges = [];
+        indices.forEach(i => {
+            const node = this.nodes[i];
+            const badge = this.getBadge(node, this.nodePositions.get(node.id));
+            if (badge) badges.push(badge);
+        });
+        if (badges.length === 0) return;
+        
+        ctx.beginPath();
+        badges.forEach(({ x, y, width, height }) => {
+            const r = height / 2;
+            ctx.moveTo(x - width / 2 + r, y - r);
+            ctx.arc(x + width / 2 - r, y, r, -Math.PI / 2, Math.PI / 2);
+            ctx.arc(x - width / 2 + r, y, r, Math.PI / 2, Math.PI * 3 / 2);
+            ctx.closePath();
+        });
+        ctx.fillStyle = this.colors.stroke;
+        ctx.fill();
+        
+        ctx.font = 'bold 10px Arial, sans-serif';
+        ctx.fillStyle = 'white';
+        badges.forEach(badge => ctx.fillText(badge.text, badge.x, badge.y));
+    }
+    
+    // SVG той же раскладки - для скачивания; в документ не вставляется
+    createSvg() {
+        const renderer = new FlowchartRenderer(document.createElement('div'));
+        renderer.draw(this.data, this.layout);
+        return renderer.svg;
+    }
+}
+
+window.FlowchartCanvasRenderer = FlowchartCanvasRenderer;
@@ -0,0 +1,159 @@
+/**
+ * PngExporter - экспорт SVG блок-схемы в PNG плитками
+ *
+ * Одна canvas размером со всю схему упирается в ограничения браузера и выходит пустой,
+ * поэтому SVG растрируется плитками не больше TILE_SIZE, полосы пикселей уходят в воркер
+ * (png-worker.js) и сжимаются в PNG потоком - кодирование не замораживает страницу
+ */
+class PngExporter {
+    constructor(markup, width, height, scale = 2) {
+        this.markup = markup;
+        this.width = width;
+        this.height = height;
+        this.scale = scale;
+    }
+    
+    // Blob с PNG; onProgress получает долю готовых строк (0..1)
+    async toBlob(onProgress = () => {}) {
+        const width = Math.ceil(this.width * this.scale);
+        const height = Math.ceil(this.height * this.scale);
+        if (width * height > PngExporter.MAX_PIXELS) {
+            throw new Error('Схема слишком велика для PNG в этом масштабе - уменьшите масштаб или скачайте SVG');
+        }
+        
+        const url = URL.createObjectURL(new Blob([this.markup], { type: 'image/svg+xml;charset=utf-8' }));
+        try {
+            const image = await this.loadImage(url);
+            const worker = await this.startEncoder(width, height);
+            if (!worker) return await this.encodeSingle(image, width, height, onProgress);
+            try {
+                return await this.encodeTiled(worker, image, width, height, onProgress);
+            } finally {
+                worker.terminate();
+            }
+        } finally {
+            URL.revokeObjectURL(url);
+        }
+    }
+    
+    loadImage(url) {
+        return new Promise((resolve, reject) => {
+            const image = new Image();
+            image.onload = () => resolve(image);
+            image.onerror = () => reject(new Error('Не удалось загрузить SVG'));
+            image.src = url;
+        });
+    }
+    
+    // Воркер, готовый принимать строки; null - потоковое кодирование недоступно
+    startEncoder(width, height) {
+        if (!window.Worker) return Promise.resolve(null);
+        
+        let worker;
+        try {
+            worker = new Worker(PngExporter.WORKER_URL);
+        } catch (error) {
+            return Promise.resolve(null);
+        }
+        return this.request(worker, { type: 'start', width, height }).catch(() => {
+            worker.terminate();
+            return null;
+        }).then(reply => reply && worker);
+    }
+    
+    // Одно сообщение воркеру и его ответ; следующее отправляется только после ответа,
+    // так что в памяти не больше одной полосы
+    request(worker, message, transfer = []) {
+        return new Promise((resolve, reject) => {
+            worker.onmessage = (e) => {
+                if (e.data.error) reject(new Error(e.data.error));
+                else resolve(e.data);
+            };
+            worker.onerror = (e) => {
+                e.preventDefault();
+                reject(new Error(e.message || 'Воркер PNG недоступен'));
+            };
+            worker.postMessage(message, transfer);
+        });
+    }
+    
+    // Полосы во всю ширину; полоса собирается из плиток по TILE_SIZE пикселей
+    async encodeTiled(worker, image, width, height, onProgress) {
+        const tileWidth = Math.min(width, PngExporter.TILE_SIZE);
+        const bandHeight = Math.max(1, Math.min(PngExporter.TILE_SIZE, Math.floor(PngExporter.BAND_PIXELS / width)));
+        
+        const tile = document.createElement('canvas');
+        tile.width = tileWidth;
+        tile.height = bandHeight;
+        const ctx = tile.getContext('2d', { willReadFrequently: true });
+        
+        for (let top = 0; top < height; top += bandHeight) {
+            const rows = Math.min(bandHeight, height - top);
+            const band = new Uint8Array(width * rows * 4);
+            
+            for (let left = 0; left < width; left += tileWidth) {
+                const cols = Math.min(tileWidth, width - left);
+                this.drawTile(ctx, image, left, top, tileWidth, bandHeight);
+                
+                const pixels = ctx.getImageData(0, 0, cols, rows).data;
+                for (let r = 0; r < rows; r++) {
+                    band.set(pixels.subarray(r * cols * 4, (r + 1) * cols * 4), (r * width + left) * 4);
+                }
+            }
+            
+            // Ответ воркера - после сжатия полосы; между полосами страница успевает отрисоваться
+            await this.request(worker, { type: 'rows', pixels: band.buffer, rows }, [band.buffer]);
+            onProgress((top + rows) / height);
+        }
+        
+        const { blob } = await this.request(worker, { type: 'end' });
+        return blob;
+    }
+    
+    // Фрагмент схемы с левым верхним углом (left, top) в пикселях PNG
+    drawTile(ctx, image, left, top, width, height) {
+        ctx.setTransform(1, 0, 0, 1, 0, 0);
+        ctx.fillStyle = 'white';
+        ctx.fillRect(0, 0, width, height);
+        ctx.setTransform(this.scale, 0, 0, this.scale, -left, -top);
+        ctx.drawImage(image, 0, 0, this.width, this.height);
+    }
+    
+    // Без воркера или CompressionStream - одна canvas, если браузер её потянет
+    encodeSingle(image, width, height, onProgress) {
+        if (Math.max(width, height) > PngExporter.SINGLE_CANVAS_SIDE || width * height > PngExporter.SINGLE_CANVAS_PIXELS) {
+            return Promise.reject(new Error('Браузер не может сохранить такую большую схему в PNG - скачайте SVG'));
+        }
+        
+        const canvas = document.createElement('canvas');
+        canvas.width = width;
+        canvas.height = height;
+        this.drawTile(canvas.getContext('2d'), image, 0, 0, width, height);
+        
+        return new Promise((resolve, reject) => {
+            canvas.toBlob((blob) => {
+                if (!blob) {
+                    reject(new Error('Не удалось создать PNG'));
+                    return;
+                }
+                onProgress(1);
+                resolve(blob);
+            }, 'image/png');
+        });
+    }
+}
+
+// Сторона плитки и размер полосы (пикселей) - заведомо в пределах canvas любого браузера
+PngExporter.TILE_SIZE = 4096;
+PngExporter.BAND_PIXELS = 4 * 1024 * 1024;
+// Пределы для одной canvas (Safari) и для PNG вообще
+PngExporter.SINGLE_CANVAS_SIDE = 16384;
+PngExporter.SINGLE_CANVAS_PIXELS = 16 * 1024 * 1024;
+PngExporter.MAX_PIXELS = 400 * 1024 * 1024;
+
+// Воркер лежит рядом с этим файлом
+PngExporter.WORKER_URL = document.currentScript
+    ? new URL('png-worker.js', document.currentScript.src).href
+    : 'png-worker.js';
+
+window.PngExporter = PngExporter;
@@ -0,0 +1,137 @@
+/**
+ * FlowchartHierarchy - вложенность блок-схемы и свёрнутые тела
+ *
+ * Строители сервера записывают в node.parent составной узел (if, цикл, try, catch...),
+ * которому принадлежит узел. Свёрнутый узел прячет всех своих потомков: рёбра из них
+ * переносятся на него, рёбра внутри исчезают. Раскладка и отрисовка получают только
+ * видимую часть схемы, так что их стоимость зависит от раскрытого, а не от размера схемы
+ */
+class FlowchartHierarchy {
+    constructor(flowchartData) {
+        this.nodes = flowchartData.nodes;
+        this.edges = flowchartData.edges;
+        this.children = new Map();  // владелец -> id прямых потомков
+        this.roots = [];
+        this.sizes = new Map();     // владелец -> число всех потомков
+        
+        const ids = new Set(this.nodes.map(node => node.id));
+        this.nodes.forEach(node => {
+            if (node.parent === undefined || !ids.has(node.parent)) {
+                this.roots.push(node.id);
+                return;
+            }
+            const children = this.children.get(node.parent);
+            if (children) children.push(node.id);
+            else this.children.set(node.parent, [node.id]);
+        });
+        
+        this.countDescendants();
+    }
+    
+    // Размеры поддеревьев обходом в глубину на явном стеке (вложенность бывает в тысячи уровней)
+    countDescendants() {
+        const stack = this.roots.map(id => [id, false]);
+        while (stack.length > 0) {
+            const [id, done] = stack.pop();
+            const children = this.children.get(id);
+            if (!children) continue;
+            if (!done) {
+                stack.push([id, true]);
+                children.forEach(child => stack.push([child, false]));
+                continue;
+            }
+            let size = children.length;
+            children.forEach(child => {
+                size += this.sizes.get(child) || 0;
+            });
+            this.sizes.set(id, size);
+        }
+    }
+    
+    isOwner(id) {
+        return this.children.has(id);
+    }
+    
+    // Свёрнутые узлы для схемы, где видно не больше budget узлов: сначала сворачивается всё,
+    // потом владельцы раскрываются по уровням, пока их прямые потомки помещаются в бюджет
+    collapseToBudget(budget) {
+        if (this.nodes.length <= budget) return new Set();
+        
+        const collapsed = new Set(this.children.keys());
+        let visible = this.roots.length;
+        const queue = this.roots.filter(id => this.isOwner(id));
+        for (let k = 0; k < queue.length; k++) {
+            const children = this.children.get(queue[k]);
+            if (visible + children.length > budget) continue;
+            collapsed.delete(queue[k]);
+            visible += children.length;
+            children.forEach(child => {
+                if (this.isOwner(child)) queue.push(child);
+            });
+        }
+        return collapsed;
+    }
+    
+    // Видимая схема { nodes, edges }: у видимых владельцев hidden - сколько узлов спрятано
+    // (0 - раскрыт), рёбра из спрятанных узлов идут от их свёрнутого предка
+    view(collapsed) {
+        if (collapsed.size === 0 || this.children.size === 0) {
+            return { nodes: this.annotate(this.nodes, collapsed), edges: this.edges };
+        }
+        
+        // Представитель каждого узла: он сам или самый внешний свёрнутый предок
+        const representative = new Map();
+        const stack = this.roots.map(id => [id, null]);
+        while (stack.length > 0) {
+            const [id, hiddenBy] = stack.pop();
+            representative.set(id, hiddenBy === null ? id : hiddenBy);
+            const children = this.children.get(id);
+            if (!children) continue;
+            const childHiddenBy = hiddenBy === null && collapsed.has(id) ? id : hiddenBy;
+            children.forEach(child => stack.push([child, childHiddenBy]));
+        }
+        
+        const nodes = this.annotate(this.nodes.filter(node => representative.get(node.id) === node.id), collapsed);
+        
+        const edges = [];
+        const edgeIndex = new Map();  // "from-to" -> индекс в edges
+        this.edges.forEach(edge => {
+            const from = representative.has(edge.from) ? representative.get(edge.from) : edge.from;
+            const to = representative.has(edge.to) ? representative.get(edge.to) : edge.to;
+            // Ребро внутри свёрнутого тела (кроме собственной петли пустого цикла)
+            if (from === to && edge.from !== edge.to) return;
+            
+            // Из свёрнутого узла все связи - обычные "дальше" (кроме возврата и выхода цикла)
+            let visibleEdge = edge;
+            if (collapsed.has(from) || to !== edge.to) {
+                const keep = edge.branch === 'loop_back' || edge.branch === 'loop_exit';
+                visibleEdge = {
+                    from,
+                    to,
+                    label: keep || !collapsed.has(from) ? edge.label : '',
+                    branch: keep || !collapsed.has(from) ? edge.branch : ''
+                };
+            }
+            
+            const key = `${from}-${to}`;
+            if (!edgeIndex.has(key)) {
+                edgeIndex.set(key, edges.length);
+                edges.push(visibleEdge);
+            } else if (visibleEdge === edge) {
+                // Собственное ребро узла важнее перенесённого
+                edges[edgeIndex.get(key)] = edge;
+            }
+        });
+        
+        return { nodes, edges };
+    }
+    
+    annotate(nodes, collapsed) {
+        return nodes.map(node => {
+            if (!this.isOwner(node.id)) return node;
+            return { ...node, hidden: collapsed.has(node.id) ? this.sizes.get(node.id) : 0 };
+        });
+    }
+}
+
+window.FlowchartHierarchy = FlowchartHierarchy;
@@ -0,0 +1,622 @@
+/**
+ * FlowchartLayout - геометрия блок-схем без DOM: раскладка узлов и пути рёбер
+ * 
+ * Работает и на странице (основа FlowchartRenderer), и в Web Worker (layout-worker.js)
+ */
+class FlowchartLayout {
+    constructor() {
+        this.nodePositions = new Map();
+        this.edgeOffsets = new Map(); // Для отслеживания смещений множественных линий
+        this.nodeById = new Map();
+        
+        // Размеры
+        this.nodeWidth = 180;
+        this.nodeHeight = 40;
+        this.conditionSize = 45;
+        this.hexWidth = 180;
+        this.hexHeight = 40;
+        this.verticalGap = 70;
+        this.horizontalGap = 200;  // Увеличен для избежания перекрытий
+        this.padding = 80;
+        this.loopLeftOffset = 50;
+        this.arrowGap = 25;
+    }
+    
+    // Получить смещение для линии к узлу (чтобы множественные линии не накладывались)
+    getEdgeOffset(toId, branch) {
+        const key = `${toId}-${branch || 'default'}`;
+        if (!this.edgeOffsets.has(key)) {
+            this.edgeOffsets.set(key, 0);
+        }
+        const offset = this.edgeOffsets.get(key);
+        this.edgeOffsets.set(key, offset + 8); // Каждая следующая линия смещена на 8px
+        return offset;
+    }
+    
+    // Компактный формат сервера (static/py/wire_format.py) -> { nodes, edges }
+    static decode(flowchartData) {
+        if (!flowchartData || !Array.isArray(flowchartData.t)) return flowchartData;
+        
+        const { t: types, x: texts, p: parents, f: fromDeltas, d: toDeltas, b: branches, l: labels, L: labelTable } = flowchartData;
+        const nodeTypes = FlowchartLayout.NODE_TYPES;
+        const branchNames = FlowchartLayout.BRANCHES;
+        
+        const nodes = types.map((type, id) => {
+            const node = { id, type: nodeTypes[type], text: texts[id] };
+            if (parents && parents[id]) node.parent = id - parents[id];
+            return node;
+        });
+        
+        const edges = new Array(fromDeltas.length);
+        let from = 0;
+        for (let i = 0; i < fromDeltas.length; i++) {
+            from += fromDeltas[i];
+            const branch = branches[i];
+            edges[i] = {
+                from,
+                to: from + toDeltas[i],
+                label: labelTable[labels[i]],
+                branch: branch < branchNames.length ? branchNames[branch] : `fan_${branch - branchNames.length}`
+            };
+        }
+        
+        return { nodes, edges };
+    }
+    
+    // Раскладка схемы { nodes, edges }: координаты узлов, путь каждого ребра (null - не рисуется)
+    // и размер холста; пути считаются в порядке рёбер - от него зависят смещения from_no
+    computeLayout(flowchartData) {
+        const { nodes, edges } = flowchartData;
+        this.nodePositions.clear();
+        this.edgeOffsets.clear(); // Очищаем смещения
+        
+        this.buildGraph(nodes, edges);
+        
+        const isClassDiagram = nodes.some(n => n.type === 'class_start');
+        
+        if (isClassDiagram) {
+            this.calculateClassPositions(nodes, edges);
+        } else {
+            this.calculatePositions(nodes, edges);
+        }
+        
+        const bounds = this.getBounds(nodes);
+        
+        const paths = edges.map(edge => {
+            const fromPos = this.nodePositions.get(edge.from);
+            const toPos = this.nodePositions.get(edge.to);
+            if (!fromPos || !toPos) return null;
+            return this.calculatePath(fromPos, toPos, this.nodeById.get(edge.from), this.nodeById.get(edge.to), edge);
+        });
+        
+        return { positions: this.nodePositions, paths, width: bounds.width, height: bounds.height };
+    }
+    
+    // Раскладка для передачи из воркера: координаты по номеру узла (NaN - без позиции)
+    // и все пути одной ASCII-строкой с границами - три буфера, которые передаются без копирования
+    static pack(nodes, layout) {
+        const xy = new Float64Array(nodes.length * 2).fill(NaN);
+        nodes.forEach((node, i) => {
+            const pos = layout.positions.get(node.id);
+            if (pos) {
+                xy[2 * i] = pos.x;
+                xy[2 * i + 1] = pos.y;
+            }
+        });
+        
+        const offsets = new Uint32Array(layout.paths.length + 1);
+        let total = 0;
+        layout.paths.forEach((path, i) => {
+            offsets[i] = total;
+            total += path ? path.length : 0;
+        });
+        offsets[layout.paths.length] = total;
+        
+        const bytes = new Uint8Array(total);
+        const encoder = new TextEncoder();
+        layout.paths.forEach((path, i) => {
+            if (path) encoder.encodeInto(path, bytes.subarray(offsets[i], offsets[i + 1]));
+        });
+        
+        return { xy, offsets, bytes, width: layout.width, height: layout.height };
+    }
+    
+    static unpack(nodes, packed) {
+        const { xy, offsets, bytes } = packed;
+        const positions = new Map();
+        nodes.forEach((node, i) => {
+            if (!Number.isNaN(xy[2 * i]) && !positions.has(node.id)) {
+                positions.set(node.id, { x: xy[2 * i], y: xy[2 * i + 1] });
+            }
+        });
+        
+        // Пути - только ASCII, поэтому границы в байтах совпадают с границами в строке
+        const text = new TextDecoder().decode(bytes);
+        const paths = new Array(offsets.length - 1);
+        for (let i = 0; i < paths.length; i++) {
+            paths[i] = offsets[i] < offsets[i + 1] ? text.slice(offsets[i], offsets[i + 1]) : null;
+        }
+        
+        return { positions, paths, width: packed.width, height: packed.height };
+    }
+    
+    // Индексы строятся один раз: раскладка и отрисовка не ищут узлы перебором
+    buildGraph(nodes, edges) {
+        this.nodeById = new Map();
+        this.children = new Map();
+        this.parents = new Map();
+        
+        nodes.forEach(n => {
+            if (!this.nodeById.has(n.id)) this.nodeById.set(n.id, n);
+            this.children.set(n.id, []);
+            this.parents.set(n.id, []);
+        });
+        
+        edges.forEach(e => {
+            this.children.get(e.from)?.push({ to: e.to, branch: e.branch, label: e.label });
+            this.parents.get(e.to)?.push({ from: e.from, branch: e.branch });
+        });
+    }
+    
+    calculateClassPositions(nodes, edges) {
+        const classNode = nodes.find(n => n.type === 'class_start');
+        const fieldsNode = nodes.find(n => n.type === 'input');
+        const methodNodes = nodes.filter(n => n.type === 'method');
+        
+        const centerX = 300;
+        let y = this.padding;
+        
+        if (classNode) {
+            this.nodePositions.set(classNode.id, { x: centerX, y });
+            y += this.nodeHeight + this.verticalGap;
+        }
+        
+        if (fieldsNode) {
+            this.nodePositions.set(fieldsNode.id, { x: centerX, y });
+            y += this.nodeHeight + this.verticalGap;
+        }
+        
+        if (methodNodes.length > 0) {
+            const totalWidth = (methodNodes.length - 1) * (this.nodeWidth + 30);
+            let startX = centerX - totalWidth / 2;
+            
+            methodNodes.forEach((method, i) => {
+                this.nodePositions.set(method.id, { 
+                    x: startX + i * (this.nodeWidth + 30), 
+                    y 
+                });
+            });
+        }
+    }
+    
+    calculatePositions(nodes, edges) {
+        let startNode = nodes.find(n => n.type === 'start');
+        if (!startNode) startNode = nodes[0];
+        if (!startNode) return;
+        
+        const endNode = nodes.find(n => n.type === 'end');
+        const positioned = new Set();
+        const centerX = 350;
+        
+        // Позиционируем все узлы кроме end
+        const maxY = this.positionNode(startNode.id, centerX, this.padding, positioned, new Set(), endNode?.id);
+        
+        // End всегда в самом низу по центру
+        if (endNode && !positioned.has(endNode.id)) {
+            this.nodePositions.set(endNode.id, { 
+                x: centerX, 
+                y: maxY + this.verticalGap + this.nodeHeight 
+            });
+            positioned.add(endNode.id);
+        }
+    }
+    
+    // Раскладка без рекурсии: шаги positionSteps - генераторы на явном стеке,
+    // поэтому длина и глубина схемы не упираются в стек вызовов
+    positionNode(nodeId, x, y, positioned, visiting, endNodeId) {
+        const stack = [this.positionSteps(nodeId, x, y, positioned, visiting, endNodeId)];
+        let value;
+        while (stack.length) {
+            const step = stack[stack.length - 1].next(value);
+            if (step.done) {
+                stack.pop();
+                value = step.value;
+            } else {
+                const [childId, childX, childY] = step.value;
+                stack.push(this.positionSteps(childId, childX, childY, positioned, visiting, endNodeId));
+                value = undefined;
+            }
+        }
+        return value;
+    }
+    
+    // Выдаёт [ребёнок, x, y] и получает нижнюю Y его поддерева;
+    // positioned и visiting - общие на всю раскладку: каждый узел обходится один раз
+    *positionSteps(nodeId, x, y, positioned, visiting, endNodeId) {
+        // Пропускаем end - он будет позиционирован отдельно
+        if (nodeId === endNodeId) {
+            return y;
+        }
+        
+        if (positioned.has(nodeId)) {
+            return this.nodePositions.get(nodeId)?.y || y;
+        }
+        
+        if (visiting.has(nodeId)) {
+            return y;
+        }
+        visiting.add(nodeId);
+        
+        const node = this.nodeById.get(nodeId);
+        if (!node) return y;
+        
+        this.nodePositions.set(nodeId, { x, y });
+        positioned.add(nodeId);
+        
+        const children = this.children.get(nodeId) || [];
+        const forwardChildren = children.filter(c => c.branch !== 'loop_back' && c.to !== endNodeId);
+        
+        let maxY = y;
+        const nodeH = this.getNodeFullHeight(node);
+        
+        // Условие (if)
+        if (node.type === 'condition') {
+            const yesChild = forwardChildren.find(c => c.branch === 'yes');
+            const noChild = forwardChildren.find(c => c.branch === 'no');
+            const otherChildren = forwardChildren.filter(c => c.branch !== 'yes' && c.branch !== 'no');
+            
+            // Ветка "да" - вниз
+            if (yesChild && !positioned.has(yesChild.to)) {
+                const yesY = yield [yesChild.to, x, y + this.verticalGap + nodeH];
+                maxY = Math.max(maxY, yesY);
+            }
+            
+            // Ветка "нет" - вправо
+            if (noChild && !positioned.has(noChild.to)) {
+                const noX = x + this.horizontalGap + this.nodeWidth / 2;
+                const noY = yield [noChild.to, noX, y];
+                maxY = Math.max(maxY, noY);
+            }
+            
+            // Другие дети
+            for (const child of otherChildren) {
+                if (!positioned.has(child.to)) {
+                    const exitY = yield [child.to, x, maxY + this.verticalGap + this.nodeHeight];
+                    maxY = Math.max(maxY, exitY);
+                }
+            }
+            
+            return maxY;
+        }
+        
+        // Цикл (loop)
+        if (node.type === 'loop') {
+            const bodyChild = forwardChildren.find(c => c.branch === 'loop_body');
+            const exitChildren = forwardChildren.filter(c => c.branch !== 'loop_body');
+            
+            if (bodyChild && !positioned.has(bodyChild.to)) {
+                const bodyY = yield [bodyChild.to, x, y + this.verticalGap + nodeH];
+                maxY = Math.max(maxY, bodyY);
+            }
+            
+            for (const child of exitChildren) {
+                if (!positioned.has(child.to)) {
+                    const exitY = yield [child.to, x, maxY + this.verticalGap + this.nodeHeight];
+                    maxY = Math.max(maxY, exitY);
+                }
+            }
+            
+            return maxY;
+        }
+        
+        // Обычный узел
+        let nextY = y + this.verticalGap + nodeH;
+        
+        for (const child of forwardChildren) {
+            if (!positioned.has(child.to)) {
+                const childY = yield [child.to, x, nextY];
+                maxY = Math.max(maxY, childY);
+                nextY = maxY + this.verticalGap + this.nodeHeight;
+            }
+        }
+        
+        return Math.max(y, maxY);
+    }
+    
+    getNodeFullHeight(node) {
+        if (node.type === 'condition') return this.conditionSize * 2;
+        if (node.type === 'loop') return this.hexHeight;
+        if (node.type === 'end') return 30;
+        return this.nodeHeight;
+    }
+    
+    getBounds(nodes) {
+        let minX = Infinity, maxX = -Infinity;
+        let minY = Infinity, maxY = -Infinity;
+        
+        this.nodePositions.forEach(pos => {
+            minX = Math.min(minX, pos.x - this.nodeWidth / 2 - this.loopLeftOffset);
+            maxX = Math.max(maxX, pos.x + this.nodeWidth / 2 + this.horizontalGap);
+            minY = Math.min(minY, pos.y - this.nodeHeight - 30);
+            maxY = Math.max(maxY, pos.y + this.nodeHeight + 30);
+        });
+        
+        if (!isFinite(minX)) return { width: 600, height: 400 };
+        
+        const offsetX = this.padding - minX;
+        const offsetY = this.padding - minY;
+        
+        this.nodePositions.forEach(pos => {
+            pos.x += offsetX;
+            pos.y += offsetY;
+        });
+        
+        return {
+            width: Math.max(500, (maxX - minX) + this.padding * 2),
+            height: Math.max(300, (maxY - minY) + this.padding * 2)
+        };
+    }
+    
+    calculatePath(from, to, fromNode, toNode, edge) {
+        // Получаем точки выхода и входа
+        const fromBottom = this.getBottomPoint(from, fromNode);
+        const fromRight = this.getRightPoint(from, fromNode);
+        const fromLeft = this.getLeftPoint(from, fromNode);
+        const toTop = this.getTopPoint(to, toNode);
+        const toLeft = this.getLeftPoint(to, toNode);
+        
+        // Веер от полей класса к методам
+        if (edge.branch?.startsWith('fan_')) {
+            const x1 = from.x;
+            const y1 = fromBottom.y;
+            const x2 = to.x;
+            const y2 = toTop.y;
+            
+            const midY = y1 + (y2 - y1) / 3;
+            return `M ${x1} ${y1} L ${x1} ${midY} L ${x2} ${midY} L ${x2} ${y2}`;
+        }
+        
+        // Обратная связь цикла - СЛЕВА от блока к циклу выше
+        if (edge.branch === 'loop_back') {
+            // Левая точка источника
+            const x1 = fromLeft.x;
+            const y1 = fromLeft.y;
+            
+            // Левая точка цели (цикл)
+            const x2 = toLeft.x;
+            const y2 = toLeft.y;
+            
+            // Общая X координата для вертикальной линии (слева от обоих блоков)
+            const loopX = Math.min(x1, x2) - this.loopLeftOffset;
+            
+            // Путь: влево от блока → вверх → вправо к циклу
+            return `M ${x1} ${y1} L ${loopX} ${y1} L ${loopX} ${y2} L ${x2} ${y2}`;
+        }
+        
+        // Тело цикла - вниз
+        if (edge.branch === 'loop_body') {
+            const x1 = fromBottom.x;
+            const y1 = fromBottom.y;
+            const x2 = toTop.x;
+            const y2 = toTop.y;
+            
+            // Прямая линия вниз с небольшим отступом
+            if (Math.abs(x1 - x2) < 5) {
+                return `M ${x1} ${y1} L ${x2} ${y2}`;
+            }
+            // Если не по центру - с изломом
+            const midY = y1 + this.arrowGap;
+            return `M ${x1} ${y1} L ${x1} ${midY} L ${x2} ${midY} L ${x2} ${y2}`;
+        }
+        
+        // Выход из цикла - СПРАВА и потом ВНИЗ к центру следующего блока
+        if (edge.branch === 'loop_exit' || (fromNode?.type === 'loop' && !edge.branch)) {
+            const x1 = fromRight.x;
+            const y1 = fromRight.y;
+            const x2 = toTop.x;
+            const y2 = toTop.y;
+            
+            // Если цель ниже - идём справа вниз
+            if (y2 > y1) {
+                const rightX = from.x + this.horizontalGap;
+                const approachY = y2 - this.arrowGap;
+                return `M ${x1} ${y1} L ${rightX} ${y1} L ${rightX} ${approachY} L ${x2} ${approachY} L ${x2} ${y2}`;
+            }
+            
+            // Иначе просто вправо
+            return `M ${x1} ${y1} L ${x2} ${y1} L ${x2} ${y2}`;
+        }
+        
+        // "да" от условия - ВНИЗ или ВВЕРХ (для do-while)
+        if (edge.branch === 'yes') {
+            const x1 = fromBottom.x;
+            const y1 = fromBottom.y;
+            const x2 = toTop.x;
+            const y2 = toTop.y;
+            
+            // Если цель ВЫШЕ источника (do-while) - идём слева обходом
+            if (to.y < from.y) {
+                const leftX1 = this.getLeftPoint(from, fromNode).x;
+                const leftX2 = this.getLeftPoint(to, toNode).x;
+                const loopX = Math.min(leftX1, leftX2) - this.loopLeftOffset;
+                const y1Left = from.y;  // Выходим слева от ромба
+                const y2Left = to.y;    // Входим слева в целевой блок
+                
+                return `M ${leftX1} ${y1Left} L ${loopX} ${y1Left} L ${loopX} ${y2Left} L ${leftX2} ${y2Left}`;
+            }
+            
+            // Цель ниже - обычная отрисовка вниз
+            if (Math.abs(x1 - x2) < 5) {
+                return `M ${x1} ${y1} L ${x2} ${y2}`;
+            }
+            const midY = y1 + this.arrowGap;
+            return `M ${x1} ${y1} L ${x1} ${midY} L ${x2} ${midY} L ${x2} ${y2}`;
+        }
+        
+        // "нет" от условия - ВПРАВО к следующему блоку
+        if (edge.branch === 'no') {
+            const x1 = fromRight.x;
+            const y1 = fromRight.y;
+            const x2 = toTop.x;
+            const y2 = toTop.y;
+            const toLeft = this.getLeftPoint(to, toNode);
+            
+            // Если цель справа - горизонтальная линия к левой стороне цели
+            if (to.x > from.x) {
+                // Если цель на том же уровне или близко - просто горизонталь
+                if (Math.abs(y1 - to.y) < this.verticalGap) {
+                    return `M ${x1} ${y1} L ${toLeft.x} ${toLeft.y}`;
+                }
+                // Цель ниже справа - вправо, потом вниз, потом к цели
+                if (to.y > from.y) {
+                    const midX = (x1 + toLeft.x) / 2;
+                    return `M ${x1} ${y1} L ${midX} ${y1} L ${midX} ${toLeft.y} L ${toLeft.x} ${toLeft.y}`;
+                }
+            }
+            
+            // Цель ниже слева - обходим справа
+            const rightX = Math.max(from.x, to.x) + this.horizontalGap;
+            const approachY = y2 - this.arrowGap;
+            
+            return `M ${x1} ${y1} L ${rightX} ${y1} L ${rightX} ${approachY} L ${x2} ${approachY} L ${x2} ${y2}`;
+        }
+        
+        // Выход из ветки "нет" к следующему блоку - обходим справа
+        if (edge.branch === 'from_no') {
+            const x1 = fromRight.x;
+            const y1 = fromRight.y;
+            const x2 = toTop.x;
+            const y2 = toTop.y;
+            
+            // Получаем смещение для этой линии
+            const offset = this.getEdgeOffset(edge.to, 'from_no');
+            
+            // Вычисляем правую границу для обхода с учётом смещения
+            const rightOffset = this.horizontalGap + offset;
+            const bypassX = Math.max(from.x + rightOffset, x2 + this.nodeWidth / 2 + this.arrowGap + offset);
+            
+            // Спускаемся вниз справа, затем к целевому блоку сверху
+            const approachY = y2 - this.arrowGap - offset;
+            
+            return `M ${x1} ${y1} L ${bypassX} ${y1} L ${bypassX} ${approachY} L ${x2} ${approachY} L ${x2} ${y2}`;
+        }
+        
+        // Исключение
+        if (edge.branch === 'exception') {
+            const x1 = from.x + this.nodeWidth / 2;
+            const y1 = from.y;
+            const x2 = toTop.x;
+            const y2 = toTop.y;
+            
+            const midX = x1 + this.arrowGap;
+            const topY = y2 - this.arrowGap;
+            return `M ${x1} ${y1} L ${midX} ${y1} L ${midX} ${topY} L ${x2} ${topY} L ${x2} ${y2}`;
+        }
+        
+        // Связь к END - всегда идёт вниз к центру end
+        if (toNode?.type === 'end') {
+            const x1 = fromBottom.x;
+            const y1 = fromBottom.y;
+            const x2 = to.x;
+            const y2 = toTop.y;
+            
+            // Проверяем что y2 > y1 (end ниже источника)
+            if (y2 <= y1) {
+                // End выше или на уровне - это ошибка позиционирования, просто рисуем
+                return `M ${x1} ${y1} L ${x2} ${y2}`;
+            }
+            
+            // Горизонтальная линия на уровне чуть выше end, потом вниз
+            const approachY = y2 - this.arrowGap;
+            
+            // Если блоки далеко по горизонтали
+            if (Math.abs(from.x - to.x) > 30) {
+                return `M ${x1} ${y1} L ${x1} ${approachY} L ${x2} ${approachY} L ${x2} ${y2}`;
+            }
+            
+            // Примерно по центру - прямо вниз
+            return `M ${x1} ${y1} L ${x2} ${y2}`;
+        }
+        
+        // Обычная связь - ВНИЗ с гарантированным вертикальным входом
+        const x1 = fromBottom.x;
+        const y1 = fromBottom.y;
+        const x2 = toTop.x;
+        const y2 = toTop.y;
+        
+        // Если на одной линии - просто вертикаль
+        if (Math.abs(x1 - x2) < 5) {
+            return `M ${x1} ${y1} L ${x2} ${y2}`;
+        }
+        
+        // Иначе - с изломом, и обязательно входим сверху
+        const midY = y1 + this.arrowGap;
+        const topY = y2 - this.arrowGap;
+        
+        return `M ${x1} ${y1} L ${x1} ${midY} L ${x2} ${midY} L ${x2} ${y2}`;
+    }
+    
+    // Точки выхода/входа для разных типов узлов
+    getBottomPoint(pos, node) {
+        if (!node) return { x: pos.x, y: pos.y + this.nodeHeight / 2 };
+        
+        switch (node.type) {
+            case 'condition':
+                return { x: pos.x, y: pos.y + this.conditionSize };
+            case 'loop':
+                return { x: pos.x, y: pos.y + this.hexHeight / 2 };
+            case 'end':
+                return { x: pos.x, y: pos.y + 15 };
+            default:
+                return { x: pos.x, y: pos.y + this.nodeHeight / 2 };
+        }
+    }
+    
+    getTopPoint(pos, node) {
+        if (!node) return { x: pos.x, y: pos.y - this.nodeHeight / 2 };
+        
+        switch (node.type) {
+            case 'condition':
+                return { x: pos.x, y: pos.y - this.conditionSize };
+            case 'loop':
+                return { x: pos.x, y: pos.y - this.hexHeight / 2 };
+            case 'end':
+                return { x: pos.x, y: pos.y - 15 };
+            default:
+                return { x: pos.x, y: pos.y - this.nodeHeight / 2 };
+        }
+    }
+    
+    getRightPoint(pos, node) {
+        if (!node) return { x: pos.x + this.nodeWidth / 2, y: pos.y };
+        
+        switch (node.type) {
+            case 'condition':
+                return { x: pos.x + this.conditionSize, y: pos.y };
+            case 'loop':
+                return { x: pos.x + this.hexWidth / 2, y: pos.y };
+            default:
+                return { x: pos.x + this.nodeWidth / 2, y: pos.y };
+        }
+    }
+    
+    getLeftPoint(pos, node) {
+        if (!node) return { x: pos.x - this.nodeWidth / 2, y: pos.y };
+        
+        switch (node.type) {
+            case 'condition':
+                return { x: pos.x - this.conditionSize, y: pos.y };
+            case 'loop':
+                return { x: pos.x - this.hexWidth / 2, y: pos.y };
+            default:
+                return { x: pos.x - this.nodeWidth / 2, y: pos.y };
+        }
+    }
+}
+
+// Номера типов узлов и веток компактного формата - как в static/py/wire_format.py
+FlowchartLayout.NODE_TYPES = ['start', 'end', 'process', 'condition', 'loop', 'input', 'output',
+                              'method', 'class_start', 'try_start', 'except', 'finally'];
+FlowchartLayout.BRANCHES = ['', 'yes', 'no', 'from_no', 'loop_back', 'loop_body', 'loop_exit', 'exception'];
+
+self.FlowchartLayout = FlowchartLayout;
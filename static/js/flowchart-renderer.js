@@ -4,25 +4,16 @@
  * Все стрелки входят в блоки СВЕРХУ с видимым вертикальным сегментом
  * Циклы: шестиугольник, выход СПРАВА, обратная связь СЛЕВА
  * Условия: ромб, "да" вниз, "нет" вправо
+ * 
+ * Раскладка и пути рёбер - FlowchartLayout (flowchart-layout.js), здесь - только SVG
  */
-class FlowchartRenderer {
+class FlowchartRenderer extends FlowchartLayout {
     constructor(container) {
+        super();
         this.container = container;
         this.svg = null;
-        this.nodePositions = new Map();
-        this.edgeOffsets = new Map(); // Для отслеживания смещений множественных линий
-        
-        // Размеры
-        this.nodeWidth = 180;
-        this.nodeHeight = 40;
-        this.conditionSize = 45;
-        this.hexWidth = 180;
-        this.hexHeight = 40;
-        this.verticalGap = 70;
-        this.horizontalGap = 200;  // Увеличен для избежания перекрытий
-        this.padding = 80;
-        this.loopLeftOffset = 50;
-        this.arrowGap = 25;
+        this.markers = new Map();      // id маркера стрелки -> цвет
+        this.usedShapes = new Set();   // фигуры узлов, нужные в <defs>
         
         // Цвета
         this.colors = {
@@ -52,800 +43,262 @@ class FlowchartRenderer {
         return this.colors.lines.default;
     }
     
-    // Получить смещение для линии к узлу (чтобы множественные линии не накладывались)
-    getEdgeOffset(toId, branch) {
-        const key = `${toId}-${branch || 'default'}`;
-        if (!this.edgeOffsets.has(key)) {
-            this.edgeOffsets.set(key, 0);
-        }
-        const offset = this.edgeOffsets.get(key);
-        this.edgeOffsets.set(key, offset + 8); // Каждая следующая линия смещена на 8px
-        return offset;
-    }
-    
     render(flowchartData) {
-        if (!flowchartData || !flowchartData.nodes || flowchartData.nodes.length === 0) {
-            this.container.innerHTML = '<p class="no-data">Нет данных</p>';
-            return { width: 400, height: 200 };
-        }
-        
-        this.container.innerHTML = '';
-        this.nodePositions.clear();
-        this.edgeOffsets.clear(); // Очищаем смещения
-        
-        const { nodes, edges } = flowchartData;
-        
-        this.buildGraph(nodes, edges);
-        
-        const isClassDiagram = nodes.some(n => n.type === 'class_start');
-        
-        if (isClassDiagram) {
-            this.calculateClassPositions(nodes, edges);
-        } else {
-            this.calculatePositions(nodes, edges);
-        }
-        
-        const bounds = this.getBounds(nodes);
-        
-        this.svg = document.createElementNS('http://www.w3.org/2000/svg', 'svg');
-        this.svg.setAttribute('width', bounds.width);
-        this.svg.setAttribute('height', bounds.height);
-        this.svg.setAttribute('viewBox', `0 0 ${bounds.width} ${bounds.height}`);
-        
-        this.addArrowMarker();
-        
-        edges.forEach(edge => this.drawEdge(edge, nodes));
-        nodes.forEach(node => this.drawNode(node));
-        
-        this.container.appendChild(this.svg);
-        
-        return { width: bounds.width, height: bounds.height };
+        flowchartData = FlowchartRenderer.decode(flowchartData);
+        if (!this.hasNodes(flowchartData)) return this.drawEmpty();
+        return this.draw(flowchartData, this.computeLayout(flowchartData));
     }
     
-    buildGraph(nodes, edges) {
-        this.children = new Map();
-        this.parents = new Map();
-        
-        nodes.forEach(n => {
-            this.children.set(n.id, []);
-            this.parents.set(n.id, []);
-        });
-        
-        edges.forEach(e => {
-            this.children.get(e.from)?.push({ to: e.to, branch: e.branch, label: e.label });
-            this.parents.get(e.to)?.push({ from: e.from, branch: e.branch });
-        });
+    // Раскладка в пуле воркеров (LayoutWorkerPool), на странице - только создание SVG
+    async renderAsync(flowchartData, pool) {
+        const decoded = FlowchartRenderer.decode(flowchartData);
+        if (!this.hasNodes(decoded)) return this.drawEmpty();
+        const layout = await pool.layout(flowchartData);
+        return this.draw(decoded, FlowchartLayout.unpack(decoded.nodes, layout));
     }
     
-    calculateClassPositions(nodes, edges) {
-        const classNode = nodes.find(n => n.type === 'class_start');
-        const fieldsNode = nodes.find(n => n.type === 'input');
-        const methodNodes = nodes.filter(n => n.type === 'method');
-        
-        const centerX = 300;
-        let y = this.padding;
-        
-        if (classNode) {
-            this.nodePositions.set(classNode.id, { x: centerX, y });
-            y += this.nodeHeight + this.verticalGap;
-        }
-        
-        if (fieldsNode) {
-            this.nodePositions.set(fieldsNode.id, { x: centerX, y });
-            y += this.nodeHeight + this.verticalGap;
-        }
-        
-        if (methodNodes.length > 0) {
-            const totalWidth = (methodNodes.length - 1) * (this.nodeWidth + 30);
-            let startX = centerX - totalWidth / 2;
-            
-            methodNodes.forEach((method, i) => {
-                this.nodePositions.set(method.id, { 
-                    x: startX + i * (this.nodeWidth + 30), 
-                    y 
-                });
-            });
-        }
+    hasNodes(flowchartData) {
+        return Boolean(flowchartData && flowchartData.nodes && flowchartData.nodes.length > 0);
     }
     
-    calculatePositions(nodes, edges) {
-        let startNode = nodes.find(n => n.type === 'start');
-        if (!startNode) startNode = nodes[0];
-        if (!startNode) return;
-        
-        const endNode = nodes.find(n => n.type === 'end');
-        const positioned = new Set();
-        const centerX = 350;
-        
-        // Позиционируем все узлы кроме end
-        const maxY = this.positionNode(startNode.id, centerX, this.padding, nodes, positioned, new Set(), endNode?.id);
-        
-        // End всегда в самом низу по центру
-        if (endNode && !positioned.has(endNode.id)) {
-            this.nodePositions.set(endNode.id, { 
-                x: centerX, 
-                y: maxY + this.verticalGap + this.nodeHeight 
-            });
-            positioned.add(endNode.id);
-        }
+    drawEmpty() {
+        this.container.innerHTML = '<p class="no-data">Нет данных</p>';
+        return { width: 400, height: 200 };
     }
     
-    positionNode(nodeId, x, y, nodes, positioned, visiting, endNodeId) {
-        // Пропускаем end - он будет позиционирован отдельно
-        if (nodeId === endNodeId) {
-            return y;
-        }
-        
-        if (positioned.has(nodeId)) {
-            return this.nodePositions.get(nodeId)?.y || y;
-        }
-        
-        if (visiting.has(nodeId)) {
-            return y;
-        }
-        visiting.add(nodeId);
-        
-        const node = nodes.find(n => n.id === nodeId);
-        if (!node) return y;
-        
-        this.nodePositions.set(nodeId, { x, y });
-        positioned.add(nodeId);
-        
-        const children = this.children.get(nodeId) || [];
-        const forwardChildren = children.filter(c => c.branch !== 'loop_back' && c.to !== endNodeId);
-        
-        let maxY = y;
-        const nodeH = this.getNodeFullHeight(node);
-        
-        // Условие (if)
-        if (node.type === 'condition') {
-            const yesChild = forwardChildren.find(c => c.branch === 'yes');
-            const noChild = forwardChildren.find(c => c.branch === 'no');
-            const otherChildren = forwardChildren.filter(c => c.branch !== 'yes' && c.branch !== 'no');
-            
-            // Ветка "да" - вниз
-            if (yesChild && !positioned.has(yesChild.to)) {
-                const yesY = this.positionNode(
-                    yesChild.to, x, y + this.verticalGap + nodeH,
-                    nodes, positioned, new Set(visiting), endNodeId
-                );
-                maxY = Math.max(maxY, yesY);
-            }
-            
-            // Ветка "нет" - вправо
-            if (noChild && !positioned.has(noChild.to)) {
-                const noX = x + this.horizontalGap + this.nodeWidth / 2;
-                const noY = this.positionNode(
-                    noChild.to, noX, y,
-                    nodes, positioned, new Set(visiting), endNodeId
-                );
-                maxY = Math.max(maxY, noY);
-            }
-            
-            // Другие дети
-            otherChildren.forEach(child => {
-                if (!positioned.has(child.to)) {
-                    const exitY = this.positionNode(
-                        child.to, x, maxY + this.verticalGap + this.nodeHeight,
-                        nodes, positioned, new Set(visiting), endNodeId
-                    );
-                    maxY = Math.max(maxY, exitY);
-                }
-            });
-            
-            return maxY;
-        }
-        
-        // Цикл (loop)
-        if (node.type === 'loop') {
-            const bodyChild = forwardChildren.find(c => c.branch === 'loop_body');
-            const exitChildren = forwardChildren.filter(c => c.branch !== 'loop_body');
-            
-            if (bodyChild && !positioned.has(bodyChild.to)) {
-                const bodyY = this.positionNode(
-                    bodyChild.to, x, y + this.verticalGap + nodeH,
-                    nodes, positioned, new Set(visiting), endNodeId
-                );
-                maxY = Math.max(maxY, bodyY);
-            }
-            
-            exitChildren.forEach(child => {
-                if (!positioned.has(child.to)) {
-                    const exitY = this.positionNode(
-                        child.to, x, maxY + this.verticalGap + this.nodeHeight,
-                        nodes, positioned, new Set(visiting), endNodeId
-                    );
-                    maxY = Math.max(maxY, exitY);
-                }
-            });
-            
-            return maxY;
-        }
-        
-        // Обычный узел
-        let nextY = y + this.verticalGap + nodeH;
-        
-        forwardChildren.forEach(child => {
-            if (!positioned.has(child.to)) {
-                const childY = this.positionNode(
-                    child.to, x, nextY,
-                    nodes, positioned, new Set(visiting), endNodeId
-                );
-                maxY = Math.max(maxY, childY);
-                nextY = maxY + this.verticalGap + this.nodeHeight;
-            }
-        });
-        
-        return Math.max(y, maxY);
+    // Отрисовка готовой раскладки (computeLayout или unpack): SVG собирается строкой
+    // и вставляется в контейнер одной операцией
+    draw(flowchartData, layout) {
+        const { nodes, edges } = flowchartData;
+        const { width, height } = layout;
+        this.nodePositions = layout.positions;
+        this.markers.clear();
+        this.usedShapes.clear();
+        
+        // Общие атрибуты связей и текстов узлов - на группах, а не на каждом элементе
+        const out = ['<g fill="none" stroke-width="2">'];
+        edges.forEach((edge, i) => this.drawEdge(out, edge, layout.paths[i]));
+        out.push(`</g><g text-anchor="middle" font-family="Arial, sans-serif" font-size="11" fill="${this.colors.text}">`);
+        nodes.forEach(node => this.drawNode(out, node));
+        out.push('</g>');
+        
+        // Маркеры и фигуры собраны по ходу отрисовки - в <defs> только нужные
+        const head = [`<svg xmlns="http://www.w3.org/2000/svg" width="${width}" height="${height}" viewBox="0 0 ${width} ${height}"><defs>`];
+        this.markers.forEach((color, id) => head.push(this.createArrowMarker(id, color)));
+        this.usedShapes.forEach(shape => head.push(`<symbol id="shape-${shape}" overflow="visible">${this.createShape(shape)}</symbol>`));
+        head.push('</defs>');
+        
+        this.container.innerHTML = head.join('') + out.join('') + '</svg>';
+        this.svg = this.container.firstElementChild;
+        
+        return { width, height };
     }
     
-    getNodeFullHeight(node) {
-        if (node.type === 'condition') return this.conditionSize * 2;
-        if (node.type === 'loop') return this.hexHeight;
-        if (node.type === 'end') return 30;
-        return this.nodeHeight;
+    createArrowMarker(markerId, color) {
+        return `<marker id="${markerId}" viewBox="0 0 10 10" refX="9" refY="5" markerWidth="6" markerHeight="6" orient="auto-start-reverse">` +
+            `<path d="M 0 0 L 10 5 L 0 10 z" fill="${color}"/></marker>`;
     }
     
-    getBounds(nodes) {
-        let minX = Infinity, maxX = -Infinity;
-        let minY = Infinity, maxY = -Infinity;
-        
-        this.nodePositions.forEach(pos => {
-            minX = Math.min(minX, pos.x - this.nodeWidth / 2 - this.loopLeftOffset);
-            maxX = Math.max(maxX, pos.x + this.nodeWidth / 2 + this.horizontalGap);
-            minY = Math.min(minY, pos.y - this.nodeHeight - 30);
-            maxY = Math.max(maxY, pos.y + this.nodeHeight + 30);
-        });
-        
-        if (!isFinite(minX)) return { width: 600, height: 400 };
+    // === ОТРИСОВКА УЗЛОВ ===
+    
+    // Узел - ссылка <use> на фигуру из <defs> и подпись
+    drawNode(out, node) {
+        const pos = this.nodePositions.get(node.id);
+        if (!pos) return;
         
-        const offsetX = this.padding - minX;
-        const offsetY = this.padding - minY;
+        const shape = this.getNodeShape(node.type);
+        this.usedShapes.add(shape);
+        // Составной узел (FlowchartHierarchy) сворачивается и раскрывается щелчком
+        const owner = node.hidden === undefined ? '' : ` data-node="${node.id}"`;
+        out.push(`<use href="#shape-${shape}" x="${pos.x}" y="${pos.y}"${owner}/>`);
         
-        this.nodePositions.forEach(pos => {
-            pos.x += offsetX;
-            pos.y += offsetY;
-        });
+        if (shape !== 'end') {
+            this.createText(out, pos.x, pos.y, node.text, this.getTextWidth(node.type));
+        }
         
-        return {
-            width: Math.max(500, (maxX - minX) + this.padding * 2),
-            height: Math.max(300, (maxY - minY) + this.padding * 2)
-        };
+        const badge = this.getBadge(node, pos);
+        if (badge) {
+            out.push(`<g${owner}><rect x="${badge.x - badge.width / 2}" y="${badge.y - badge.height / 2}" ` +
+                `width="${badge.width}" height="${badge.height}" rx="${badge.height / 2}" fill="${this.colors.stroke}"/>` +
+                `<text x="${badge.x}" y="${badge.y}" dominant-baseline="central" font-size="10" font-weight="bold" fill="white">${badge.text}</text></g>`);
+        }
     }
     
-    addArrowMarker() {
-        const defs = document.createElementNS('http://www.w3.org/2000/svg', 'defs');
-        
-        const marker = document.createElementNS('http://www.w3.org/2000/svg', 'marker');
-        marker.setAttribute('id', 'arrow');
-        marker.setAttribute('markerWidth', '10');
-        marker.setAttribute('markerHeight', '10');
-        marker.setAttribute('refX', '9');
-        marker.setAttribute('refY', '3');
-        marker.setAttribute('orient', 'auto');
-        
-        const polygon = document.createElementNS('http://www.w3.org/2000/svg', 'polygon');
-        polygon.setAttribute('points', '0 0, 10 3, 0 6');
-        polygon.setAttribute('fill', this.colors.stroke);
-        
-        marker.appendChild(polygon);
-        defs.appendChild(marker);
-        this.svg.appendChild(defs);
+    // Значок "+N" в правом верхнем углу свёрнутого узла: N - сколько узлов спрятано
+    getBadge(node, pos) {
+        if (!node.hidden) return null;
+        const text = `+${node.hidden}`;
+        const [w, top] = this.getNodeExtent(node.type);
+        return { x: pos.x + w, y: pos.y - top, width: 10 + text.length * 6, height: 16, text };
     }
     
-    // === ОТРИСОВКА УЗЛОВ ===
+    // Узел под событием мыши (id) или null
+    getNodeAt(event) {
+        const element = event.target.closest && event.target.closest('[data-node]');
+        return element ? Number(element.dataset.node) : null;
+    }
     
-    drawNode(node) {
-        const pos = this.nodePositions.get(node.id);
-        if (!pos) return;
-        
-        const g = document.createElementNS('http://www.w3.org/2000/svg', 'g');
-        
-        switch (node.type) {
+    getNodeShape(type) {
+        switch (type) {
             case 'start':
             case 'class_start':
-                this.drawTerminator(g, pos.x, pos.y, node.text, true);
-                break;
+                return 'start';
             case 'end':
-                this.drawEndSymbol(g, pos.x, pos.y);
-                break;
-            case 'process':
-                this.drawRectangle(g, pos.x, pos.y, node.text);
-                break;
+                return 'end';
+            case 'method':
+                return 'terminator';
             case 'input':
             case 'output':
-                this.drawParallelogram(g, pos.x, pos.y, node.text);
-                break;
+                return 'parallelogram';
             case 'condition':
-                this.drawDiamond(g, pos.x, pos.y, node.text);
-                break;
+                return 'diamond';
             case 'loop':
-                this.drawHexagon(g, pos.x, pos.y, node.text);
-                break;
-            case 'method':
-                this.drawTerminator(g, pos.x, pos.y, node.text, false);
-                break;
+                return 'hexagon';
             case 'try_start':
             case 'except':
             case 'finally':
-                this.drawRectangle(g, pos.x, pos.y, node.text, true);
-                break;
+                return 'dashed';
             default:
-                this.drawRectangle(g, pos.x, pos.y, node.text);
+                return 'rectangle';
         }
-        
-        this.svg.appendChild(g);
     }
     
-    drawTerminator(g, x, y, text, withCircle = false) {
-        if (withCircle) {
-            const circle = document.createElementNS('http://www.w3.org/2000/svg', 'circle');
-            circle.setAttribute('cx', x);
-            circle.setAttribute('cy', y - this.nodeHeight / 2 - 15);
-            circle.setAttribute('r', 8);
-            circle.setAttribute('fill', this.colors.stroke);
-            g.appendChild(circle);
-        }
-        
-        const rect = document.createElementNS('http://www.w3.org/2000/svg', 'rect');
-        rect.setAttribute('x', x - this.nodeWidth / 2);
-        rect.setAttribute('y', y - this.nodeHeight / 2);
-        rect.setAttribute('width', this.nodeWidth);
-        rect.setAttribute('height', this.nodeHeight);
-        rect.setAttribute('rx', this.nodeHeight / 2);
-        rect.setAttribute('fill', this.colors.fill);
-        rect.setAttribute('stroke', this.colors.stroke);
-        rect.setAttribute('stroke-width', '2');
-        g.appendChild(rect);
-        
-        g.appendChild(this.createText(x, y, text));
+    getTextWidth(type) {
+        if (type === 'condition') return this.conditionSize * 1.6;
+        if (type === 'loop') return this.hexWidth - 50;
+        return 160;
     }
     
-    drawEndSymbol(g, x, y) {
-        const size = 15;
-        const outer = document.createElementNS('http://www.w3.org/2000/svg', 'polygon');
-        outer.setAttribute('points', `${x},${y-size} ${x+size},${y} ${x},${y+size} ${x-size},${y}`);
-        outer.setAttribute('fill', 'white');
-        outer.setAttribute('stroke', this.colors.stroke);
-        outer.setAttribute('stroke-width', '2');
-        g.appendChild(outer);
-        
-        const inner = document.createElementNS('http://www.w3.org/2000/svg', 'circle');
-        inner.setAttribute('cx', x);
-        inner.setAttribute('cy', y);
-        inner.setAttribute('r', 6);
-        inner.setAttribute('fill', this.colors.stroke);
-        g.appendChild(inner);
-    }
-    
-    drawRectangle(g, x, y, text, dashed = false) {
-        const rect = document.createElementNS('http://www.w3.org/2000/svg', 'rect');
-        rect.setAttribute('x', x - this.nodeWidth / 2);
-        rect.setAttribute('y', y - this.nodeHeight / 2);
-        rect.setAttribute('width', this.nodeWidth);
-        rect.setAttribute('height', this.nodeHeight);
-        rect.setAttribute('fill', this.colors.fill);
-        rect.setAttribute('stroke', this.colors.stroke);
-        rect.setAttribute('stroke-width', '2');
-        if (dashed) rect.setAttribute('stroke-dasharray', '5,3');
-        g.appendChild(rect);
-        
-        g.appendChild(this.createText(x, y, text));
+    // [полуширина, выше центра, ниже центра] фигуры узла
+    getNodeExtent(type) {
+        const h = this.nodeHeight / 2;
+        switch (type) {
+            case 'start':
+            case 'class_start':
+                return [this.nodeWidth / 2, h + 23, h];  // кружок над блоком
+            case 'end':
+                return [15, 15, 15];
+            case 'condition':
+                return [this.conditionSize, this.conditionSize, this.conditionSize];
+            case 'loop':
+                return [this.hexWidth / 2, this.hexHeight / 2, this.hexHeight / 2];
+            case 'input':
+            case 'output':
+                return [this.nodeWidth / 2 + 15, h, h];  // скос параллелограмма
+            default:
+                return [this.nodeWidth / 2, h, h];
+        }
     }
     
-    drawParallelogram(g, x, y, text) {
+    // Фигура узла с центром в (0, 0) - содержимое <symbol>
+    createShape(shape) {
+        const style = `fill="${this.colors.fill}" stroke="${this.colors.stroke}" stroke-width="2"`;
         const w = this.nodeWidth / 2;
         const h = this.nodeHeight / 2;
-        const skew = 15;
-        
-        const points = [
-            `${x - w + skew},${y - h}`,
-            `${x + w + skew},${y - h}`,
-            `${x + w - skew},${y + h}`,
-            `${x - w - skew},${y + h}`
-        ].join(' ');
+        const rect = `x="${-w}" y="${-h}" width="${this.nodeWidth}" height="${this.nodeHeight}"`;
         
-        const poly = document.createElementNS('http://www.w3.org/2000/svg', 'polygon');
-        poly.setAttribute('points', points);
-        poly.setAttribute('fill', this.colors.fill);
-        poly.setAttribute('stroke', this.colors.stroke);
-        poly.setAttribute('stroke-width', '2');
-        g.appendChild(poly);
-        
-        g.appendChild(this.createText(x, y, text));
-    }
-    
-    drawDiamond(g, x, y, text) {
-        const size = this.conditionSize;
-        const points = `${x},${y-size} ${x+size},${y} ${x},${y+size} ${x-size},${y}`;
-        
-        const poly = document.createElementNS('http://www.w3.org/2000/svg', 'polygon');
-        poly.setAttribute('points', points);
-        poly.setAttribute('fill', this.colors.fill);
-        poly.setAttribute('stroke', this.colors.stroke);
-        poly.setAttribute('stroke-width', '2');
-        g.appendChild(poly);
-        
-        g.appendChild(this.createText(x, y, text, size * 1.6));
+        switch (shape) {
+            case 'start':
+                return `<circle cx="0" cy="${-h - 15}" r="8" fill="${this.colors.stroke}"/>` + this.createShape('terminator');
+            case 'terminator':
+                return `<rect ${rect} rx="${h}" ${style}/>`;
+            case 'end': {
+                const size = 15;
+                return `<polygon points="0,${-size} ${size},0 0,${size} ${-size},0" fill="white" stroke="${this.colors.stroke}" stroke-width="2"/>` +
+                    `<circle cx="0" cy="0" r="6" fill="${this.colors.stroke}"/>`;
+            }
+            case 'parallelogram': {
+                const skew = 15;
+                return this.createPolygon([-w + skew, -h, w + skew, -h, w - skew, h, -w - skew, h], style);
+            }
+            case 'diamond': {
+                const size = this.conditionSize;
+                return this.createPolygon([0, -size, size, 0, 0, size, -size, 0], style);
+            }
+            case 'hexagon': {
+                const hw = this.hexWidth / 2;
+                const hh = this.hexHeight / 2;
+                const cut = 20;
+                return this.createPolygon([-hw + cut, -hh, hw - cut, -hh, hw, 0, hw - cut, hh, -hw + cut, hh, -hw, 0], style);
+            }
+            case 'dashed':
+                return `<rect ${rect} ${style} stroke-dasharray="5,3"/>`;
+            default:
+                return `<rect ${rect} ${style}/>`;
+        }
     }
     
-    drawHexagon(g, x, y, text) {
-        const w = this.hexWidth / 2;
-        const h = this.hexHeight / 2;
-        const cut = 20;
-        
-        const points = [
-            `${x - w + cut},${y - h}`,
-            `${x + w - cut},${y - h}`,
-            `${x + w},${y}`,
-            `${x + w - cut},${y + h}`,
-            `${x - w + cut},${y + h}`,
-            `${x - w},${y}`
-        ].join(' ');
-        
-        const poly = document.createElementNS('http://www.w3.org/2000/svg', 'polygon');
-        poly.setAttribute('points', points);
-        poly.setAttribute('fill', this.colors.fill);
-        poly.setAttribute('stroke', this.colors.stroke);
-        poly.setAttribute('stroke-width', '2');
-        g.appendChild(poly);
-        
-        g.appendChild(this.createText(x, y, text, this.hexWidth - 50));
+    createPolygon(coords, style) {
+        const points = [];
+        for (let i = 0; i < coords.length; i += 2) points.push(`${coords[i]},${coords[i + 1]}`);
+        return `<polygon points="${points.join(' ')}" ${style}/>`;
     }
     
     // === ОТРИСОВКА СВЯЗЕЙ ===
     
-    drawEdge(edge, nodes) {
-        const fromPos = this.nodePositions.get(edge.from);
-        const toPos = this.nodePositions.get(edge.to);
-        if (!fromPos || !toPos) return;
-        
-        const fromNode = nodes.find(n => n.id === edge.from);
-        const toNode = nodes.find(n => n.id === edge.to);
-        
-        const path = this.calculatePath(fromPos, toPos, fromNode, toNode, edge);
+    drawEdge(out, edge, path) {
+        if (!path) return;
         const lineColor = this.getLineColor(edge);
         
-        const pathEl = document.createElementNS('http://www.w3.org/2000/svg', 'path');
-        pathEl.setAttribute('d', path);
-        pathEl.setAttribute('fill', 'none');
-        pathEl.setAttribute('stroke', lineColor);
-        pathEl.setAttribute('stroke-width', '2');
-        
-        // Создаём уникальный маркер для каждого цвета
+        // Свой маркер для каждого цвета; id - в Map, без поиска по SVG
         const markerId = `arrow-${lineColor.replace('#', '')}`;
-        this.ensureArrowMarker(markerId, lineColor);
-        pathEl.setAttribute('marker-end', `url(#${markerId})`);
-        
-        this.svg.appendChild(pathEl);
+        this.markers.set(markerId, lineColor);
+        out.push(`<path d="${path}" stroke="${lineColor}" marker-end="url(#${markerId})"/>`);
         
         if (edge.label) {
-            this.drawEdgeLabel(fromPos, toPos, fromNode, toNode, edge, lineColor);
+            this.drawEdgeLabel(out, this.nodePositions.get(edge.from), edge, lineColor);
         }
     }
     
-    ensureArrowMarker(markerId, color) {
-        // Проверяем, существует ли уже такой маркер
-        if (this.svg.querySelector(`#${markerId}`)) return;
-        
-        const defs = this.svg.querySelector('defs') || (() => {
-            const d = document.createElementNS('http://www.w3.org/2000/svg', 'defs');
-            this.svg.insertBefore(d, this.svg.firstChild);
-            return d;
-        })();
-        
-        const marker = document.createElementNS('http://www.w3.org/2000/svg', 'marker');
-        marker.setAttribute('id', markerId);
-        marker.setAttribute('viewBox', '0 0 10 10');
-        marker.setAttribute('refX', '9');
-        marker.setAttribute('refY', '5');
-        marker.setAttribute('markerWidth', '6');
-        marker.setAttribute('markerHeight', '6');
-        marker.setAttribute('orient', 'auto-start-reverse');
-        
-        const path = document.createElementNS('http://www.w3.org/2000/svg', 'path');
-        path.setAttribute('d', 'M 0 0 L 10 5 L 0 10 z');
-        path.setAttribute('fill', color);
-        
-        marker.appendChild(path);
-        defs.appendChild(marker);
-    }
-    
-    calculatePath(from, to, fromNode, toNode, edge) {
-        // Получаем точки выхода и входа
-        const fromBottom = this.getBottomPoint(from, fromNode);
-        const fromRight = this.getRightPoint(from, fromNode);
-        const fromLeft = this.getLeftPoint(from, fromNode);
-        const toTop = this.getTopPoint(to, toNode);
-        const toLeft = this.getLeftPoint(to, toNode);
-        
-        // Веер от полей класса к методам
-        if (edge.branch?.startsWith('fan_')) {
-            const x1 = from.x;
-            const y1 = fromBottom.y;
-            const x2 = to.x;
-            const y2 = toTop.y;
-            
-            const midY = y1 + (y2 - y1) / 3;
-            return `M ${x1} ${y1} L ${x1} ${midY} L ${x2} ${midY} L ${x2} ${y2}`;
-        }
-        
-        // Обратная связь цикла - СЛЕВА от блока к циклу выше
-        if (edge.branch === 'loop_back') {
-            // Левая точка источника
-            const x1 = fromLeft.x;
-            const y1 = fromLeft.y;
-            
-            // Левая точка цели (цикл)
-            const x2 = toLeft.x;
-            const y2 = toLeft.y;
-            
-            // Общая X координата для вертикальной линии (слева от обоих блоков)
-            const loopX = Math.min(x1, x2) - this.loopLeftOffset;
-            
-            // Путь: влево от блока → вверх → вправо к циклу
-            return `M ${x1} ${y1} L ${loopX} ${y1} L ${loopX} ${y2} L ${x2} ${y2}`;
-        }
-        
-        // Тело цикла - вниз
-        if (edge.branch === 'loop_body') {
-            const x1 = fromBottom.x;
-            const y1 = fromBottom.y;
-            const x2 = toTop.x;
-            const y2 = toTop.y;
-            
-            // Прямая линия вниз с небольшим отступом
-            if (Math.abs(x1 - x2) < 5) {
-                return `M ${x1} ${y1} L ${x2} ${y2}`;
-            }
-            // Если не по центру - с изломом
-            const midY = y1 + this.arrowGap;
-            return `M ${x1} ${y1} L ${x1} ${midY} L ${x2} ${midY} L ${x2} ${y2}`;
-        }
-        
-        // Выход из цикла - СПРАВА и потом ВНИЗ к центру следующего блока
-        if (edge.branch === 'loop_exit' || (fromNode?.type === 'loop' && !edge.branch)) {
-            const x1 = fromRight.x;
-            const y1 = fromRight.y;
-            const x2 = toTop.x;
-            const y2 = toTop.y;
-            
-            // Если цель ниже - идём справа вниз
-            if (y2 > y1) {
-                const rightX = from.x + this.horizontalGap;
-                const approachY = y2 - this.arrowGap;
-                return `M ${x1} ${y1} L ${rightX} ${y1} L ${rightX} ${approachY} L ${x2} ${approachY} L ${x2} ${y2}`;
-            }
-            
-            // Иначе просто вправо
-            return `M ${x1} ${y1} L ${x2} ${y1} L ${x2} ${y2}`;
-        }
-        
-        // "да" от условия - ВНИЗ или ВВЕРХ (для do-while)
+    // Точка подписи ребра у узла from (null - у этой ветки подписи нет)
+    getEdgeLabelPoint(from, edge) {
         if (edge.branch === 'yes') {
-            const x1 = fromBottom.x;
-            const y1 = fromBottom.y;
-            const x2 = toTop.x;
-            const y2 = toTop.y;
-            
-            // Если цель ВЫШЕ источника (do-while) - идём слева обходом
-            if (to.y < from.y) {
-                const leftX1 = this.getLeftPoint(from, fromNode).x;
-                const leftX2 = this.getLeftPoint(to, toNode).x;
-                const loopX = Math.min(leftX1, leftX2) - this.loopLeftOffset;
-                const y1Left = from.y;  // Выходим слева от ромба
-                const y2Left = to.y;    // Входим слева в целевой блок
-                
-                return `M ${leftX1} ${y1Left} L ${loopX} ${y1Left} L ${loopX} ${y2Left} L ${leftX2} ${y2Left}`;
-            }
-            
-            // Цель ниже - обычная отрисовка вниз
-            if (Math.abs(x1 - x2) < 5) {
-                return `M ${x1} ${y1} L ${x2} ${y2}`;
-            }
-            const midY = y1 + this.arrowGap;
-            return `M ${x1} ${y1} L ${x1} ${midY} L ${x2} ${midY} L ${x2} ${y2}`;
+            return { x: from.x - 20, y: from.y + this.conditionSize + 18 };
         }
-        
-        // "нет" от условия - ВПРАВО к следующему блоку
         if (edge.branch === 'no') {
-            const x1 = fromRight.x;
-            const y1 = fromRight.y;
-            const x2 = toTop.x;
-            const y2 = toTop.y;
-            const toLeft = this.getLeftPoint(to, toNode);
-            
-            // Если цель справа - горизонтальная линия к левой стороне цели
-            if (to.x > from.x) {
-                // Если цель на том же уровне или близко - просто горизонталь
-                if (Math.abs(y1 - to.y) < this.verticalGap) {
-                    return `M ${x1} ${y1} L ${toLeft.x} ${toLeft.y}`;
-                }
-                // Цель ниже справа - вправо, потом вниз, потом к цели
-                if (to.y > from.y) {
-                    const midX = (x1 + toLeft.x) / 2;
-                    return `M ${x1} ${y1} L ${midX} ${y1} L ${midX} ${toLeft.y} L ${toLeft.x} ${toLeft.y}`;
-                }
-            }
-            
-            // Цель ниже слева - обходим справа
-            const rightX = Math.max(from.x, to.x) + this.horizontalGap;
-            const approachY = y2 - this.arrowGap;
-            
-            return `M ${x1} ${y1} L ${rightX} ${y1} L ${rightX} ${approachY} L ${x2} ${approachY} L ${x2} ${y2}`;
+            return { x: from.x + this.conditionSize + 8, y: from.y - 8 };
         }
-        
-        // Выход из ветки "нет" к следующему блоку - обходим справа
-        if (edge.branch === 'from_no') {
-            const x1 = fromRight.x;
-            const y1 = fromRight.y;
-            const x2 = toTop.x;
-            const y2 = toTop.y;
-            
-            // Получаем смещение для этой линии
-            const offset = this.getEdgeOffset(edge.to, 'from_no');
-            
-            // Вычисляем правую границу для обхода с учётом смещения
-            const rightOffset = this.horizontalGap + offset;
-            const bypassX = Math.max(from.x + rightOffset, x2 + this.nodeWidth / 2 + this.arrowGap + offset);
-            
-            // Спускаемся вниз справа, затем к целевому блоку сверху
-            const approachY = y2 - this.arrowGap - offset;
-            
-            return `M ${x1} ${y1} L ${bypassX} ${y1} L ${bypassX} ${approachY} L ${x2} ${approachY} L ${x2} ${y2}`;
-        }
-        
-        // Исключение
         if (edge.branch === 'exception') {
-            const x1 = from.x + this.nodeWidth / 2;
-            const y1 = from.y;
-            const x2 = toTop.x;
-            const y2 = toTop.y;
-            
-            const midX = x1 + this.arrowGap;
-            const topY = y2 - this.arrowGap;
-            return `M ${x1} ${y1} L ${midX} ${y1} L ${midX} ${topY} L ${x2} ${topY} L ${x2} ${y2}`;
-        }
-        
-        // Связь к END - всегда идёт вниз к центру end
-        if (toNode?.type === 'end') {
-            const x1 = fromBottom.x;
-            const y1 = fromBottom.y;
-            const x2 = to.x;
-            const y2 = toTop.y;
-            
-            // Проверяем что y2 > y1 (end ниже источника)
-            if (y2 <= y1) {
-                // End выше или на уровне - это ошибка позиционирования, просто рисуем
-                return `M ${x1} ${y1} L ${x2} ${y2}`;
-            }
-            
-            // Горизонтальная линия на уровне чуть выше end, потом вниз
-            const approachY = y2 - this.arrowGap;
-            
-            // Если блоки далеко по горизонтали
-            if (Math.abs(from.x - to.x) > 30) {
-                return `M ${x1} ${y1} L ${x1} ${approachY} L ${x2} ${approachY} L ${x2} ${y2}`;
-            }
-            
-            // Примерно по центру - прямо вниз
-            return `M ${x1} ${y1} L ${x2} ${y2}`;
-        }
-        
-        // Обычная связь - ВНИЗ с гарантированным вертикальным входом
-        const x1 = fromBottom.x;
-        const y1 = fromBottom.y;
-        const x2 = toTop.x;
-        const y2 = toTop.y;
-        
-        // Если на одной линии - просто вертикаль
-        if (Math.abs(x1 - x2) < 5) {
-            return `M ${x1} ${y1} L ${x2} ${y2}`;
-        }
-        
-        // Иначе - с изломом, и обязательно входим сверху
-        const midY = y1 + this.arrowGap;
-        const topY = y2 - this.arrowGap;
-        
-        return `M ${x1} ${y1} L ${x1} ${midY} L ${x2} ${midY} L ${x2} ${y2}`;
-    }
-    
-    // Точки выхода/входа для разных типов узлов
-    getBottomPoint(pos, node) {
-        if (!node) return { x: pos.x, y: pos.y + this.nodeHeight / 2 };
-        
-        switch (node.type) {
-            case 'condition':
-                return { x: pos.x, y: pos.y + this.conditionSize };
-            case 'loop':
-                return { x: pos.x, y: pos.y + this.hexHeight / 2 };
-            case 'end':
-                return { x: pos.x, y: pos.y + 15 };
-            default:
-                return { x: pos.x, y: pos.y + this.nodeHeight / 2 };
+            return { x: from.x + this.nodeWidth / 2 + 8, y: from.y - 8 };
         }
+        return null;
     }
     
-    getTopPoint(pos, node) {
-        if (!node) return { x: pos.x, y: pos.y - this.nodeHeight / 2 };
+    drawEdgeLabel(out, from, edge, lineColor) {
+        const point = this.getEdgeLabelPoint(from, edge);
+        if (!point) return;
         
-        switch (node.type) {
-            case 'condition':
-                return { x: pos.x, y: pos.y - this.conditionSize };
-            case 'loop':
-                return { x: pos.x, y: pos.y - this.hexHeight / 2 };
-            case 'end':
-                return { x: pos.x, y: pos.y - 15 };
-            default:
-                return { x: pos.x, y: pos.y - this.nodeHeight / 2 };
-        }
+        out.push(`<text x="${point.x}" y="${point.y}" font-family="Arial, sans-serif" font-size="12" font-weight="bold" ` +
+            `fill="${lineColor || this.colors.text}">${FlowchartRenderer.escapeXml(edge.label)}</text>`);
     }
     
-    getRightPoint(pos, node) {
-        if (!node) return { x: pos.x + this.nodeWidth / 2, y: pos.y };
+    // Подпись узла; шрифт и цвет - у группы узлов
+    createText(out, x, y, text, maxWidth = 160) {
+        const lines = this.wrapText(text, maxWidth);
+        if (lines.length === 0) return;
         
-        switch (node.type) {
-            case 'condition':
-                return { x: pos.x + this.conditionSize, y: pos.y };
-            case 'loop':
-                return { x: pos.x + this.hexWidth / 2, y: pos.y };
-            default:
-                return { x: pos.x + this.nodeWidth / 2, y: pos.y };
+        const open = `<text x="${x}" y="${y}" dominant-baseline="middle">`;
+        if (lines.length === 1) {
+            out.push(open + FlowchartRenderer.escapeXml(lines[0]) + '</text>');
+            return;
         }
-    }
-    
-    getLeftPoint(pos, node) {
-        if (!node) return { x: pos.x - this.nodeWidth / 2, y: pos.y };
         
-        switch (node.type) {
-            case 'condition':
-                return { x: pos.x - this.conditionSize, y: pos.y };
-            case 'loop':
-                return { x: pos.x - this.hexWidth / 2, y: pos.y };
-            default:
-                return { x: pos.x - this.nodeWidth / 2, y: pos.y };
-        }
+        const lineHeight = 13;
+        const startY = y - ((lines.length - 1) * lineHeight) / 2;
+        out.push(open);
+        lines.forEach((line, i) => {
+            out.push(`<tspan x="${x}" y="${startY + i * lineHeight}">${FlowchartRenderer.escapeXml(line)}</tspan>`);
+        });
+        out.push('</text>');
     }
     
-    drawEdgeLabel(from, to, fromNode, toNode, edge, lineColor) {
-        let x, y;
-        
-        if (edge.branch === 'yes') {
-            x = from.x - 20;
-            y = from.y + this.conditionSize + 18;
-        } else if (edge.branch === 'no') {
-            x = from.x + this.conditionSize + 8;
-            y = from.y - 8;
-        } else if (edge.branch === 'exception') {
-            x = from.x + this.nodeWidth / 2 + 8;
-            y = from.y - 8;
-        } else {
-            return;
-        }
-        
-        const text = document.createElementNS('http://www.w3.org/2000/svg', 'text');
-        text.setAttribute('x', x);
-        text.setAttribute('y', y);
-        text.setAttribute('font-family', 'Arial, sans-serif');
-        text.setAttribute('font-size', '12');
-        text.setAttribute('font-weight', 'bold');
-        text.setAttribute('fill', lineColor || this.colors.text);
-        text.textContent = edge.label;
-        
-        this.svg.appendChild(text);
+    static escapeXml(text) {
+        return String(text).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
     }
     
-    createText(x, y, text, maxWidth = 160) {
-        const textEl = document.createElementNS('http://www.w3.org/2000/svg', 'text');
-        textEl.setAttribute('x', x);
-        textEl.setAttribute('y', y);
-        textEl.setAttribute('text-anchor', 'middle');
-        textEl.setAttribute('dominant-baseline', 'middle');
-        textEl.setAttribute('font-family', 'Arial, sans-serif');
-        textEl.setAttribute('font-size', '11');
-        textEl.setAttribute('fill', this.colors.text);
-        
-        if (!text) return textEl;
+    // Строки подписи узла: перенос по словам в maxWidth, не больше трёх строк, длинные обрезаются
+    wrapText(text, maxWidth = 160) {
+        if (!text) return [];
         
         const words = text.split(' ');
         const lines = [];
@@ -868,24 +321,87 @@ class FlowchartRenderer {
         }
         
         if (lines.length === 1) {
-            const displayText = text.length > 28 ? text.substring(0, 25) + '...' : text;
-            textEl.textContent = displayText;
+            return [text.length > 28 ? text.substring(0, 25) + '...' : text];
+        }
+        return lines.map(line => line.length > 24 ? line.substring(0, 21) + '...' : line);
+    }
+}
+
+// Пул Web Worker'ов раскладки: схемы разных панелей раскладываются параллельно,
+// каждый воркер берёт следующую схему из очереди, как только освободится
+class LayoutWorkerPool {
+    constructor(size, url = LayoutWorkerPool.WORKER_URL) {
+        this.idle = [];
+        this.busy = new Set();
+        this.queue = [];
+        
+        for (let i = 0; i < size; i++) {
+            const worker = new Worker(url);
+            worker.onmessage = (e) => this.finish(worker, e.data);
+            worker.onerror = (e) => {
+                e.preventDefault();
+                this.fail(worker, new Error(e.message || 'Воркер раскладки недоступен'));
+            };
+            this.idle.push(worker);
+        }
+        this.size = size;
+    }
+    
+    // Promise с упакованной раскладкой (FlowchartLayout.pack)
+    layout(flowchartData) {
+        return new Promise((resolve, reject) => {
+            if (this.size === 0) {
+                reject(new Error('Воркер раскладки недоступен'));
+                return;
+            }
+            this.queue.push({ flowchart: flowchartData, resolve, reject });
+            this.dispatch();
+        });
+    }
+    
+    dispatch() {
+        while (this.idle.length > 0 && this.queue.length > 0) {
+            const worker = this.idle.pop();
+            const job = this.queue.shift();
+            worker.job = job;
+            this.busy.add(worker);
+            worker.postMessage({ flowchart: job.flowchart });
+        }
+    }
+    
+    finish(worker, message) {
+        const job = worker.job;
+        worker.job = null;
+        this.busy.delete(worker);
+        this.idle.push(worker);
+        
+        if (message.error) {
+            job.reject(new Error(message.error));
         } else {
-            const lineHeight = 13;
-            const startY = y - ((lines.length - 1) * lineHeight) / 2;
-            
-            lines.forEach((line, i) => {
-                const tspan = document.createElementNS('http://www.w3.org/2000/svg', 'tspan');
-                tspan.setAttribute('x', x);
-                tspan.setAttribute('y', startY + i * lineHeight);
-                const displayLine = line.length > 24 ? line.substring(0, 21) + '...' : line;
-                tspan.textContent = displayLine;
-                textEl.appendChild(tspan);
-            });
+            job.resolve(message);
+        }
+        this.dispatch();
+    }
+    
+    fail(worker, error) {
+        // Воркер не загрузился или упал - выводим его из пула
+        worker.terminate();
+        this.busy.delete(worker);
+        this.idle = this.idle.filter(w => w !== worker);
+        this.size--;
+        
+        worker.job?.reject(error);
+        worker.job = null;
+        if (this.size === 0) {
+            this.queue.splice(0).forEach(job => job.reject(error));
         }
-        
-        return textEl;
     }
 }
 
+// Воркер лежит рядом с этим файлом
+LayoutWorkerPool.WORKER_URL = document.currentScript
+    ? new URL('layout-worker.js', document.currentScript.src).href
+    : 'layout-worker.js';
+
 window.FlowchartRenderer = FlowchartRenderer;
+window.LayoutWorkerPool = LayoutWorkerPool;
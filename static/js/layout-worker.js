@@ -0,0 +1,17 @@
+/**
+ * Web Worker раскладки: схема (обычная или компактная) -> координаты узлов и пути рёбер
+ * Ответ - типизированные массивы FlowchartLayout.pack, передаются без копирования
+ */
+importScripts('flowchart-layout.js');
+
+const layout = new FlowchartLayout();
+
+self.onmessage = (e) => {
+    try {
+        const flowchartData = FlowchartLayout.decode(e.data.flowchart);
+        const packed = FlowchartLayout.pack(flowchartData.nodes, layout.computeLayout(flowchartData));
+        self.postMessage(packed, [packed.xy.buffer, packed.offsets.buffer, packed.bytes.buffer]);
+    } catch (error) {
+        self.postMessage({ error: error.message });
+    }
+};
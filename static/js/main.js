@@ -5,6 +5,31 @@
 let currentFile = null;
 const flowchartInstances = new Map();
 
+// Последняя загрузка (имя файла и doc_id версии) и панели по ключам объявлений
+let lastUpload = null;
+const panelsByKey = new Map();
+
+// Файлы крупнее порога загружаются в outline-режиме: схемы строятся по кнопке
+const OUTLINE_THRESHOLD = 100 * 1024;
+
+// Схема рисуется, когда панель подходит к видимой области ближе RENDER_MARGIN;
+// SVG панели, которая дольше RELEASE_DELAY вне её, удаляется (данные схемы остаются)
+const RENDER_MARGIN = '600px 0px';
+const RELEASE_DELAY = 30 * 1000;
+const panelStates = new WeakMap();
+let panelObserver = null;
+
+// Раскладка схем - в пуле воркеров, чтобы крупные схемы не замораживали страницу
+const LAYOUT_WORKERS = Math.max(1, Math.min(4, (navigator.hardwareConcurrency || 2) - 1));
+let layoutPool = null;
+
+// Схемы, у которых видно больше порога узлов, рисуются на canvas: SVG из тысяч элементов тормозит при сдвиге и масштабе
+const CANVAS_THRESHOLD = 2000;
+
+// Схемы крупнее бюджета (узлов) открываются свёрнутыми: видны внешние уровни, тела циклов
+// и ветвей - узлами "+N", которые раскрываются щелчком; раскладка и отрисовка - только видимого
+const LOD_BUDGET = 200;
+
 // DOM элементы
 const uploadArea = document.getElementById('uploadArea');
 const fileInput = document.getElementById('fileInput');
@@ -18,6 +43,7 @@ const errorMessage = document.getElementById('errorMessage');
 const flowchartSection = document.getElementById('flowchartSection');
 const codeSection = document.getElementById('codeSection');
 const sourceCode = document.getElementById('sourceCode');
+const exportAllBtn = document.getElementById('exportAllBtn');
 
 function initEventListeners() {
     selectFileBtn.addEventListener('click', () => fileInput.click());
@@ -38,6 +64,7 @@ function initEventListeners() {
     uploadArea.addEventListener('dragleave', handleDragLeave);
     uploadArea.addEventListener('drop', handleDrop);
     generateBtn.addEventListener('click', generateFlowchart);
+    exportAllBtn.addEventListener('click', exportAllFlowcharts);
 }
 
 function handleFileSelect(e) {
@@ -108,55 +135,52 @@ async function generateFlowchart() {
     
     const formData = new FormData();
     formData.append('file', currentFile);
+    // Крупные файлы - только оглавление, остальные - потоком, панель за панелью
+    const outline = currentFile.size > OUTLINE_THRESHOLD;
+    // Повторная загрузка того же файла - перестраиваются только изменённые схемы
+    const incremental = !outline && lastUpload?.name === currentFile.name;
+    if (incremental) {
+        if (lastUpload.docId) formData.append('doc_id', lastUpload.docId);
+    } else {
+        formData.append('mode', outline ? 'outline' : 'stream');
+    }
+    // Компактные схемы без эха кода: исходник у браузера уже есть
+    formData.append('format', 'compact');
+    formData.append('code', '0');
     
     try {
-        const response = await fetch('/upload', {
+        const response = await fetch(incremental ? '/upload/incremental' : '/upload', {
             method: 'POST',
             body: formData
         });
         
-        const data = await response.json();
-        
         if (!response.ok) {
+            const data = await response.json();
             throw new Error(data.error || 'Ошибка генерации');
         }
-
-        const wrapper = document.getElementById('flowchartWrapper');
-        wrapper.innerHTML = '';
-        flowchartInstances.clear();
-
-        // Основная блок-схема
-        if (data.main_flowchart?.nodes?.length > 0) {
-            createFlowchartPanel('main', 'Основной алгоритм', data.main_flowchart);
+        
+        flowchartSection.style.display = 'block';
+        flowchartSection.scrollIntoView({ behavior: 'smooth', block: 'start' });
+        showSourceCode(await currentFile.text());
+        
+        if (incremental) {
+            const delta = await response.json();
+            applyDelta(delta);
+            lastUpload = { name: currentFile.name, docId: delta.doc_id };
+            return;
         }
 
-        // Классы
-        if (data.classes?.length > 0) {
-            data.classes.forEach(cls => {
-                if (cls.flowchart?.nodes?.length > 0) {
-                    createFlowchartPanel(`class-${cls.name}`, `Класс: ${cls.name}`, cls.flowchart);
-                }
-            });
-        }
+        clearPanels();
+        // doc_id этой версии приходит в оглавлении или в записи done потока
+        lastUpload = { name: currentFile.name, docId: null };
 
-        // Функции и методы
-        if (data.functions?.length > 0) {
-            data.functions.forEach(func => {
-                if (func.flowchart?.nodes?.length > 0) {
-                    const title = func.type === 'method' 
-                        ? `Метод: ${func.name}` 
-                        : `Функция: ${func.name}`;
-                    createFlowchartPanel(`func-${func.name}`, title, func.flowchart);
-                }
-            });
+        if (outline) {
+            const data = await response.json();
+            createOutlinePanels(data);
+            lastUpload.docId = data.doc_id;
+        } else {
+            await readNdjson(response, handleStreamRecord);
         }
-
-        // Код
-        sourceCode.textContent = data.code;
-        codeSection.style.display = 'block';
-        
-        flowchartSection.style.display = 'block';
-        flowchartSection.scrollIntoView({ behavior: 'smooth', block: 'start' });
         
     } catch (error) {
         console.error('Ошибка:', error);
@@ -168,11 +192,160 @@ async function generateFlowchart() {
     }
 }
 
-function createFlowchartPanel(id, title, flowchartData) {
+async function readNdjson(response, onRecord) {
+    // Записи NDJSON по мере прихода, не дожидаясь конца ответа
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        
+        buffer += decoder.decode(value, { stream: true });
+        let newline;
+        while ((newline = buffer.indexOf('\n')) !== -1) {
+            const line = buffer.slice(0, newline);
+            buffer = buffer.slice(newline + 1);
+            if (line) onRecord(JSON.parse(line));
+        }
+    }
+}
+
+function handleStreamRecord(record) {
+    switch (record.type) {
+        case 'code':
+            showSourceCode(record.code);
+            break;
+        case 'done':
+            if (lastUpload) lastUpload.docId = record.doc_id;
+            break;
+        case 'error':
+            throw new Error(record.error);
+        default:
+            // Схема в компактном формате (format=compact) - столбцы t, x, ..., без nodes
+            if (record.flowchart && (record.flowchart.t || record.flowchart.nodes).length > 0) {
+                // Основная схема приходит последней, но показывается первой
+                const panel = createFlowchartPanel(entryPanelId(record), entryTitle(record), record.flowchart,
+                                                   record.type === 'main');
+                // По ключу панель заменяется при повторной загрузке (applyDelta)
+                panelsByKey.set(record.key, panel);
+            }
+    }
+}
+
+function applyDelta(delta) {
+    // Изменения относительно прошлой версии: удалённые, изменённые и новые панели
+    const wrapper = document.getElementById('flowchartWrapper');
+    if (delta.base === null) {
+        // Прошлой версии на сервере нет - пришли все схемы
+        clearPanels();
+    }
+    
+    const removePanel = (key) => {
+        const panel = panelsByKey.get(key);
+        if (!panel) return;
+        forgetPanel(panel);
+        flowchartInstances.delete(panel.dataset.panelId);
+        panel.remove();
+        panelsByKey.delete(key);
+    };
+    
+    delta.removed.forEach(removePanel);
+    
+    [...delta.changed, ...delta.added].forEach(entry => {
+        removePanel(entry.key);
+        const nodes = entry.flowchart.t || entry.flowchart.nodes;
+        if (nodes.length > 0) {
+            const panel = createFlowchartPanel(`key-${entry.key}`, entryTitle(entry), entry.flowchart);
+            panelsByKey.set(entry.key, panel);
+        }
+    });
+    
+    // Порядок панелей - как в файле, основной алгоритм первым
+    const order = delta.order.filter(key => key !== '__main__');
+    if (delta.order.includes('__main__')) order.unshift('__main__');
+    order.forEach(key => {
+        const panel = panelsByKey.get(key);
+        if (panel) wrapper.appendChild(panel);
+    });
+}
+
+function showSourceCode(code) {
+    sourceCode.textContent = code;
+    codeSection.style.display = 'block';
+}
+
+function entryTitle(entry) {
+    switch (entry.type) {
+        case 'main': return 'Основной алгоритм';
+        case 'class': return `Класс: ${entry.name}`;
+        case 'method': return `Метод: ${entry.name}`;
+        default: return `Функция: ${entry.name}`;
+    }
+}
+
+function entryPanelId(entry) {
+    if (entry.type === 'main') return 'main';
+    return entry.type === 'class' ? `class-${entry.name}` : `func-${entry.name}`;
+}
+
+function createOutlinePanels(data) {
+    // Тот же порядок панелей, что и в полном режиме
+    const entries = [
+        ...(data.main ? [data.main] : []),
+        ...data.classes,
+        ...data.functions
+    ];
+    entries.forEach(entry => panelsByKey.set(entry.key, createLazyPanel(data.doc_id, entry)));
+}
+
+function createLazyPanel(docId, entry) {
+    const id = entryPanelId(entry);
+    const panel = createPanelShell(id, entryTitle(entry));
+    const container = panel.querySelector('.flowchart-container');
+    
+    const [first, last] = entry.lines;
+    container.innerHTML = `
+        <div class="lazy-placeholder">
+            <span>Строки ${first}–${last}, ~${entry.size} блоков</span>
+            <button class="btn btn-primary" type="button">Построить</button>
+        </div>
+    `;
+    
+    const button = container.querySelector('button');
+    button.addEventListener('click', async () => {
+        button.disabled = true;
+        button.textContent = 'Строится...';
+        try {
+            const response = await fetch(`/flowchart/${docId}/${encodeURIComponent(entry.name)}`);
+            const result = await response.json();
+            if (!response.ok) {
+                throw new Error(result.error || 'Ошибка генерации');
+            }
+            container.innerHTML = '';
+            mountPanel(panel, id, entryTitle(entry), result.flowchart);
+        } catch (error) {
+            showError(error.message);
+            button.disabled = false;
+            button.textContent = 'Построить';
+        }
+    });
+    return panel;
+}
+
+function createFlowchartPanel(id, title, flowchartData, atTop = false) {
+    const panel = createPanelShell(id, title, atTop);
+    mountPanel(panel, id, title, flowchartData);
+    return panel;
+}
+
+function createPanelShell(id, title, atTop = false) {
     const wrapper = document.getElementById('flowchartWrapper');
     
     const panel = document.createElement('div');
     panel.className = 'flowchart-panel';
+    panel.dataset.panelId = id;
     panel.innerHTML = `
         <div class="panel-header">
             <h3 class="panel-title">${title}</h3>
@@ -195,6 +368,12 @@ function createFlowchartPanel(id, title, flowchartData) {
                         <path d="M3 3v5h5"/>
                     </svg>
                 </button>
+                <span class="panel-export-status"></span>
+                <select class="panel-export-scale" title="Масштаб PNG">
+                    <option value="1">1×</option>
+                    <option value="2" selected>2×</option>
+                    <option value="4">4×</option>
+                </select>
                 <button class="btn-icon btn-download" title="Скачать PNG" data-action="download">
                     <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
                         <path d="M21 15v4a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2v-4"/>
@@ -202,6 +381,12 @@ function createFlowchartPanel(id, title, flowchartData) {
                         <line x1="12" y1="15" x2="12" y2="3"/>
                     </svg>
                 </button>
+                <button class="btn-icon" title="Скачать SVG" data-action="download-svg">
+                    <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                        <polyline points="16 18 22 12 16 6"/>
+                        <polyline points="8 6 2 12 8 18"/>
+                    </svg>
+                </button>
             </div>
         </div>
         <div class="panel-viewport" id="viewport-${id}">
@@ -212,14 +397,16 @@ function createFlowchartPanel(id, title, flowchartData) {
         <div class="panel-zoom-info" id="zoom-info-${id}">100%</div>
     `;
     
-    wrapper.appendChild(panel);
-    
-    // Рендерим блок-схему
-    const container = document.getElementById(`flowchart-${id}`);
-    const renderer = new FlowchartRenderer(container);
-    const size = renderer.render(flowchartData);
-    
-    // Сохраняем состояние
+    if (atTop) {
+        wrapper.prepend(panel);
+    } else {
+        wrapper.appendChild(panel);
+    }
+    return panel;
+}
+
+function mountPanel(panel, id, title, flowchartData) {
+    // Панель без SVG: высота задана вьюпортом, схема рисуется при подходе к экрану
     const state = {
         id,
         title,
@@ -229,13 +416,146 @@ function createFlowchartPanel(id, title, flowchartData) {
         isPanning: false,
         startX: 0,
         startY: 0,
-        renderer,
-        size
+        downX: 0,
+        downY: 0,
+        panel,
+        flowchart: flowchartData,
+        canvas: false,  // выбирается в renderPanel по числу видимых узлов
+        hierarchy: null,
+        collapsed: null,
+        renderer: null,
+        rendering: null,
+        size: null,
+        releaseTimer: null,
+        exporting: false
     };
     flowchartInstances.set(id, state);
+    panelStates.set(panel, state);
     
-    // Привязываем события
+    // Привязываем события - один раз, повторная отрисовка их не трогает
     setupPanelInteraction(panel, state);
+    
+    if (!window.IntersectionObserver) {
+        renderPanel(state);
+        return;
+    }
+    if (!panelObserver) {
+        panelObserver = new IntersectionObserver(handlePanelVisibility, { rootMargin: RENDER_MARGIN });
+    }
+    panelObserver.observe(panel);
+}
+
+function handlePanelVisibility(entries) {
+    entries.forEach(entry => {
+        const state = panelStates.get(entry.target);
+        if (!state) return;
+        
+        if (entry.isIntersecting) {
+            clearTimeout(state.releaseTimer);
+            state.releaseTimer = null;
+            renderPanel(state);
+        } else if (state.renderer && !state.releaseTimer) {
+            state.releaseTimer = setTimeout(() => releasePanel(state), RELEASE_DELAY);
+        }
+    });
+}
+
+function renderPanel(state) {
+    // Повторный вызов, пока воркер считает раскладку, ждёт ту же отрисовку
+    if (state.renderer) return Promise.resolve();
+    if (state.rendering) return state.rendering;
+    
+    // Canvas или SVG - по видимой части: свёрнутая схема из тысяч узлов остаётся SVG,
+    // а раскрытие, после которого узлов больше порога, переводит панель на canvas (и обратно)
+    const view = getPanelView(state);
+    state.canvas = countNodes(view) > CANVAS_THRESHOLD;
+    const container = state.panel.querySelector('.flowchart-container');
+    const renderer = state.canvas
+        ? new FlowchartCanvasRenderer(container, state.panel.querySelector('.panel-viewport'))
+        : new FlowchartRenderer(container);
+    const pool = getLayoutPool();
+    const drawn = pool
+        ? renderer.renderAsync(view, pool).catch(error => {
+            // Воркер недоступен - раскладка на странице, как раньше
+            console.error('Ошибка раскладки в воркере:', error);
+            return renderer.render(view);
+        })
+        : Promise.resolve(renderer.render(view));
+    
+    state.rendering = drawn.then(size => {
+        state.size = size;
+        state.renderer = renderer;
+        state.rendering = null;
+        // Сдвиг и масштаб панели - для нового рендерера: canvas рисует с ними сам,
+        // SVG получает CSS-трансформацию (после смены рендерера она могла остаться от другого)
+        const content = state.panel.querySelector('.panel-content');
+        if (state.canvas) content.style.transform = '';
+        updateTransform(state, content);
+    });
+    return state.rendering;
+}
+
+// Видимая часть схемы с учётом свёрнутых узлов; вложенность разбирается при первой отрисовке
+function getPanelView(state) {
+    if (!state.hierarchy) {
+        const decoded = FlowchartLayout.decode(state.flowchart);
+        if (!decoded || !decoded.nodes) return decoded;
+        state.hierarchy = new FlowchartHierarchy(decoded);
+        state.collapsed = state.hierarchy.collapseToBudget(LOD_BUDGET);
+    }
+    return state.hierarchy.view(state.collapsed);
+}
+
+// Щелчок по составному узлу сворачивает или раскрывает его тело и перерисовывает панель
+function toggleNode(state, id) {
+    if (!state.hierarchy || !state.hierarchy.isOwner(id) || state.rendering) return;
+    if (state.collapsed.has(id)) state.collapsed.delete(id);
+    else state.collapsed.add(id);
+    
+    // Старая схема остаётся на экране, пока считается раскладка новой
+    state.renderer?.dispose?.();
+    state.renderer = null;
+    renderPanel(state);
+}
+
+// Число узлов схемы - в компактном формате (wire_format) и в обычном (как у видимой части)
+function countNodes(flowchartData) {
+    if (!flowchartData) return 0;
+    return (flowchartData.t || flowchartData.nodes || []).length;
+}
+
+function getLayoutPool() {
+    if (!layoutPool && window.Worker) {
+        try {
+            layoutPool = new LayoutWorkerPool(LAYOUT_WORKERS);
+        } catch (error) {
+            return null;
+        }
+    }
+    return layoutPool;
+}
+
+function releasePanel(state) {
+    // Масштаб и сдвиг остаются в state - после повторной отрисовки вид тот же
+    state.releaseTimer = null;
+    if (!state.renderer) return;
+    state.renderer.dispose?.();
+    state.panel.querySelector('.flowchart-container').innerHTML = '';
+    state.renderer = null;
+}
+
+function forgetPanel(panel) {
+    const state = panelStates.get(panel);
+    if (state) clearTimeout(state.releaseTimer);
+    panelObserver?.unobserve(panel);
+}
+
+function clearPanels() {
+    const wrapper = document.getElementById('flowchartWrapper');
+    wrapper.querySelectorAll('.flowchart-panel').forEach(forgetPanel);
+    wrapper.innerHTML = '';
+    flowchartInstances.clear();
+    panelsByKey.clear();
 }
 
 function setupPanelInteraction(panel, state) {
@@ -260,6 +580,9 @@ function setupPanelInteraction(panel, state) {
                 case 'download':
                     downloadFlowchart(state);
                     break;
+                case 'download-svg':
+                    downloadSvg(state);
+                    break;
             }
         });
     });
@@ -275,6 +598,8 @@ function setupPanelInteraction(panel, state) {
     viewport.addEventListener('mousedown', (e) => {
         if (e.button === 0) {
             state.isPanning = true;
+            state.downX = e.clientX;
+            state.downY = e.clientY;
             state.startX = e.clientX - state.panX;
             state.startY = e.clientY - state.panY;
             viewport.style.cursor = 'grabbing';
@@ -296,6 +621,13 @@ function setupPanelInteraction(panel, state) {
         }
     });
     
+    // Щелчок без перетаскивания по составному узлу
+    viewport.addEventListener('click', (e) => {
+        if (Math.abs(e.clientX - state.downX) > 3 || Math.abs(e.clientY - state.downY) > 3) return;
+        const id = state.renderer?.getNodeAt(e);
+        if (id !== null && id !== undefined) toggleNode(state, id);
+    });
+    
     viewport.style.cursor = 'grab';
 }
 
@@ -315,68 +647,117 @@ function resetView(state, content, zoomInfo) {
 }
 
 function updateTransform(state, content) {
+    // Canvas сам перерисовывает видимую часть (раз за кадр), CSS-трансформация ему не нужна
+    if (state.canvas) {
+        state.renderer?.setView(state);
+        return;
+    }
     content.style.transform = `translate(${state.panX}px, ${state.panY}px) scale(${state.scale})`;
 }
 
+// SVG панели для сохранения: размер по viewBox и белый фон; null - схемы нет
+async function getExportSvg(state) {
+    // Освобождённая панель рисуется заново - нужен её SVG
+    await renderPanel(state);
+    const container = document.getElementById(`flowchart-${state.id}`);
+    const svgElement = state.canvas ? state.renderer.createSvg() : container.querySelector('svg');
+    if (!svgElement) return null;
+    
+    // Клонируем SVG
+    const svgClone = svgElement.cloneNode(true);
+    const viewBox = svgElement.getAttribute('viewBox');
+    const [, , width, height] = viewBox ? viewBox.split(' ').map(Number) : [0, 0, 800, 600];
+    
+    svgClone.setAttribute('width', width);
+    svgClone.setAttribute('height', height);
+    
+    // Добавляем белый фон
+    const bg = document.createElementNS('http://www.w3.org/2000/svg', 'rect');
+    bg.setAttribute('width', '100%');
+    bg.setAttribute('height', '100%');
+    bg.setAttribute('fill', 'white');
+    svgClone.insertBefore(bg, svgClone.firstChild);
+    
+    return { markup: new XMLSerializer().serializeToString(svgClone), width, height };
+}
+
+// PNG в выбранном масштабе; растрирование плитками и кодирование в воркере (PngExporter)
 async function downloadFlowchart(state) {
+    if (state.exporting) return;
+    const status = state.panel.querySelector('.panel-export-status');
+    const scale = Number(state.panel.querySelector('.panel-export-scale').value) || 2;
+    state.exporting = true;
+    
     try {
-        const container = document.getElementById(`flowchart-${state.id}`);
-        const svgElement = container.querySelector('svg');
-        if (!svgElement) {
+        status.textContent = 'PNG...';
+        const svg = await getExportSvg(state);
+        if (!svg) {
             showError('Блок-схема не найдена');
             return;
         }
         
-        // Клонируем SVG
-        const svgClone = svgElement.cloneNode(true);
-        const viewBox = svgElement.getAttribute('viewBox');
-        const [, , width, height] = viewBox ? viewBox.split(' ').map(Number) : [0, 0, 800, 600];
-        
-        svgClone.setAttribute('width', width);
-        svgClone.setAttribute('height', height);
-        
-        // Добавляем белый фон
-        const bg = document.createElementNS('http://www.w3.org/2000/svg', 'rect');
-        bg.setAttribute('width', '100%');
-        bg.setAttribute('height', '100%');
-        bg.setAttribute('fill', 'white');
-        svgClone.insertBefore(bg, svgClone.firstChild);
-        
-        const svgString = new XMLSerializer().serializeToString(svgClone);
-        const svgBlob = new Blob([svgString], { type: 'image/svg+xml;charset=utf-8' });
-        const url = URL.createObjectURL(svgBlob);
-        
-        const img = new Image();
-        img.onload = () => {
-            const canvas = document.createElement('canvas');
-            const scale = 2;
-            canvas.width = width * scale;
-            canvas.height = height * scale;
-            
-            const ctx = canvas.getContext('2d');
-            ctx.scale(scale, scale);
-            ctx.fillStyle = 'white';
-            ctx.fillRect(0, 0, width, height);
-            ctx.drawImage(img, 0, 0);
-            
-            URL.revokeObjectURL(url);
-            
-            canvas.toBlob((blob) => {
-                const link = document.createElement('a');
-                link.download = `flowchart_${state.title.replace(/[^a-zA-Zа-яА-Я0-9]/g, '_')}.png`;
-                link.href = URL.createObjectURL(blob);
-                link.click();
-                URL.revokeObjectURL(link.href);
-            });
-        };
-        
-        img.src = url;
-        
+        const exporter = new PngExporter(svg.markup, svg.width, svg.height, scale);
+        const blob = await exporter.toBlob(progress => {
+            status.textContent = `PNG ${Math.round(progress * 100)}%`;
+        });
+        saveBlob(blob, exportFileName(state, 'png'));
+    } catch (error) {
+        showError('Ошибка скачивания: ' + error.message);
+    } finally {
+        state.exporting = false;
+        status.textContent = '';
+    }
+}
+
+// SVG как есть, без растрирования
+async function downloadSvg(state) {
+    try {
+        const svg = await getExportSvg(state);
+        if (!svg) {
+            showError('Блок-схема не найдена');
+            return;
+        }
+        saveBlob(new Blob([svg.markup], { type: 'image/svg+xml;charset=utf-8' }), exportFileName(state, 'svg'));
     } catch (error) {
         showError('Ошибка скачивания: ' + error.message);
     }
 }
 
+function exportFileName(state, extension) {
+    return `flowchart_${state.title.replace(/[^a-zA-Zа-яА-Я0-9]/g, '_')}.${extension}`;
+}
+
+function saveBlob(blob, name) {
+    const link = document.createElement('a');
+    link.download = name;
+    link.href = URL.createObjectURL(blob);
+    link.click();
+    URL.revokeObjectURL(link.href);
+}
+
+// Все схемы файла одним архивом - SVG рисует сервер, панели для этого не нужны
+async function exportAllFlowcharts() {
+    if (!currentFile) return;
+    
+    const formData = new FormData();
+    formData.append('file', currentFile);
+    exportAllBtn.disabled = true;
+    
+    try {
+        const response = await fetch('/export', { method: 'POST', body: formData });
+        if (!response.ok) {
+            const data = await response.json();
+            throw new Error(data.error || 'Ошибка экспорта');
+        }
+        
+        saveBlob(await response.blob(), `${currentFile.name.replace(/\.[^.]+$/, '')}_flowcharts.zip`);
+    } catch (error) {
+        showError('Ошибка экспорта: ' + error.message);
+    } finally {
+        exportAllBtn.disabled = false;
+    }
+}
+
 function showError(message) {
     errorMessage.textContent = message;
     errorAlert.style.display = 'flex';
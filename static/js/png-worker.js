@@ -0,0 +1,125 @@
+/**
+ * Web Worker кодирования PNG: страница присылает полосы RGBA-пикселей сверху вниз,
+ * воркер фильтрует строки, сжимает их потоком (CompressionStream) и собирает PNG
+ * любого размера - без одной большой canvas
+ */
+
+const PNG_SIGNATURE = new Uint8Array([137, 80, 78, 71, 13, 10, 26, 10]);
+
+const CRC_TABLE = new Uint32Array(256);
+for (let n = 0; n < 256; n++) {
+    let c = n;
+    for (let k = 0; k < 8; k++) {
+        c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+    }
+    CRC_TABLE[n] = c >>> 0;
+}
+
+function crc32(bytes, crc = 0xffffffff) {
+    for (let i = 0; i < bytes.length; i++) {
+        crc = CRC_TABLE[(crc ^ bytes[i]) & 0xff] ^ (crc >>> 8);
+    }
+    return crc;
+}
+
+// Чанк PNG: длина, тип, данные, CRC типа и данных - частями для Blob
+function pngChunk(type, data) {
+    const head = new Uint8Array(8);
+    const view = new DataView(head.buffer);
+    view.setUint32(0, data.length);
+    for (let i = 0; i < 4; i++) head[4 + i] = type.charCodeAt(i);
+    
+    const tail = new Uint8Array(4);
+    new DataView(tail.buffer).setUint32(0, (crc32(data, crc32(head.subarray(4))) ^ 0xffffffff) >>> 0);
+    return [head, data, tail];
+}
+
+class PngStreamWriter {
+    constructor(width, height) {
+        this.width = width;
+        this.height = height;
+        
+        // IHDR: 8 бит на канал, RGB (фон белый - альфа не нужна)
+        const header = new Uint8Array(13);
+        const view = new DataView(header.buffer);
+        view.setUint32(0, width);
+        view.setUint32(4, height);
+        header[8] = 8;
+        header[9] = 2;
+        this.parts = [PNG_SIGNATURE, ...pngChunk('IHDR', header)];
+        
+        // Сжатые данные забираются по мере готовности, каждый кусок - свой IDAT
+        const stream = new CompressionStream('deflate');
+        this.writer = stream.writable.getWriter();
+        this.reading = this.collect(stream.readable.getReader());
+    }
+    
+    async collect(reader) {
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (done) return;
+            this.parts.push(...pngChunk('IDAT', value));
+        }
+    }
+    
+    // rows строк RGBA; каждая строка - фильтр Sub (разность с левым пикселем),
+    // белые поля и однотонные фигуры превращаются в нули и хорошо сжимаются
+    async writeRows(pixels, rows) {
+        const width = this.width;
+        const stride = width * 3 + 1;
+        const out = new Uint8Array(stride * rows);
+        
+        for (let r = 0; r < rows; r++) {
+            let src = r * width * 4;
+            let dst = r * stride;
+            out[dst++] = 1;
+            let red = 0;
+            let green = 0;
+            let blue = 0;
+            for (let x = 0; x < width; x++, src += 4) {
+                out[dst++] = pixels[src] - red;
+                out[dst++] = pixels[src + 1] - green;
+                out[dst++] = pixels[src + 2] - blue;
+                red = pixels[src];
+                green = pixels[src + 1];
+                blue = pixels[src + 2];
+            }
+        }
+        
+        await this.writer.ready;
+        await this.writer.write(out);
+    }
+    
+    async finish() {
+        await this.writer.close();
+        await this.reading;
+        this.parts.push(...pngChunk('IEND', new Uint8Array(0)));
+        return new Blob(this.parts, { type: 'image/png' });
+    }
+}
+
+let png = null;
+
+// Сообщения приходят по одному: следующее страница шлёт после ответа на предыдущее
+self.onmessage = async (e) => {
+    const message = e.data;
+    try {
+        if (message.type === 'start') {
+            if (typeof CompressionStream === 'undefined') {
+                self.postMessage({ error: 'CompressionStream недоступен', unsupported: true });
+                return;
+            }
+            png = new PngStreamWriter(message.width, message.height);
+            self.postMessage({ ready: true });
+        } else if (message.type === 'rows') {
+            await png.writeRows(new Uint8Array(message.pixels), message.rows);
+            self.postMessage({ rows: message.rows });
+        } else if (message.type === 'end') {
+            const blob = await png.finish();
+            png = null;
+            self.postMessage({ blob });
+        }
+    } catch (error) {
+        self.postMessage({ error: error.message });
+    }
+};
@@ -0,0 +1,71 @@
+"""
+Пакетная обработка: много файлов или zip-архив за один запрос
+Файлы разбираются в пуле обработчиков, строки NDJSON отдаются по мере готовности
+"""
+import io
+import zipfile
+from concurrent.futures import as_completed
+
+from .dispatch import MAX_CODE_LENGTH, detect_extension, dumps, parse_to_json
+from .result_cache import ResultCache
+from .worker_pool import WorkerError
+
+
+def iter_archive(data):
+    """Файлы zip-архива: (имя, байты или None для слишком больших)"""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or info.filename.startswith('__MACOSX/'):
+                continue
+            # В архиве папки задания - файлы на других языках молча пропускаем
+            if detect_extension(info.filename) is None:
+                continue
+            if info.file_size > MAX_CODE_LENGTH:
+                yield info.filename, None
+                continue
+            yield info.filename, archive.read(info)
+
+
+def record_line(index, name, status, body):
+    """Строка NDJSON для одного файла; body - готовый JSON результата или ошибки"""
+    key = b'result' if status == 200 else b'error'
+    return b'{"index":%d,"file":%s,"status":%d,"%s":%s}\n' % (index, dumps(name), status, key, body)
+
+
+def run_batch(items, pool, cache, version):
+    """Разобрать файлы (имя, байты) в пуле и выдавать строки NDJSON в порядке готовности"""
+    pending = {}
+    
+    for index, (name, data) in enumerate(items):
+        ext = detect_extension(name)
+        if ext is None:
+            yield record_line(index, name, 400, dumps('Разрешены файлы: .py, .js, .cs'))
+            continue
+        
+        if data is None or len(data) > MAX_CODE_LENGTH:
+            yield record_line(index, name, 400, dumps('Файл слишком большой'))
+            continue
+        
+        # Повторно загруженные файлы отдаём сразу из кэша
+        key = ResultCache.make_key(data, ext, version)
+        cached = cache.get(key)
+        if cached is not None:
+            yield record_line(index, name, 200, cached)
+            continue
+        
+        pending[pool.submit(parse_to_json, data, ext)] = (index, name, key)
+    
+    for future in as_completed(pending):
+        index, name, key = pending[future]
+        try:
+            status, body = future.result()
+        except WorkerError as e:
+            # Лимит времени или памяти - ошибка только этого файла
+            status, body = e.status, dumps(e.message)
+        except Exception as e:
+            # Упавший процесс не должен обрывать весь пакет
+            status, body = 500, dumps(f'Ошибка: {str(e)}')
+        
+        if status == 200:
+            cache.put(key, body)
+        yield record_line(index, name, status, body)
@@ -0,0 +1,133 @@
+"""
+Сжатие ответов (gzip, brotli - если установлен) и распаковка gzip-тела запроса
+"""
+import io
+import zlib
+
+from .dispatch import dumps
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # 11 по умолчанию слишком медленно для ответов на лету
+
+
+def negotiate_encoding(accept_encoding):
+    """Лучшее сжатие из Accept-Encoding: 'br', 'gzip' или None"""
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', accepted.get('*', 0)) > 0:
+        return 'gzip'
+    return None
+
+
+class StreamCompressor:
+    """Сжатие потока по записям: каждая запись доходит до клиента сразу"""
+    
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        elif encoding == 'gzip':
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        else:
+            self.compressor = None
+    
+    def compress(self, chunk):
+        if self.compressor is None:
+            return chunk
+        if self.encoding == 'br':
+            return self.compressor.process(chunk) + self.compressor.flush()
+        return self.compressor.compress(chunk) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+    
+    def finish(self):
+        if self.compressor is None:
+            return b''
+        if self.encoding == 'br':
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+
+def compress(data, encoding):
+    """Сжать готовый ответ целиком"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    return data
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+def gunzip(data, max_bytes):
+    """Распаковать gzip, не выходя за max_bytes (защита от «zip-бомб»)"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    body = decompressor.decompress(data, max_bytes + 1)
+    if len(body) > max_bytes or decompressor.unconsumed_tail:
+        raise RequestTooLarge()
+    if not decompressor.eof:
+        raise zlib.error('Неполный gzip-поток')
+    return body
+
+
+class DecompressRequestMiddleware:
+    """WSGI-обёртка: тело с Content-Encoding: gzip распаковывается до разбора формы"""
+    
+    def __init__(self, app, max_bytes):
+        self.app = app
+        self.max_bytes = max_bytes
+    
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if encoding in ('', 'identity'):
+            return self.app(environ, start_response)
+        
+        if encoding != 'gzip':
+            return _error(start_response, '415 Unsupported Media Type',
+                          'Поддерживается только Content-Encoding: gzip')
+        
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or -1)
+        except ValueError:
+            length = -1
+        # Сжатое тело не может быть больше распакованного лимита
+        if length > self.max_bytes:
+            return _error(start_response, '413 Request Entity Too Large', 'Запрос слишком большой')
+        
+        raw = environ['wsgi.input'].read(length if length >= 0 else self.max_bytes + 1)
+        try:
+            body = gunzip(raw, self.max_bytes)
+        except RequestTooLarge:
+            return _error(start_response, '413 Request Entity Too Large', 'Запрос слишком большой')
+        except zlib.error:
+            return _error(start_response, '400 Bad Request', 'Повреждённое gzip-тело запроса')
+        
+        environ = dict(environ)
+        environ.pop('HTTP_CONTENT_ENCODING')
+        environ['wsgi.input'] = io.BytesIO(body)
+        environ['CONTENT_LENGTH'] = str(len(body))
+        return self.app(environ, start_response)
+
+
+def _error(start_response, status, message):
+    body = dumps({'error': message})
+    start_response(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+    return [body]
@@ -0,0 +1,120 @@
+"""
+Лексический разбор C#: вырезание комментариев и таблица парных скобок
+Оба прохода линейны и учитывают строки, символьные и verbatim-литералы
+"""
+import re
+
+# Строковые литералы C#: raw """...""", verbatim @"...", интерполированные $"...", обычные и символьные
+_LITERALS = r"""
+    \$*(?P<q>"{3,}).*?(?P=q)
+  | (?:\$@|@\$)"(?:[^"{]|""|\{[^}]*\})*"?
+  | @"[^"]*(?:""[^"]*)*"?
+  | \$"(?:[^"\\{\n]|\\.|\{[^}\n]*\})*"?
+  | "[^"\\\n]*(?:\\.[^"\\\n]*)*"?
+  | '[^'\\\n]*(?:\\.[^'\\\n]*)*'?
+"""
+
+_COMMENT_RE = re.compile(r"""
+    (?P<literal>""" + _LITERALS + r""")
+  | //[^\n]*\n?
+  | /\*.*?(?:\*/|\Z)
+""", re.S | re.X)
+
+_SCAN_RE = re.compile(r"""
+    (?P<literal>""" + _LITERALS + r""")
+  | (?P<bracket>[{}()\[\]<])
+""", re.S | re.X)
+
+# Объявления пространств имён и типов; литералы пропускаются целиком
+_DECL_RE = re.compile(r"""
+    (?P<literal>""" + _LITERALS + r""")
+  | \bnamespace\s+(?P<namespace>[\w.]+)
+  | \b(?P<kind>record\s+(?:class|struct)|class|struct|record|interface)\s+(?P<name>\w+)
+""", re.S | re.X)
+
+# Что может встретиться внутри обобщённого типа: List<Dictionary<string, int[]>>
+_GENERIC_RUN_RE = re.compile(r'[\w\s,.?:*()\[\]<>]*')
+_ANGLE_RE = re.compile(r'[<>]')
+GENERIC_LOOKAHEAD = 256
+
+_CLOSE = {')': '(', ']': '[', '}': '{'}
+
+
+def _keep_literal(m):
+    return m.group('literal') or ''
+
+
+def strip_comments(code):
+    """Удалить комментарии, не трогая строковые литералы"""
+    return _COMMENT_RE.sub(_keep_literal, code)
+
+
+def _match_generic(code, start, pairs):
+    """Сопоставить обобщённую '<' в start; вложенные пары тоже заносятся в pairs"""
+    end = min(start + GENERIC_LOOKAHEAD, len(code))
+    end = _GENERIC_RUN_RE.match(code, start + 1, end).end()
+    stack = [start]
+    found = []
+    for m in _ANGLE_RE.finditer(code, start + 1, end):
+        pos = m.start()
+        if code[pos] == '<':
+            stack.append(pos)
+            continue
+        found.append((stack.pop(), pos))
+        if not stack:
+            for opener, closer in found:
+                pairs[opener] = closer
+            return
+    # Не обобщение, а сравнение: a < b
+
+
+class CSharpSource:
+    """Исходник C# без комментариев и индекс парных скобок"""
+    
+    def __init__(self, code):
+        self.code = code
+        self.pairs = {}  # позиция открывающей скобки -> позиция парной закрывающей
+        self._scan()
+    
+    def _scan(self):
+        """Один проход: каждый вид скобок сопоставляется своим стеком"""
+        code = self.code
+        pairs = self.pairs
+        stacks = {'(': [], '[': [], '{': []}
+        
+        for m in _SCAN_RE.finditer(code):
+            if m.lastgroup != 'bracket':
+                continue
+            pos = m.start()
+            c = code[pos]
+            if c == '<':
+                # Обобщение только сразу после имени типа, вложенные уже сопоставлены
+                if pos not in pairs and pos > 0 and (code[pos - 1].isalnum() or code[pos - 1] == '_'):
+                    _match_generic(code, pos, pairs)
+            elif c in stacks:
+                stacks[c].append(pos)
+            else:
+                stack = stacks[_CLOSE[c]]
+                if stack:
+                    pairs[stack.pop()] = pos
+    
+    def declarations(self, pos=0):
+        """Объявления namespace и типов по порядку (совпадения _DECL_RE без литералов)"""
+        for m in _DECL_RE.finditer(self.code, pos):
+            if m.lastgroup != 'literal':
+                yield m
+    
+    def close(self, pos, hi):
+        """Парная скобка для pos в пределах [pos, hi) (иначе hi)"""
+        end = self.pairs.get(pos)
+        if end is None or end >= hi:
+            return hi
+        return end
+    
+    def block(self, start, hi):
+        """Блок в фигурных скобках, начиная с start: (начало тела, конец тела, позиция после блока)"""
+        brace = self.code.find('{', start, hi)
+        if brace == -1:
+            return hi, hi, hi
+        end = self.close(brace, hi)
+        return brace + 1, end, min(end + 1, hi)
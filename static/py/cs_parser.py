@@ -1,196 +1,61 @@
 """
 Парсер C# для генерации блок-схем
 Улучшенная версия с поддержкой свойств, статических членов
+Парные скобки известны заранее (cs_lexer) - разбор идёт по участкам исходника без копий
 """
 import re
+from functools import lru_cache, partial
 
+from .cs_lexer import CSharpSource, strip_comments
+from .flowchart_graph import (LOOP_EXIT, NO_EMPTY, RETURN, FlowchartGraph, exit_kind, exit_marker, exit_node,
+                              is_return, run_steps, source_text)
+from .incremental import declaration_digest
+from .metrics import phase
+from .outline import LineIndex, code_record, collect_entries, estimate_size, outline_entry
 
-class CSharpFlowchartBuilder:
+CASE_RE = re.compile(r'case\s+([^:]+):')
+GET_RE = re.compile(r'\bget\s*\{')
+SET_RE = re.compile(r'\bset\s*\{')
+HEADER_END_RE = re.compile(r'[{;]')
+NAMESPACE_BODY_RE = re.compile(r'\s*([{;])')
+
+
+class CSharpFlowchartBuilder(FlowchartGraph):
     """Строитель блок-схем для C#"""
-    
-    def __init__(self):
-        self.nodes = []
-        self.edges = []
-        self.node_id = 0
-        
-    def add_node(self, node_type, text):
-        node = {
-            'id': self.node_id,
-            'type': node_type,
-            'text': text
-        }
-        self.nodes.append(node)
-        self.node_id += 1
-        return node['id']
-    
-    def add_edge(self, from_id, to_id, label='', branch=''):
-        for edge in self.edges:
-            if edge['from'] == from_id and edge['to'] == to_id:
-                if label and not edge['label']:
-                    edge['label'] = label
-                    edge['branch'] = branch
-                return edge
-        
-        edge = {
-            'from': from_id,
-            'to': to_id,
-            'label': label,
-            'branch': branch
-        }
-        self.edges.append(edge)
-        return edge
-    
-    def get_flowchart_data(self):
-        return {'nodes': self.nodes, 'edges': self.edges}
 
 
 def remove_comments(code):
     """Удалить комментарии из кода"""
-    result = []
-    i = 0
-    while i < len(code):
-        if code[i:i+2] == '//':
-            end = code.find('\n', i)
-            if end == -1:
-                break
-            i = end + 1
-        elif code[i:i+2] == '/*':
-            end = code.find('*/', i)
-            if end == -1:
-                break
-            i = end + 2
-        else:
-            result.append(code[i])
-            i += 1
-    return ''.join(result)
-
+    return strip_comments(code)
 
-def find_matching_brace(code, start):
-    """Найти закрывающую скобку"""
-    depth = 0
-    i = start
-    in_string = False
-    string_char = None
-    
-    while i < len(code):
-        c = code[i]
-        
-        # Обработка строк
-        if not in_string and c in '"\'':
-            in_string = True
-            string_char = c
-            i += 1
-            continue
-        
-        if in_string:
-            if c == '\\' and i + 1 < len(code):
-                i += 2
-                continue
-            if c == string_char:
-                in_string = False
-            i += 1
-            continue
-        
-        if c == '{':
-            depth += 1
-        elif c == '}':
-            depth -= 1
-            if depth == 0:
-                return i
-        i += 1
-    return len(code)
 
-
-def find_matching_paren(code, start):
-    """Найти закрывающую круглую скобку"""
-    depth = 0
-    i = start
-    in_string = False
-    string_char = None
-    
-    while i < len(code):
-        c = code[i]
-        
-        if not in_string and c in '"\'':
-            in_string = True
-            string_char = c
-            i += 1
-            continue
-        
-        if in_string:
-            if c == '\\' and i + 1 < len(code):
-                i += 2
-                continue
-            if c == string_char:
-                in_string = False
-            i += 1
-            continue
-        
-        if c == '(':
-            depth += 1
-        elif c == ')':
-            depth -= 1
-            if depth == 0:
-                return i
-        i += 1
-    return len(code)
-
-
-def extract_block(code, start):
-    """Извлечь блок кода в фигурных скобках"""
-    brace_start = code.find('{', start)
-    if brace_start == -1:
-        return "", len(code)
-    
-    brace_end = find_matching_brace(code, brace_start)
-    return code[brace_start + 1:brace_end], brace_end + 1
-
-
-def connect_nodes(builder, from_id, to_id, label='', branch=''):
-    """Соединить узлы с учётом маркеров"""
-    if isinstance(from_id, tuple):
-        if from_id[0] == 'no_empty':
-            builder.add_edge(from_id[1], to_id, 'нет', 'no')
-        elif from_id[0] == 'from_no_branch':
-            builder.add_edge(from_id[1], to_id, '', 'from_no')
-        elif from_id[0] == 'loop_exit':
-            builder.add_edge(from_id[1], to_id, '', 'loop_exit')
-        elif from_id[0] == 'return':
-            pass  # return не соединяется с следующим блоком
-    else:
-        builder.add_edge(from_id, to_id, label, branch)
-
-
-def is_keyword(code, pos, keyword):
+def is_keyword(code, pos, keyword, hi):
     """Проверить, что в позиции pos начинается ключевое слово"""
-    if not code[pos:].startswith(keyword):
+    if not code.startswith(keyword, pos, hi):
         return False
     end = pos + len(keyword)
-    if end >= len(code):
+    if end >= hi:
         return True
     return not code[end].isalnum() and code[end] != '_'
 
 
-def parse_method_body(code, builder, prev_ids):
-    """Парсить тело метода"""
-    code = code.strip()
-    if not code:
-        return prev_ids
-    
+def parse_method_body(src, lo, hi, builder, prev_ids):
+    """Парсить тело метода - участок кода [lo, hi); шаг для run_steps, как и parse_if и циклы"""
+    code = src.code
     return_ids = []  # Собираем return маркеры
     
-    i = 0
-    while i < len(code):
+    i = lo
+    while i < hi:
         # Пропуск пробелов
-        while i < len(code) and code[i] in ' \t\n\r':
+        while i < hi and code[i] in ' \t\n\r':
             i += 1
         
-        if i >= len(code):
+        if i >= hi:
             break
         
         # Фильтруем return из prev_ids
-        non_return = [p for p in prev_ids if not (isinstance(p, tuple) and p[0] == 'return')]
-        new_returns = [p for p in prev_ids if isinstance(p, tuple) and p[0] == 'return']
+        non_return = [p for p in prev_ids if not is_return(p)]
+        new_returns = [p for p in prev_ids if is_return(p)]
         return_ids.extend(new_returns)
         
         if not non_return:
@@ -199,55 +64,55 @@ def parse_method_body(code, builder, prev_ids):
         prev_ids = non_return
         
         # IF
-        if is_keyword(code, i, 'if'):
-            i, prev_ids = parse_if(code, i, builder, prev_ids)
+        if is_keyword(code, i, 'if', hi):
+            i, prev_ids = yield parse_if(src, i, hi, builder, prev_ids)
             continue
         
         # FOR
-        if is_keyword(code, i, 'for'):
-            i, prev_ids = parse_for(code, i, builder, prev_ids)
+        if is_keyword(code, i, 'for', hi):
+            i, prev_ids = yield parse_for(src, i, hi, builder, prev_ids)
             continue
         
         # FOREACH
-        if is_keyword(code, i, 'foreach'):
-            i, prev_ids = parse_foreach(code, i, builder, prev_ids)
+        if is_keyword(code, i, 'foreach', hi):
+            i, prev_ids = yield parse_foreach(src, i, hi, builder, prev_ids)
             continue
         
         # WHILE
-        if is_keyword(code, i, 'while'):
-            i, prev_ids = parse_while(code, i, builder, prev_ids)
+        if is_keyword(code, i, 'while', hi):
+            i, prev_ids = yield parse_while(src, i, hi, builder, prev_ids)
             continue
         
         # DO
-        if is_keyword(code, i, 'do'):
-            i, prev_ids = parse_do_while(code, i, builder, prev_ids)
+        if is_keyword(code, i, 'do', hi):
+            i, prev_ids = yield parse_do_while(src, i, hi, builder, prev_ids)
             continue
         
         # SWITCH
-        if is_keyword(code, i, 'switch'):
-            i, prev_ids = parse_switch(code, i, builder, prev_ids)
+        if is_keyword(code, i, 'switch', hi):
+            i, prev_ids = parse_switch(src, i, hi, builder, prev_ids)
             continue
         
         # TRY
-        if is_keyword(code, i, 'try'):
-            i, prev_ids = parse_try(code, i, builder, prev_ids)
+        if is_keyword(code, i, 'try', hi):
+            i, prev_ids = yield parse_try(src, i, hi, builder, prev_ids)
             continue
         
         # RETURN
-        if is_keyword(code, i, 'return'):
-            i, prev_ids = parse_return(code, i, builder, prev_ids)
+        if is_keyword(code, i, 'return', hi):
+            i, prev_ids = parse_return(src, i, hi, builder, prev_ids)
             continue
         
         # THROW
-        if is_keyword(code, i, 'throw'):
-            i, prev_ids = parse_throw(code, i, builder, prev_ids)
+        if is_keyword(code, i, 'throw', hi):
+            i, prev_ids = parse_throw(src, i, hi, builder, prev_ids)
             continue
         
         # BREAK / CONTINUE
-        if is_keyword(code, i, 'break') or is_keyword(code, i, 'continue'):
-            end = code.find(';', i)
+        if is_keyword(code, i, 'break', hi) or is_keyword(code, i, 'continue', hi):
+            end = code.find(';', i, hi)
             if end == -1:
-                end = len(code)
+                end = hi
             i = end + 1
             continue
         
@@ -257,11 +122,11 @@ def parse_method_body(code, builder, prev_ids):
             continue
         
         # Обычный оператор (до ;)
-        stmt_end = code.find(';', i)
+        stmt_end = code.find(';', i, hi)
         if stmt_end == -1:
-            stmt_end = len(code)
+            stmt_end = hi
         
-        stmt = code[i:stmt_end].strip()
+        stmt = source_text(code, i, stmt_end)
         if stmt:
             # Проверить - это вывод?
             if 'Console.Write' in stmt or 'MessageBox.Show' in stmt:
@@ -271,7 +136,7 @@ def parse_method_body(code, builder, prev_ids):
             
             for pid in prev_ids:
                 if pid is not None:
-                    connect_nodes(builder, pid, node_id)
+                    builder.connect(pid, node_id)
             prev_ids = [node_id]
         
         i = stmt_end + 1
@@ -280,15 +145,16 @@ def parse_method_body(code, builder, prev_ids):
     return prev_ids + return_ids
 
 
-def parse_if(code, start, builder, prev_ids):
+def parse_if(src, start, hi, builder, prev_ids):
     """Парсить if/else if/else"""
+    code = src.code
     i = start + 2
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
-    if i < len(code) and code[i] == '(':
-        paren_end = find_matching_paren(code, i)
+    if i < hi and code[i] == '(':
+        paren_end = src.close(i, hi)
         condition = code[i + 1:paren_end].strip()
         i = paren_end + 1
     else:
@@ -298,93 +164,81 @@ def parse_if(code, start, builder, prev_ids):
     
     for pid in prev_ids:
         if pid is not None:
-            connect_nodes(builder, pid, cond_id)
+            builder.connect(pid, cond_id)
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
-    edge_idx = len(builder.edges)
+    edge_idx = builder.edge_count
     
-    if i < len(code) and code[i] == '{':
-        body, i = extract_block(code, i)
-        yes_ids = parse_method_body(body, builder, [cond_id])
+    if i < hi and code[i] == '{':
+        body_lo, body_hi, i = src.block(i, hi)
+        yes_ids = yield builder.owned(cond_id, parse_method_body(src, body_lo, body_hi, builder, [cond_id]))
     else:
-        stmt_end = code.find(';', i)
+        stmt_end = code.find(';', i, hi)
         if stmt_end == -1:
-            stmt_end = len(code)
-        stmt = code[i:stmt_end].strip()
+            stmt_end = hi
+        stmt = source_text(code, i, stmt_end)
         if stmt:
-            node_id = builder.add_node('process', stmt)
+            node_id = builder.add_node('process', stmt, parent=cond_id)
             builder.add_edge(cond_id, node_id)
             yes_ids = [node_id]
         else:
             yes_ids = [cond_id]
         i = stmt_end + 1
     
-    for j in range(edge_idx, len(builder.edges)):
-        if builder.edges[j]['from'] == cond_id and not builder.edges[j]['label']:
-            builder.edges[j]['label'] = 'да'
-            builder.edges[j]['branch'] = 'yes'
-            break
+    builder.mark_first_edge(cond_id, edge_idx, 'да', 'yes')
     
     exit_ids = list(yes_ids) if yes_ids else []
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
-    if is_keyword(code, i, 'else'):
+    if is_keyword(code, i, 'else', hi):
         i += 4
-        while i < len(code) and code[i] in ' \t\n\r':
+        while i < hi and code[i] in ' \t\n\r':
             i += 1
         
-        edge_idx = len(builder.edges)
+        edge_idx = builder.edge_count
         
-        if is_keyword(code, i, 'if'):
-            i, no_ids = parse_if(code, i, builder, [cond_id])
-        elif i < len(code) and code[i] == '{':
-            body, i = extract_block(code, i)
-            no_ids = parse_method_body(body, builder, [cond_id])
+        if is_keyword(code, i, 'if', hi):
+            i, no_ids = yield builder.owned(cond_id, parse_if(src, i, hi, builder, [cond_id]))
+        elif i < hi and code[i] == '{':
+            body_lo, body_hi, i = src.block(i, hi)
+            no_ids = yield builder.owned(cond_id, parse_method_body(src, body_lo, body_hi, builder, [cond_id]))
         else:
-            stmt_end = code.find(';', i)
+            stmt_end = code.find(';', i, hi)
             if stmt_end == -1:
-                stmt_end = len(code)
-            stmt = code[i:stmt_end].strip()
+                stmt_end = hi
+            stmt = source_text(code, i, stmt_end)
             if stmt:
-                node_id = builder.add_node('process', stmt)
+                node_id = builder.add_node('process', stmt, parent=cond_id)
                 builder.add_edge(cond_id, node_id)
                 no_ids = [node_id]
             else:
                 no_ids = [cond_id]
             i = stmt_end + 1
         
-        for j in range(edge_idx, len(builder.edges)):
-            if builder.edges[j]['from'] == cond_id and not builder.edges[j]['label']:
-                builder.edges[j]['label'] = 'нет'
-                builder.edges[j]['branch'] = 'no'
-                break
+        builder.mark_first_edge(cond_id, edge_idx, 'нет', 'no')
         
-        # Когда есть else, выходы без маркеров
-        for nid in no_ids:
-            if nid is not None:
-                if isinstance(nid, tuple):
-                    exit_ids.append(nid)
-                else:
-                    exit_ids.append(nid)  # Без маркера from_no_branch
+        # Когда есть else, выходы без маркера from_no
+        exit_ids += [nid for nid in no_ids if nid is not None]
     else:
-        exit_ids.append(('no_empty', cond_id))
+        exit_ids.append(exit_marker(NO_EMPTY, cond_id))
     
     return i, exit_ids if exit_ids else [None]
 
 
-def parse_for(code, start, builder, prev_ids):
+def parse_for(src, start, hi, builder, prev_ids):
     """Парсить for"""
+    code = src.code
     i = start + 3
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
-    if i < len(code) and code[i] == '(':
-        paren_end = find_matching_paren(code, i)
+    if i < hi and code[i] == '(':
+        paren_end = src.close(i, hi)
         header = code[i + 1:paren_end].strip()
         i = paren_end + 1
     else:
@@ -394,37 +248,38 @@ def parse_for(code, start, builder, prev_ids):
     
     for pid in prev_ids:
         if pid is not None:
-            connect_nodes(builder, pid, loop_id)
+            builder.connect(pid, loop_id)
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
-    if i < len(code) and code[i] == '{':
-        body, i = extract_block(code, i)
-        body_ids = parse_method_body(body, builder, [loop_id])
+    if i < hi and code[i] == '{':
+        body_lo, body_hi, i = src.block(i, hi)
+        body_ids = yield builder.owned(loop_id, parse_method_body(src, body_lo, body_hi, builder, [loop_id]))
     else:
-        stmt_end = code.find(';', i)
+        stmt_end = code.find(';', i, hi)
         if stmt_end == -1:
-            stmt_end = len(code)
+            stmt_end = hi
         i = stmt_end + 1
         body_ids = []
     
     for bid in body_ids:
-        if bid is not None and not isinstance(bid, tuple):
+        if bid is not None and bid >= 0:
             builder.add_edge(bid, loop_id, '', 'loop_back')
     
-    return i, [('loop_exit', loop_id)]
+    return i, [exit_marker(LOOP_EXIT, loop_id)]
 
 
-def parse_foreach(code, start, builder, prev_ids):
+def parse_foreach(src, start, hi, builder, prev_ids):
     """Парсить foreach"""
+    code = src.code
     i = start + 7
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
-    if i < len(code) and code[i] == '(':
-        paren_end = find_matching_paren(code, i)
+    if i < hi and code[i] == '(':
+        paren_end = src.close(i, hi)
         header = code[i + 1:paren_end].strip()
         i = paren_end + 1
     else:
@@ -434,37 +289,38 @@ def parse_foreach(code, start, builder, prev_ids):
     
     for pid in prev_ids:
         if pid is not None:
-            connect_nodes(builder, pid, loop_id)
+            builder.connect(pid, loop_id)
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
-    if i < len(code) and code[i] == '{':
-        body, i = extract_block(code, i)
-        body_ids = parse_method_body(body, builder, [loop_id])
+    if i < hi and code[i] == '{':
+        body_lo, body_hi, i = src.block(i, hi)
+        body_ids = yield builder.owned(loop_id, parse_method_body(src, body_lo, body_hi, builder, [loop_id]))
     else:
-        stmt_end = code.find(';', i)
+        stmt_end = code.find(';', i, hi)
         if stmt_end == -1:
-            stmt_end = len(code)
+            stmt_end = hi
         i = stmt_end + 1
         body_ids = []
     
     for bid in body_ids:
-        if bid is not None and not isinstance(bid, tuple):
+        if bid is not None and bid >= 0:
             builder.add_edge(bid, loop_id, '', 'loop_back')
     
-    return i, [('loop_exit', loop_id)]
+    return i, [exit_marker(LOOP_EXIT, loop_id)]
 
 
-def parse_while(code, start, builder, prev_ids):
+def parse_while(src, start, hi, builder, prev_ids):
     """Парсить while"""
+    code = src.code
     i = start + 5
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
-    if i < len(code) and code[i] == '(':
-        paren_end = find_matching_paren(code, i)
+    if i < hi and code[i] == '(':
+        paren_end = src.close(i, hi)
         condition = code[i + 1:paren_end].strip()
         i = paren_end + 1
     else:
@@ -474,79 +330,80 @@ def parse_while(code, start, builder, prev_ids):
     
     for pid in prev_ids:
         if pid is not None:
-            connect_nodes(builder, pid, loop_id)
+            builder.connect(pid, loop_id)
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
-    if i < len(code) and code[i] == '{':
-        body, i = extract_block(code, i)
-        body_ids = parse_method_body(body, builder, [loop_id])
+    if i < hi and code[i] == '{':
+        body_lo, body_hi, i = src.block(i, hi)
+        body_ids = yield builder.owned(loop_id, parse_method_body(src, body_lo, body_hi, builder, [loop_id]))
     else:
-        stmt_end = code.find(';', i)
+        stmt_end = code.find(';', i, hi)
         if stmt_end == -1:
-            stmt_end = len(code)
+            stmt_end = hi
         i = stmt_end + 1
         body_ids = []
     
     for bid in body_ids:
-        if bid is not None and not isinstance(bid, tuple):
+        if bid is not None and bid >= 0:
             builder.add_edge(bid, loop_id, '', 'loop_back')
     
-    return i, [('loop_exit', loop_id)]
+    return i, [exit_marker(LOOP_EXIT, loop_id)]
 
 
-def parse_do_while(code, start, builder, prev_ids):
+def parse_do_while(src, start, hi, builder, prev_ids):
     """Парсить do-while: тело → условие (ромб) → да к началу тела, нет дальше"""
+    code = src.code
     i = start + 2
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
     # Парсим тело цикла
-    if i < len(code) and code[i] == '{':
-        body, i = extract_block(code, i)
+    nodes_before = builder.node_count
+    if i < hi and code[i] == '{':
+        body_lo, body_hi, i = src.block(i, hi)
         # Парсим тело, начиная от prev_ids
-        body_ids = parse_method_body(body, builder, prev_ids)
+        body_ids = yield parse_method_body(src, body_lo, body_hi, builder, prev_ids)
     else:
         body_ids = prev_ids
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
     # Ищем while
-    if is_keyword(code, i, 'while'):
+    if is_keyword(code, i, 'while', hi):
         i += 5
-        while i < len(code) and code[i] in ' \t\n\r':
+        while i < hi and code[i] in ' \t\n\r':
             i += 1
         
-        if i < len(code) and code[i] == '(':
-            paren_end = find_matching_paren(code, i)
+        if i < hi and code[i] == '(':
+            paren_end = src.close(i, hi)
             condition = code[i + 1:paren_end].strip()
             i = paren_end + 1
         else:
             condition = "?"
         
-        # Создаём условие (ромб)
+        # Создаём условие (ромб) - владелец уже построенного тела
         cond_id = builder.add_node('condition', condition + '?')
+        builder.adopt(nodes_before, cond_id)
         
         # Связываем конец тела с условием
         for bid in body_ids:
-            if bid is not None and not isinstance(bid, tuple):
-                builder.add_edge(bid, cond_id)
-            elif isinstance(bid, tuple) and bid[0] != 'return':
-                builder.add_edge(bid[1], cond_id)
+            if bid is not None and exit_kind(bid) != RETURN:
+                builder.add_edge(exit_node(bid), cond_id)
         
         # Находим первый блок тела (после prev_ids)
         # Это будет первый узел, добавленный после начала парсинга тела
         first_body_node = None
         for pid in prev_ids:
-            if isinstance(pid, tuple):
+            if pid is None or pid < 0:
                 continue
             # Находим детей pid
-            for edge in builder.edges:
-                if edge['from'] == pid and edge['to'] != cond_id:
-                    first_body_node = edge['to']
+            for to_id in builder.out_targets(pid):
+                if to_id != cond_id:
+                    first_body_node = to_id
                     break
             if first_body_node:
                 break
@@ -555,24 +412,25 @@ def parse_do_while(code, start, builder, prev_ids):
         if first_body_node is not None:
             builder.add_edge(cond_id, first_body_node, 'да', 'yes')
         
-        while i < len(code) and code[i] in ' \t\n\r;':
+        while i < hi and code[i] in ' \t\n\r;':
             i += 1
         
         # Выход - ветка "нет" от условия
-        return i, [('no_empty', cond_id)]
+        return i, [exit_marker(NO_EMPTY, cond_id)]
     
     return i, body_ids
 
 
-def parse_switch(code, start, builder, prev_ids):
+def parse_switch(src, start, hi, builder, prev_ids):
     """Парсить switch"""
+    code = src.code
     i = start + 6
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
-    if i < len(code) and code[i] == '(':
-        paren_end = find_matching_paren(code, i)
+    if i < hi and code[i] == '(':
+        paren_end = src.close(i, hi)
         expr = code[i + 1:paren_end].strip()
         i = paren_end + 1
     else:
@@ -582,101 +440,102 @@ def parse_switch(code, start, builder, prev_ids):
     
     for pid in prev_ids:
         if pid is not None:
-            connect_nodes(builder, pid, switch_id)
+            builder.connect(pid, switch_id)
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
     exit_ids = []
     
-    if i < len(code) and code[i] == '{':
-        body, i = extract_block(code, i)
+    if i < hi and code[i] == '{':
+        body_lo, body_hi, i = src.block(i, hi)
         
-        cases = re.findall(r'case\s+([^:]+):', body)
-        has_default = 'default:' in body
+        cases = CASE_RE.findall(code, body_lo, body_hi)
+        has_default = code.find('default:', body_lo, body_hi) != -1
         
         for case_val in cases:
-            case_id = builder.add_node('process', f'case {case_val.strip()}')
+            case_id = builder.add_node('process', f'case {case_val.strip()}', parent=switch_id)
             builder.add_edge(switch_id, case_id, case_val.strip(), 'yes')
             exit_ids.append(case_id)
         
         if has_default:
-            default_id = builder.add_node('process', 'default')
+            default_id = builder.add_node('process', 'default', parent=switch_id)
             builder.add_edge(switch_id, default_id, 'default', 'no')
             exit_ids.append(default_id)
     
     return i, exit_ids if exit_ids else [switch_id]
 
 
-def parse_try(code, start, builder, prev_ids):
+def parse_try(src, start, hi, builder, prev_ids):
     """Парсить try-catch-finally"""
+    code = src.code
     i = start + 3
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
     try_id = builder.add_node('process', 'try')
     
     for pid in prev_ids:
         if pid is not None:
-            connect_nodes(builder, pid, try_id)
+            builder.connect(pid, try_id)
     
-    if i < len(code) and code[i] == '{':
-        body, i = extract_block(code, i)
-        try_ids = parse_method_body(body, builder, [try_id])
+    if i < hi and code[i] == '{':
+        body_lo, body_hi, i = src.block(i, hi)
+        try_ids = yield builder.owned(try_id, parse_method_body(src, body_lo, body_hi, builder, [try_id]))
     else:
         try_ids = [try_id]
     
     exit_ids = list(try_ids)
     
     while True:
-        while i < len(code) and code[i] in ' \t\n\r':
+        while i < hi and code[i] in ' \t\n\r':
             i += 1
         
-        if not is_keyword(code, i, 'catch'):
+        if not is_keyword(code, i, 'catch', hi):
             break
         
         i += 5
-        while i < len(code) and code[i] in ' \t\n\r':
+        while i < hi and code[i] in ' \t\n\r':
             i += 1
         
         exception = ""
-        if i < len(code) and code[i] == '(':
-            paren_end = find_matching_paren(code, i)
+        if i < hi and code[i] == '(':
+            paren_end = src.close(i, hi)
             exception = code[i + 1:paren_end].strip()
             i = paren_end + 1
         
         catch_text = f'catch ({exception})' if exception else 'catch'
-        catch_id = builder.add_node('process', catch_text)
+        catch_id = builder.add_node('process', catch_text, parent=try_id)
         builder.add_edge(try_id, catch_id, 'ошибка', 'no')
         
-        while i < len(code) and code[i] in ' \t\n\r':
+        while i < hi and code[i] in ' \t\n\r':
             i += 1
         
-        if i < len(code) and code[i] == '{':
-            body, i = extract_block(code, i)
-            catch_ids = parse_method_body(body, builder, [catch_id])
+        if i < hi and code[i] == '{':
+            body_lo, body_hi, i = src.block(i, hi)
+            catch_ids = yield builder.owned(catch_id, parse_method_body(src, body_lo, body_hi, builder, [catch_id]))
             exit_ids.extend(catch_ids)
         else:
             exit_ids.append(catch_id)
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    while i < hi and code[i] in ' \t\n\r':
         i += 1
     
-    if is_keyword(code, i, 'finally'):
+    if is_keyword(code, i, 'finally', hi):
         i += 7
-        while i < len(code) and code[i] in ' \t\n\r':
+        while i < hi and code[i] in ' \t\n\r':
             i += 1
         
-        finally_id = builder.add_node('process', 'finally')
+        finally_id = builder.add_node('process', 'finally', parent=try_id)
         
         for eid in exit_ids:
-            if eid is not None and not isinstance(eid, tuple):
+            if eid is not None and eid >= 0:
                 builder.add_edge(eid, finally_id)
         
-        if i < len(code) and code[i] == '{':
-            body, i = extract_block(code, i)
-            finally_ids = parse_method_body(body, builder, [finally_id])
+        if i < hi and code[i] == '{':
+            body_lo, body_hi, i = src.block(i, hi)
+            finally_ids = yield builder.owned(finally_id, parse_method_body(src, body_lo, body_hi, builder, [finally_id]))
             exit_ids = finally_ids
         else:
             exit_ids = [finally_id]
@@ -684,48 +543,50 @@ def parse_try(code, start, builder, prev_ids):
     return i, exit_ids
 
 
-def parse_return(code, start, builder, prev_ids):
+def parse_return(src, start, hi, builder, prev_ids):
     """Парсить return - терминальный узел"""
+    code = src.code
     i = start + 6
     
-    stmt_end = code.find(';', i)
+    stmt_end = code.find(';', i, hi)
     if stmt_end == -1:
-        stmt_end = len(code)
+        stmt_end = hi
     
-    value = code[i:stmt_end].strip()
+    value = source_text(code, i, stmt_end)
     text = f'return {value}' if value else 'return'
     
     ret_id = builder.add_node('output', text)
     
     for pid in prev_ids:
         if pid is not None:
-            connect_nodes(builder, pid, ret_id)
+            builder.connect(pid, ret_id)
     
-    return stmt_end + 1, [('return', ret_id)]  # Маркер return
+    return stmt_end + 1, [exit_marker(RETURN, ret_id)]  # Маркер return
 
 
-def parse_throw(code, start, builder, prev_ids):
+def parse_throw(src, start, hi, builder, prev_ids):
     """Парсить throw"""
+    code = src.code
     i = start + 5
     
-    stmt_end = code.find(';', i)
+    stmt_end = code.find(';', i, hi)
     if stmt_end == -1:
-        stmt_end = len(code)
+        stmt_end = hi
     
-    value = code[i:stmt_end].strip()
+    value = source_text(code, i, stmt_end)
     text = f'throw {value}' if value else 'throw'
     
     throw_id = builder.add_node('process', text)
     
     for pid in prev_ids:
         if pid is not None:
-            connect_nodes(builder, pid, throw_id)
+            builder.connect(pid, throw_id)
     
     return stmt_end + 1, [throw_id]
 
 
-def parse_method(name, params, body, class_name=""):
-    """Парсить метод и построить блок-схему"""
+def parse_method(src, name, params, body, class_name=""):
+    """Парсить метод и построить блок-схему (body - участок (lo, hi) тела)"""
     builder = CSharpFlowchartBuilder()
     
     display_name = f'{class_name}.{name}' if class_name else name
@@ -738,25 +599,17 @@ def parse_method(name, params, body, class_name=""):
         builder.add_edge(start_id, param_id)
         prev_ids = [param_id]
     
-    last_ids = parse_method_body(body, builder, prev_ids)
+    last_ids = run_steps(parse_method_body(src, body[0], body[1], builder, prev_ids))
     
     end_id = builder.add_node('end', '')
     for lid in last_ids:
-        if lid is None:
-            continue
-        if isinstance(lid, tuple):
-            if lid[0] == 'return':
-                builder.add_edge(lid[1], end_id)  # return к end
-            else:
-                connect_nodes(builder, lid, end_id)
-        else:
-            builder.add_edge(lid, end_id)
+        builder.connect(lid, end_id, returns=True)  # return к end
     
     return builder.get_flowchart_data()
 
 
-def parse_property_accessor(name, accessor_type, body, class_name=""):
-    """Парсить get/set аксессор свойства"""
+def parse_property_accessor(src, name, accessor_type, body, class_name=""):
+    """Парсить get/set аксессор свойства (body - участок (lo, hi) тела)"""
     builder = CSharpFlowchartBuilder()
     
     display_name = f'{class_name}.{name}.{accessor_type}'
@@ -769,126 +622,109 @@ def parse_property_accessor(name, accessor_type, body, class_name=""):
         builder.add_edge(start_id, param_id)
         prev_ids = [param_id]
     
-    last_ids = parse_method_body(body, builder, prev_ids)
+    last_ids = run_steps(parse_method_body(src, body[0], body[1], builder, prev_ids))
     
     end_id = builder.add_node('end', '')
     for lid in last_ids:
-        if lid is None:
-            continue
-        connect_nodes(builder, lid, end_id)
+        builder.connect(lid, end_id)
     
     return builder.get_flowchart_data()
 
 
-def extract_class_members(class_body):
-    """Извлечь члены класса"""
+def extract_class_members(src, lo, hi):
+    """Извлечь члены класса из участка [lo, hi); тела - участки (lo, hi)"""
+    code = src.code
     fields = []
     properties = []
     methods = []
     
-    body = class_body.strip()
-    i = 0
+    i = lo
     
-    while i < len(body):
-        while i < len(body) and body[i] in ' \t\n\r':
+    while i < hi:
+        while i < hi and code[i] in ' \t\n\r':
             i += 1
         
-        if i >= len(body):
+        if i >= hi:
             break
         
         # Пропустить атрибуты [...]
-        if body[i] == '[':
-            depth = 1
-            i += 1
-            while i < len(body) and depth > 0:
-                if body[i] == '[':
-                    depth += 1
-                elif body[i] == ']':
-                    depth -= 1
-                i += 1
+        if code[i] == '[':
+            i = src.close(i, hi) + 1
             continue
         
-        # Найти конец объявления
-        line_start = i
-        
         # Собрать модификаторы и тип
+        decl_start = i
         decl_parts = []
-        while i < len(body):
-            while i < len(body) and body[i] in ' \t\n\r':
+        while i < hi:
+            while i < hi and code[i] in ' \t\n\r':
                 i += 1
             
-            if i >= len(body):
+            if i >= hi:
                 break
             
             # Читаем слово
-            if body[i].isalpha() or body[i] == '_':
+            if code[i].isalpha() or code[i] == '_':
                 word_start = i
-                while i < len(body) and (body[i].isalnum() or body[i] in '_<>[],.'):
-                    if body[i] == '<':
-                        # Generic
-                        depth = 1
-                        i += 1
-                        while i < len(body) and depth > 0:
-                            if body[i] == '<':
-                                depth += 1
-                            elif body[i] == '>':
-                                depth -= 1
-                            i += 1
+                while i < hi and (code[i].isalnum() or code[i] in '_<>[],.'):
+                    if code[i] == '<':
+                        # Generic - прыжок к парной '>' из таблицы скобок
+                        i = src.pairs.get(i, i) + 1
                     else:
                         i += 1
-                word = body[word_start:i]
+                word = code[word_start:i]
                 decl_parts.append(word)
-            elif body[i] == '(':
+            elif code[i] == '(':
                 # Это метод
-                paren_end = find_matching_paren(body, i)
-                params = body[i + 1:paren_end].strip()
+                paren_end = src.close(i, hi)
+                params = code[i + 1:paren_end].strip()
                 i = paren_end + 1
                 
-                while i < len(body) and body[i] in ' \t\n\r':
+                while i < hi and code[i] in ' \t\n\r':
                     i += 1
                 
-                if i < len(body) and body[i] == '{':
-                    method_body, i = extract_block(body, i)
+                if i < hi and code[i] == '{':
+                    body_lo, body_hi, i = src.block(i, hi)
                     method_name = decl_parts[-1] if decl_parts else "unknown"
                     methods.append({
                         'name': method_name,
                         'params': params,
-                        'body': method_body
+                        'start': decl_start,
+                        'body': (body_lo, body_hi)
                     })
                 break
-            elif body[i] == '{':
+            elif code[i] == '{':
                 # Это свойство или инициализатор
-                prop_body, end_i = extract_block(body, i)
+                prop_lo, prop_hi, end_i = src.block(i, hi)
                 
-                if 'get' in prop_body or 'set' in prop_body:
+                if code.find('get', prop_lo, prop_hi) != -1 or code.find('set', prop_lo, prop_hi) != -1:
                     # Свойство
                     prop_name = decl_parts[-1] if decl_parts else "unknown"
                     
                     # Найти get
-                    get_match = re.search(r'\bget\s*\{', prop_body)
+                    get_match = GET_RE.search(code, prop_lo, prop_hi)
                     if get_match:
-                        get_start = get_match.end() - 1
-                        get_body, _ = extract_block(prop_body, get_start)
+                        get_lo, get_hi, _ = src.block(get_match.end() - 1, prop_hi)
                         properties.append({
                             'name': prop_name,
                             'accessor': 'get',
-                            'body': get_body
+                            'start': decl_start,
+                            'body': (get_lo, get_hi)
                         })
                     
                     # Найти set
-                    set_match = re.search(r'\bset\s*\{', prop_body)
+                    set_match = SET_RE.search(code, prop_lo, prop_hi)
                     if set_match:
-                        set_start = set_match.end() - 1
-                        set_body, _ = extract_block(prop_body, set_start)
+                        set_lo, set_hi, _ = src.block(set_match.end() - 1, prop_hi)
                         properties.append({
                             'name': prop_name,
                             'accessor': 'set',
-                            'body': set_body
+                            'start': decl_start,
+                            'body': (set_lo, set_hi)
                         })
                 
                 i = end_i
                 break
-            elif body[i] == '=' or body[i] == ';':
+            elif code[i] == '=' or code[i] == ';':
                 # Поле
                 if decl_parts:
                     field_name = decl_parts[-1]
@@ -897,9 +733,8 @@ def extract_class_members(class_body):
                         fields.append(field_name)
                 
                 # Пропустить до ;
-                while i < len(body) and body[i] != ';':
-                    i += 1
-                i += 1
+                semi = code.find(';', i, hi)
+                i = (semi if semi != -1 else hi) + 1
                 break
             else:
                 i += 1
@@ -908,22 +743,22 @@ def extract_class_members(class_body):
     return fields, properties, methods
 
 
-def parse_class(code, start):
-    """Парсить класс"""
-    match = re.search(r'class\s+(\w+)', code[start:])
-    if not match:
-        return start, None, None, []
-    
-    class_name = match.group(1)
+def scan_class(src, decl):
+    """Заголовок типа по совпадению из индекса объявлений: (конец, имя, участок тела или None)"""
+    code = src.code
+    class_name = decl.group('name')
     
-    brace_start = code.find('{', start + match.end())
-    if brace_start == -1:
-        return start, None, None, []
-    
-    class_body, end_pos = extract_block(code, brace_start)
-    
-    fields, properties, methods = extract_class_members(class_body)
+    # У записи без тела (record Point(int X, int Y);) нет членов для схемы
+    header = HEADER_END_RE.search(code, decl.end())
+    if not header or header.group() == ';':
+        return decl.end(), None, None
     
+    body_lo, body_hi, end_pos = src.block(header.start(), len(code))
+    return end_pos, class_name, (body_lo, body_hi)
+
+
+def build_class(class_name, fields, properties, methods):
+    """Блок-схема класса: поля, свойства и методы веером"""
     builder = CSharpFlowchartBuilder()
     class_id = builder.add_node('class_start', class_name)
     
@@ -946,76 +781,143 @@ def parse_class(code, start):
         method_id = builder.add_node('method', method_name + '()')
         builder.add_edge(last_id, method_id, '', f'fan_{i}')
     
-    method_flowcharts = []
+    return builder.get_flowchart_data()
+
+
+def iter_types(src):
+    """Типы верхнего уровня: (имя, namespace, начало, конец, (поля, свойства, методы))"""
+    code = src.code
+    namespaces = []  # стек (имя, конец блока) объемлющих namespace
+    end_pos = 0      # конец последнего разобранного типа - вложенные типы пропускаются
+    
+    for decl in src.declarations():
+        start = decl.start()
+        if start < end_pos:
+            continue
+        
+        while namespaces and namespaces[-1][1] <= start:
+            namespaces.pop()
+        
+        if decl.lastgroup == 'namespace':
+            body = NAMESPACE_BODY_RE.match(code, decl.end())
+            if body:
+                if body.group(1) == '{':
+                    ns_end = src.close(body.end() - 1, len(code))
+                else:
+                    ns_end = len(code)  # namespace X; - до конца файла
+                namespaces.append((decl.group('namespace'), ns_end))
+            continue
+        
+        end_pos, class_name, body = scan_class(src, decl)
+        if class_name:
+            namespace = '.'.join(name for name, _ in namespaces)
+            yield class_name, namespace, start, end_pos, extract_class_members(src, *body)
+
+
+def iter_members(src, class_name, members):
+    """Методы и аксессоры свойств типа: (полное имя, тип, начало, конец, построитель)"""
+    _, properties, methods = members
     
     for method in methods:
-        flowchart = parse_method(method['name'], method['params'], method['body'], class_name)
-        method_flowcharts.append({
-            'name': f'{class_name}.{method["name"]}',
-            'type': 'method',
-            'flowchart': flowchart
-        })
+        yield (f'{class_name}.{method["name"]}', 'method', method['start'], method['body'][1],
+               partial(parse_method, src, method['name'], method['params'], method['body'], class_name))
     
     for prop in properties:
-        flowchart = parse_property_accessor(prop['name'], prop['accessor'], prop['body'], class_name)
-        method_flowcharts.append({
-            'name': f'{class_name}.{prop["name"]}.{prop["accessor"]}',
-            'type': 'property',
+        yield (f'{class_name}.{prop["name"]}.{prop["accessor"]}', 'property', prop['start'], prop['body'][1],
+               partial(parse_property_accessor, src, prop['name'], prop['accessor'], prop['body'], class_name))
+
+
+def iter_csharp(code):
+    """Блок-схемы типов и их членов по мере построения, в конце - код"""
+    with phase('lex'):
+        code = remove_comments(code)
+        src = CSharpSource(code)
+    
+    for class_name, namespace, _, _, members in iter_types(src):
+        with phase('build'):
+            flowchart = build_class(class_name, *members)
+        yield {
+            'name': class_name,
+            'type': 'class',
+            'namespace': namespace,
             'flowchart': flowchart
-        })
+        }
+        for name, entry_type, _, _, build in iter_members(src, class_name, members):
+            with phase('build'):
+                flowchart = build()
+            yield {
+                'name': name,
+                'type': entry_type,
+                'flowchart': flowchart
+            }
     
-    return end_pos, class_name, builder.get_flowchart_data(), method_flowcharts
+    yield code_record(code)
 
 
 def parse_csharp(code):
     """Главная функция парсинга C#"""
-    code = remove_comments(code)
+    return collect_entries(iter_csharp(code))
+
+
+@lru_cache(maxsize=2)
+def load_csharp(code):
+    """Исходник без комментариев и таблица скобок - кэш процесса для повторных запросов"""
+    return CSharpSource(remove_comments(code))
+
+
+def outline_csharp(code):
+    """Оглавление C#-файла без построения блок-схем"""
+    src = load_csharp(code)
+    lines = LineIndex(src.code)
     
     functions = []
     classes = []
     
-    i = 0
-    while i < len(code):
-        while i < len(code) and code[i] in ' \t\n\r':
-            i += 1
-        
-        if i >= len(code):
-            break
-        
-        if code[i:].startswith('using '):
-            semi = code.find(';', i)
-            if semi != -1:
-                i = semi + 1
-            continue
-        
-        if code[i:].startswith('namespace '):
-            brace = code.find('{', i)
-            if brace != -1:
-                i = brace + 1
-            continue
-        
-        class_match = re.search(r'\bclass\s+\w+', code[i:])
-        if class_match:
-            class_start = i + class_match.start()
-            end_pos, class_name, class_flowchart, method_flowcharts = parse_class(code, class_start)
-            
-            if class_name:
-                classes.append({
-                    'name': class_name,
-                    'type': 'class',
-                    'flowchart': class_flowchart
-                })
-                functions.extend(method_flowcharts)
-            
-            i = end_pos
-            continue
+    for class_name, namespace, start, end_pos, members in iter_types(src):
+        fields, properties, methods = members
+        # Схема класса: начало, поля, свойства и по блоку на метод
+        size = 1 + bool(fields) + bool(properties) + len(methods)
+        entry = outline_entry(class_name, 'class', lines.line(start), lines.line(end_pos - 1), size)
+        entry['namespace'] = namespace
+        classes.append(entry)
         
-        i += 1
+        for name, entry_type, lo, hi, _ in iter_members(src, class_name, members):
+            functions.append(outline_entry(name, entry_type, lines.line(lo), lines.line(hi),
+                                           estimate_size(src.code, lo, hi)))
     
     return {
         'success': True,
-        'main_flowchart': {'nodes': [], 'edges': []},
+        'main': None,
         'functions': functions,
         'classes': classes,
-        'code': code
+        'code': src.code
     }
+
+
+def build_csharp_flowchart(code, name):
+    """Блок-схема одного типа, метода или аксессора по полному имени (None, если не найдено)"""
+    src = load_csharp(code)
+    
+    for class_name, _, _, _, members in iter_types(src):
+        if class_name == name:
+            return {'name': name, 'type': 'class', 'flowchart': build_class(class_name, *members)}
+        if not name.startswith(class_name + '.'):
+            continue
+        for member_name, entry_type, _, _, build in iter_members(src, class_name, members):
+            if member_name == name:
+                return {'name': name, 'type': entry_type, 'flowchart': build()}
+    return None
+
+
+def index_csharp(code):
+    """Типы и их члены с хэшем текста (без комментариев): (запись без схемы, хэш, построитель)"""
+    src = load_csharp(code)
+    code = src.code
+    
+    for class_name, namespace, start, end_pos, members in iter_types(src):
+        digest = declaration_digest(class_name, 'class', namespace, code[start:end_pos])
+        yield ({'name': class_name, 'type': 'class', 'namespace': namespace}, digest,
+               partial(build_class, class_name, *members))
+        
+        for name, entry_type, lo, hi, build in iter_members(src, class_name, members):
+            yield {'name': name, 'type': entry_type}, declaration_digest(name, entry_type, code[lo:hi + 1]), build
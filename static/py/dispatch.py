@@ -0,0 +1,184 @@
+"""
+Выбор парсера по расширению файла и разбор одного файла
+Общая точка входа для /upload и пакетной обработки
+"""
+import json
+
+from .cs_parser import build_csharp_flowchart, index_csharp, iter_csharp, outline_csharp, parse_csharp
+from .export import svg_filename
+from .incremental import declaration_index, declaration_key, diff_declarations
+from .js_parser import (build_javascript_flowchart, index_javascript, iter_javascript, outline_javascript,
+                        parse_javascript)
+from .metrics import phase
+from .py_parser import build_python_flowchart, index_python, iter_python, outline_python, parse_python
+from .svg_renderer import render_svg
+from .wire_format import encode_record, encode_result
+
+PARSERS = {
+    '.py': parse_python,
+    '.js': parse_javascript,
+    '.cs': parse_csharp,
+}
+
+# Outline-режим: оглавление файла и построение одной схемы по запросу
+OUTLINERS = {
+    '.py': outline_python,
+    '.js': outline_javascript,
+    '.cs': outline_csharp,
+}
+
+FLOWCHART_BUILDERS = {
+    '.py': build_python_flowchart,
+    '.js': build_javascript_flowchart,
+    '.cs': build_csharp_flowchart,
+}
+
+# Потоковый режим: записи блок-схем по мере построения
+STREAMERS = {
+    '.py': iter_python,
+    '.js': iter_javascript,
+    '.cs': iter_csharp,
+}
+
+# Повторный разбор: объявления со структурными хэшами
+INDEXERS = {
+    '.py': index_python,
+    '.js': index_javascript,
+    '.cs': index_csharp,
+}
+
+SUPPORTED_EXTENSIONS = set(PARSERS)
+
+# Версия парсеров - входит в ключи кэшей, увеличивать при изменении вывода
+PARSER_VERSION = 5
+
+MAX_CODE_LENGTH = 1024 * 1024
+
+
+class ParseError(Exception):
+    """Ошибка разбора, которую показываем пользователю"""
+    
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+    
+    def __reduce__(self):
+        # Ошибка передаётся из процесса-обработчика вместе со статусом
+        return ParseError, (self.message, self.status)
+
+
+def detect_extension(filename):
+    """Поддерживаемое расширение файла (None, если не поддерживается)"""
+    filename = filename.lower()
+    for ext in PARSERS:
+        if filename.endswith(ext):
+            return ext
+    return None
+
+
+def _run(handlers, data, ext, *args):
+    """Декодировать файл и вызвать обработчик для его языка"""
+    with phase('decode'):
+        code = data.decode('utf-8')
+    
+    if len(code) > MAX_CODE_LENGTH:
+        raise ParseError('Файл слишком большой')
+    
+    try:
+        return handlers[ext](code, *args)
+    except SyntaxError as e:
+        raise _syntax_error(e)
+
+
+def _syntax_error(e):
+    return ParseError(f'Синтаксическая ошибка: строка {e.lineno}')
+
+
+# compact и code у обработчиков ниже - вариант ответа (см. wire_format)
+# Кодирование выполняется в процессе-обработчике, чтобы меньше гонять через канал
+def parse_source(data, ext, compact=False, code=True):
+    """Разобрать байты файла парсером для расширения ext"""
+    result = _run(PARSERS, data, ext)
+    with phase('encode'):
+        return encode_result(result, compact, code)
+
+
+def outline_source(data, ext, code=True):
+    """Оглавление файла: функции и классы со строками и оценкой размера"""
+    result = _run(OUTLINERS, data, ext)
+    # Ключи объявлений - как в reparse_source: повторы имён нумеруются в порядке файла
+    entries = ([result['main']] if result.get('main') else []) + result['classes'] + result['functions']
+    keys = {}
+    for entry in sorted(entries, key=lambda entry: entry['lines'][0]):
+        entry['key'] = declaration_key(entry['name'], keys)
+        keys[entry['key']] = None
+    return encode_result(result, code=code)
+
+
+def stream_source(data, ext, compact=False, code=True):
+    """Записи блок-схем файла по одной (генератор для WorkerPool.stream); у схем - ключ
+    объявления, как в reparse_source"""
+    records = _run(STREAMERS, data, ext)
+    keys = {}
+    try:
+        for record in records:
+            if 'flowchart' in record:
+                record = dict(record, key=declaration_key(record['name'], keys))
+                keys[record['key']] = None
+            record = encode_record(record, compact, code)
+            if record is not None:
+                yield record
+    except SyntaxError as e:
+        raise _syntax_error(e)
+
+
+def export_source(data, ext):
+    """SVG блок-схем файла по одной: (имя файла в архиве, байты SVG)"""
+    records = _run(STREAMERS, data, ext)
+    used = set()
+    try:
+        for record in records:
+            if 'flowchart' in record:
+                yield svg_filename(record, used), render_svg(record['flowchart']).encode('utf-8')
+    except SyntaxError as e:
+        raise _syntax_error(e)
+
+
+def reparse_source(data, ext, old_index, compact=False):
+    """Изменения относительно прошлой версии: схемы только для новых и изменённых объявлений"""
+    try:
+        return diff_declarations(ext, _run(INDEXERS, data, ext), old_index, compact)
+    except SyntaxError as e:
+        raise _syntax_error(e)
+
+
+def index_source(data, ext):
+    """Индекс объявлений файла для reparse_source (документ потока или оглавления хранится без него)"""
+    try:
+        return declaration_index(_run(INDEXERS, data, ext))
+    except SyntaxError as e:
+        raise _syntax_error(e)
+
+
+def build_flowchart(data, ext, name, compact=False):
+    """Блок-схема одного объявления по полному имени"""
+    entry = _run(FLOWCHART_BUILDERS, data, ext, name)
+    if entry is None:
+        raise ParseError(f'Не найдено: {name}', 404)
+    return encode_record(entry, compact)
+
+
+def dumps(obj):
+    """Компактный JSON в байтах"""
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def parse_to_json(data, ext, compact=False, code=True):
+    """Разбор без исключений: (статус, JSON результата или текста ошибки)"""
+    try:
+        return 200, dumps(parse_source(data, ext, compact, code))
+    except ParseError as e:
+        return e.status, dumps(e.message)
+    except Exception as e:
+        return 500, dumps(f'Ошибка: {str(e)}')
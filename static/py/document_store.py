@@ -0,0 +1,63 @@
+"""
+Хранилище загруженных документов для outline-режима и повторного разбора
+Исходники живут TTL секунд с последнего обращения, общий объём ограничен
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class DocumentStore:
+    """Исходники по doc_id с вытеснением по времени и размеру"""
+    
+    def __init__(self, ttl, max_bytes):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # doc_id -> (байты, расширение, время доступа, индекс объявлений)
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+    
+    def _evict(self, now):
+        """Удалить устаревшие записи и лишние по объёму (самые старые первыми)"""
+        while self.entries:
+            doc_id, (data, _, accessed, _) = next(iter(self.entries.items()))
+            if now - accessed < self.ttl and self.total_bytes <= self.max_bytes:
+                break
+            del self.entries[doc_id]
+            self.total_bytes -= len(data)
+    
+    def put(self, doc_id, data, ext, index=None):
+        """Сохранить документ (повторная загрузка продлевает срок)"""
+        # index - {ключ объявления: хэш} для повторного разбора
+        now = time.monotonic()
+        with self.lock:
+            old = self.entries.pop(doc_id, None)
+            if old is not None:
+                self.total_bytes -= len(old[0])
+                if index is None:
+                    index = old[3]
+            self.entries[doc_id] = (data, ext, now, index)
+            self.total_bytes += len(data)
+            self._evict(now)
+    
+    def get(self, doc_id):
+        """Документ (байты, расширение) или None, если его нет или срок истёк"""
+        now = time.monotonic()
+        with self.lock:
+            self._evict(now)
+            entry = self.entries.pop(doc_id, None)
+            if entry is None:
+                return None
+            data, ext, _, index = entry
+            self.entries[doc_id] = (data, ext, now, index)
+            return data, ext
+    
+    def index(self, doc_id):
+        """Индекс объявлений документа (None, если документа или индекса нет)"""
+        with self.lock:
+            self._evict(time.monotonic())
+            entry = self.entries.get(doc_id)
+            return entry[3] if entry is not None else None
+    
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,56 @@
+"""
+Экспорт блок-схем файла: SVG каждой схемы в zip-архиве, который отдаётся по мере отрисовки
+"""
+import io
+import re
+import zipfile
+
+# Заголовки панелей - как entryTitle в static/js/main.js
+TITLES = {
+    'main': 'Основной алгоритм',
+    'class': 'Класс: {}',
+    'method': 'Метод: {}',
+}
+
+
+def svg_filename(record, used):
+    """Имя файла схемы в архиве - как у PNG, скачанного из панели в браузере"""
+    title = TITLES.get(record['type'], 'Функция: {}').format(record['name'])
+    base = 'flowchart_' + re.sub(r'[^a-zA-Zа-яА-Я0-9]', '_', title)
+    name = f'{base}.svg'
+    n = 1
+    while name in used:
+        n += 1
+        name = f'{base}_{n}.svg'
+    used.add(name)
+    return name
+
+
+class _ChunkSink(io.RawIOBase):
+    """Поток только для записи: zipfile пишет сюда, генератор забирает готовые байты"""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_zip(files):
+    """Zip-архив из (имя, байты) кусками: каждый файл уходит клиенту, как только сжат"""
+    # Поток без seek - zipfile пишет размеры после данных файла (data descriptor)
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files:
+            archive.writestr(name, data)
+            yield sink.drain()
+    yield sink.drain()
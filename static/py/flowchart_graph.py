@@ -0,0 +1,233 @@
+"""
+Общее хранилище узлов и рёбер для строителей блок-схем
+Узлы и рёбра - параллельные массивы: типы, ветки и подписи хранятся номерами, тексты
+интернированы, а словари формата ответа собираются один раз в get_flowchart_data
+Индексы по (from, to) и по исходящим рёбрам - вставка и поиск за O(1)
+Вложенность: узел внутри тела if/цикла/try хранит в 'parent' id составного узла,
+которому принадлежит (у узлов верхнего уровня ключа нет) - по нему тела сворачиваются
+"""
+import re
+import sys
+from array import array
+from bisect import bisect_left
+
+from .wire_format import BRANCHES, NODE_TYPES
+
+NODE_TYPE_CODES = {name: code for code, name in enumerate(NODE_TYPES)}
+
+# Длина текста узла: на схеме видно меньше (до трёх строк), дальше текст обрезается многоточием
+TEXT_BUDGET = 200
+
+_NOT_SPACE = re.compile(r'\S')
+
+# Выходы блока - id узлов, от которых продолжается путь, или маркеры: отрицательное
+# число ~(id * 4 + вид), где вид говорит, как вести связь от узла id
+NO_EMPTY = 0    # условие без else: дальше идёт его ветка "нет"
+FROM_NO = 1     # выход ветки "нет" - обходной путь справа
+LOOP_EXIT = 2   # выход цикла справа
+RETURN = 3      # return: путь идёт к концу схемы, а не к следующему оператору
+
+
+def exit_marker(kind, node_id):
+    """Маркер выхода вида kind из узла node_id"""
+    return ~(node_id << 2 | kind)
+
+
+def exit_kind(exit_id):
+    """Вид маркера выхода (None - обычный id узла)"""
+    return ~exit_id & 3 if exit_id < 0 else None
+
+
+def exit_node(exit_id):
+    """Узел, от которого идёт выход"""
+    return ~exit_id >> 2 if exit_id < 0 else exit_id
+
+
+def is_return(exit_id):
+    """Выход - маркер return"""
+    return exit_id is not None and exit_id < 0 and ~exit_id & 3 == RETURN
+
+
+def clip_text(text):
+    """Текст узла не длиннее TEXT_BUDGET"""
+    return text[:TEXT_BUDGET] + '...' if len(text) > TEXT_BUDGET else text
+
+
+def source_text(code, lo, hi):
+    """clip_text(code[lo:hi].strip()) без копирования длинного участка целиком"""
+    first = _NOT_SPACE.search(code, lo, hi)
+    if first is None:
+        return ''
+    lo = first.start()
+    if hi - lo <= TEXT_BUDGET or _NOT_SPACE.search(code, lo + TEXT_BUDGET, hi) is None:
+        return code[lo:min(hi, lo + TEXT_BUDGET)].rstrip()
+    return code[lo:lo + TEXT_BUDGET] + '...'
+
+
+def run_steps(step):
+    """Выполнить шаг построения без рекурсии: шаг - генератор, он выдаёт (yield) вложенный
+    шаг и получает его результат; глубина вложенности кода не тратит стек Python"""
+    stack = [step]
+    value = None
+    while stack:
+        try:
+            child = stack[-1].send(value)
+        except StopIteration as stop:
+            stack.pop()
+            value = stop.value
+            continue
+        stack.append(child)
+        value = None
+    return value
+
+
+class FlowchartGraph:
+    """Граф блок-схемы: столбцы узлов и рёбер с индексами"""
+    
+    def __init__(self):
+        # Узлы: номер типа в NODE_TYPES, текст, владелец (-1 - верхний уровень)
+        self.node_types = array('B')
+        self.node_texts = []
+        self.node_parents = array('i')
+        # Рёбра: концы, номера подписи и ветки в таблицах labels и branches
+        self.edge_from = array('i')
+        self.edge_to = array('i')
+        self.edge_labels = array('I')
+        self.edge_branches = array('I')
+        self.labels = ['']
+        self.label_codes = {'': 0}
+        self.branches = list(BRANCHES)
+        self.branch_codes = {name: code for code, name in enumerate(BRANCHES)}
+        
+        self.edge_index = {}  # from << 32 | to -> номер ребра
+        self.out_edges = {}   # from -> номера рёбер по возрастанию
+        self.owner = -1       # составной узел, тело которого сейчас строится
+    
+    @property
+    def node_count(self):
+        return len(self.node_types)
+    
+    @property
+    def edge_count(self):
+        return len(self.edge_from)
+    
+    def add_node(self, node_type, text, parent=None):
+        """Добавить узел (parent - владелец вместо текущего)"""
+        node_id = len(self.node_types)
+        self.node_types.append(NODE_TYPE_CODES[node_type])
+        self.node_texts.append(sys.intern(text))
+        self.node_parents.append(self.owner if parent is None else parent)
+        return node_id
+    
+    def owned(self, owner_id, step):
+        """Шаг step (для run_steps), все узлы которого принадлежат составному узлу owner_id"""
+        outer = self.owner
+        self.owner = owner_id
+        try:
+            return (yield step)
+        finally:
+            self.owner = outer
+    
+    def adopt(self, first_id, owner_id):
+        """Узлы текущего уровня с id от first_id передать owner_id - для do-while,
+        где условие-владелец создаётся после тела"""
+        parents = self.node_parents
+        for node_id in range(first_id, owner_id):
+            if parents[node_id] == self.owner:
+                parents[node_id] = owner_id
+    
+    def label_code(self, label):
+        code = self.label_codes.get(label)
+        if code is None:
+            code = self.label_codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+    
+    def branch_code(self, branch):
+        code = self.branch_codes.get(branch)
+        if code is None:
+            code = self.branch_codes[branch] = len(self.branches)
+            self.branches.append(branch)
+        return code
+    
+    def add_edge(self, from_id, to_id, label='', branch=''):
+        """Добавить связь (дубликаты не добавляются); номер ребра"""
+        key = from_id << 32 | to_id
+        idx = self.edge_index.get(key)
+        if idx is not None:
+            if label and not self.edge_labels[idx]:
+                self.edge_labels[idx] = self.label_code(label)
+                self.edge_branches[idx] = self.branch_code(branch)
+            return idx
+        
+        idx = len(self.edge_from)
+        self.edge_index[key] = idx
+        out = self.out_edges.get(from_id)
+        if out is None:
+            self.out_edges[from_id] = [idx]
+        else:
+            out.append(idx)
+        self.edge_from.append(from_id)
+        self.edge_to.append(to_id)
+        self.edge_labels.append(self.label_code(label) if label else 0)
+        self.edge_branches.append(self.branch_code(branch) if branch else 0)
+        return idx
+    
+    def connect(self, exit_id, to_id, returns=False):
+        """Связь от выхода блока: маркер задаёт подпись и ветку; return ведёт только
+        к концу схемы (returns=True), к следующему оператору - нет"""
+        if exit_id is None:
+            return
+        if exit_id >= 0:
+            self.add_edge(exit_id, to_id)
+            return
+        kind = ~exit_id & 3
+        node_id = ~exit_id >> 2
+        if kind == NO_EMPTY:
+            self.add_edge(node_id, to_id, 'нет', 'no')
+        elif kind == FROM_NO:
+            self.add_edge(node_id, to_id, '', 'from_no')
+        elif kind == LOOP_EXIT:
+            self.add_edge(node_id, to_id, '', 'loop_exit')
+        elif returns:
+            self.add_edge(node_id, to_id)
+    
+    def out_targets(self, from_id):
+        """Концы исходящих рёбер узла в порядке добавления"""
+        return [self.edge_to[idx] for idx in self.out_edges.get(from_id, ())]
+    
+    def mark_first_edge(self, from_id, since, label, branch, empty='label'):
+        """Подпись и ветка первого исходящего ребра, добавленного начиная с номера since,
+        у которого пусто поле empty ('label' или 'branch'); label=None - подпись не менять"""
+        indices = self.out_edges.get(from_id)
+        if not indices:
+            return
+        column = self.edge_labels if empty == 'label' else self.edge_branches
+        for idx in indices[bisect_left(indices, since):]:
+            if not column[idx]:
+                if label is not None:
+                    self.edge_labels[idx] = self.label_code(label)
+                self.edge_branches[idx] = self.branch_code(branch)
+                return
+    
+    def get_flowchart_data(self):
+        """Схема в формате ответа: словари узлов и рёбер собираются здесь"""
+        # Один объект int на id: массивы при чтении создают новый на каждое обращение
+        ids = list(range(self.node_count))
+        nodes = []
+        for node_id, type_code, text, parent in zip(ids, self.node_types, self.node_texts, self.node_parents):
+            node = {'id': node_id, 'type': NODE_TYPES[type_code], 'text': text}
+            if parent >= 0:
+                node['parent'] = ids[parent]
+            nodes.append(node)
+        
+        labels = self.labels
+        branches = self.branches
+        edges = [{'from': ids[from_id], 'to': ids[to_id], 'label': labels[label], 'branch': branches[branch]}
+                 for from_id, to_id, label, branch
+                 in zip(self.edge_from, self.edge_to, self.edge_labels, self.edge_branches)]
+        
+        return {
+            'nodes': nodes,
+            'edges': edges
+        }
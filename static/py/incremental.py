@@ -0,0 +1,84 @@
+"""
+Повторный разбор изменённого файла: схемы строятся только для объявлений,
+структурный хэш которых изменился; готовые схемы кэшируются в процессе по хэшу
+"""
+import hashlib
+from collections import OrderedDict
+
+from .metrics import phase
+from .wire_format import encode_record
+
+DECLARATION_CACHE_SIZE = 1024
+
+# (расширение, хэш) -> запись со схемой; свой в каждом процессе-обработчике
+_declaration_cache = OrderedDict()
+
+
+def declaration_digest(*parts):
+    """Хэш объявления: имя, тип и структура (AST или текст без комментариев)"""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def declaration_key(name, taken):
+    """Ключ объявления: имя; повторяющиеся имена (перегрузки) нумеруются по порядку"""
+    key = name
+    n = 1
+    while key in taken:
+        n += 1
+        key = f'{name}#{n}'
+    return key
+
+
+def declaration_index(declarations):
+    """Индекс {ключ: хэш} без построения схем - для версии, загруженной потоком или оглавлением"""
+    index = {}
+    for entry, digest, _ in declarations:
+        index[declaration_key(entry['name'], index)] = digest
+    return index
+
+
+def _cached_entry(ext, digest, entry, build):
+    key = (ext, digest)
+    flowchart = _declaration_cache.get(key)
+    if flowchart is None:
+        with phase('build'):
+            flowchart = build()
+        _declaration_cache[key] = flowchart
+        if len(_declaration_cache) > DECLARATION_CACHE_SIZE:
+            _declaration_cache.popitem(last=False)
+    else:
+        _declaration_cache.move_to_end(key)
+    return dict(entry, flowchart=flowchart)
+
+
+def diff_declarations(ext, declarations, old_index, compact=False):
+    """Сравнить объявления (запись без схемы, хэш, построитель) с индексом прошлой версии"""
+    index = {}
+    added = []
+    changed = []
+    unchanged = []
+    
+    for entry, digest, build in declarations:
+        key = declaration_key(entry['name'], index)
+        index[key] = digest
+        
+        old_digest = old_index.get(key)
+        if old_digest == digest:
+            unchanged.append(key)
+            continue
+        
+        record = encode_record(dict(_cached_entry(ext, digest, entry, build), key=key), compact)
+        (added if old_digest is None else changed).append(record)
+    
+    return {
+        'index': index,
+        'order': list(index),
+        'added': added,
+        'changed': changed,
+        'removed': [key for key in old_index if key not in index],
+        'unchanged': unchanged
+    }
@@ -0,0 +1,224 @@
+"""
+Лексер JavaScript: исходник -> поток токенов за один проход
+Комментарии вырезаются, для скобок заранее известны парные индексы
+"""
+import re
+
+# Виды токенов
+WORD = 0       # идентификатор или ключевое слово
+NUMBER = 1
+STRING = 2
+TEMPLATE = 3   # шаблонная строка `...${...}...`
+REGEX = 4
+PUNCT = 5
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*\n?|/\*.*?(?:\*/|\Z))
+  | (?P<word>[^\W\d][\w$]*|\$[\w$]*)
+  | (?P<number>\d[\w.]*|\.\d[\w.]*)
+  | (?P<string>"[^"\\]*(?:\\.[^"\\]*)*"?|'[^'\\]*(?:\\.[^'\\]*)*'?)
+  | (?P<template>`)
+  | (?P<slash>/)
+  | (?P<punct>\+\+|--|.)
+""", re.S | re.X)
+
+_STRING_RE = re.compile(r""""[^"\\]*(?:\\.[^"\\]*)*"?|'[^'\\]*(?:\\.[^'\\]*)*'?""", re.S)
+_REGEX_RE = re.compile(r'/(?![*/])(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*')
+_TEMPLATE_CHUNK_RE = re.compile(r'[^`\\$]*(?:(?:\\.|\$(?!\{))[^`\\$]*)*', re.S)
+_EXPR_CHUNK_RE = re.compile(r'[^{}"\'`]*')
+
+_KIND_BY_GROUP = {
+    'word': WORD,
+    'number': NUMBER,
+    'string': STRING,
+    'punct': PUNCT,
+}
+
+# После этих слов "/" начинает регулярное выражение, а не деление
+_REGEX_AFTER_WORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+}
+
+_OPEN = {'(': ')', '[': ']', '{': '}'}
+_CLOSE = {')': '(', ']': '[', '}': '{'}
+
+
+class TokenStream:
+    """Поток токенов: параллельные списки по индексу токена"""
+    
+    def __init__(self, code):
+        self.code = code        # исходник без комментариев
+        self.kinds = []
+        self.starts = []        # смещения в self.code
+        self.values = []        # текст для слов и пунктуации, None для литералов
+        self.match = []         # индекс парной скобки или -1
+        self.next_semi = []     # индекс ближайшего ';' не раньше токена
+    
+    def __len__(self):
+        return len(self.kinds)
+    
+    def pos(self, i):
+        """Смещение начала токена i (или конец кода)"""
+        return self.starts[i] if i < len(self.starts) else len(self.code)
+    
+    def text(self, lo, hi):
+        """Текст от начала токена lo до начала токена hi"""
+        if lo >= hi:
+            return ''
+        return self.code[self.starts[lo]:self.pos(hi)].strip()
+    
+    def inner(self, i, close):
+        """Текст между скобкой i и её парой close"""
+        return self.code[self.starts[i] + 1:self.pos(close)].strip()
+    
+    def close(self, i, hi):
+        """Парная скобка для i в пределах диапазона (иначе hi)"""
+        m = self.match[i]
+        if m == -1 or m > hi:
+            return hi
+        return m
+    
+    def stmt_end(self, i, hi):
+        """Конец оператора - ближайший ';' в пределах диапазона"""
+        if i >= hi:
+            return hi
+        return min(self.next_semi[i], hi)
+
+
+def _scan_template(code, pos):
+    """Конец шаблонной строки; pos - сразу после открывающей `"""
+    n = len(code)
+    while True:
+        pos = _TEMPLATE_CHUNK_RE.match(code, pos).end()
+        if pos >= n:
+            return n
+        if code[pos] == '`':
+            return pos + 1
+        pos = _scan_template_expr(code, pos + 2)
+
+
+def _scan_template_expr(code, pos):
+    """Конец подстановки ${...} внутри шаблонной строки"""
+    n = len(code)
+    depth = 0
+    while pos < n:
+        pos = _EXPR_CHUNK_RE.match(code, pos).end()
+        if pos >= n:
+            break
+        c = code[pos]
+        if c == '{':
+            depth += 1
+            pos += 1
+        elif c == '}':
+            pos += 1
+            if depth == 0:
+                return pos
+            depth -= 1
+        elif c == '`':
+            pos = _scan_template(code, pos + 1)
+        else:
+            pos = _STRING_RE.match(code, pos).end()
+    return n
+
+
+def _regex_allowed(kind, value):
+    """Может ли после предыдущего токена начаться регулярное выражение"""
+    if kind is None:
+        return True
+    if kind == WORD:
+        return value in _REGEX_AFTER_WORDS
+    if kind == PUNCT:
+        return value not in (')', ']', '++', '--')
+    return False
+
+
+def tokenize(code):
+    """Разбить исходник на токены, вырезав комментарии"""
+    ts = TokenStream(code)
+    kinds = ts.kinds
+    starts = ts.starts
+    values = ts.values
+    match = ts.match
+    
+    chunks = []        # куски кода без комментариев
+    kept_from = 0
+    removed = 0        # сколько символов комментариев уже вырезано
+    stacks = {'(': [], '[': [], '{': []}
+    prev_kind = None
+    prev_value = None
+    
+    token_match = _TOKEN_RE.match
+    pos = 0
+    n = len(code)
+    
+    while pos < n:
+        m = token_match(code, pos)
+        group = m.lastgroup
+        end = m.end()
+        
+        if group == 'ws':
+            pos = end
+            continue
+        
+        if group == 'comment':
+            chunks.append(code[kept_from:pos])
+            removed += end - pos
+            kept_from = end
+            pos = end
+            continue
+        
+        value = None
+        if group == 'template':
+            kind = TEMPLATE
+            end = _scan_template(code, end)
+        elif group == 'slash':
+            rm = _REGEX_RE.match(code, pos) if _regex_allowed(prev_kind, prev_value) else None
+            if rm:
+                kind = REGEX
+                end = rm.end()
+            else:
+                kind = PUNCT
+                value = '/'
+        else:
+            kind = _KIND_BY_GROUP[group]
+            if kind == WORD or kind == PUNCT:
+                value = m.group()
+        
+        index = len(kinds)
+        kinds.append(kind)
+        starts.append(pos - removed)
+        values.append(value)
+        match.append(-1)
+        
+        # Каждый вид скобок сопоставляется независимо
+        if kind == PUNCT:
+            if value in _OPEN:
+                stacks[value].append(index)
+            elif value in _CLOSE:
+                stack = stacks[_CLOSE[value]]
+                if stack:
+                    opener = stack.pop()
+                    match[opener] = index
+                    match[index] = opener
+        
+        prev_kind = kind
+        prev_value = value
+        pos = end
+    
+    if removed:
+        chunks.append(code[kept_from:])
+        ts.code = ''.join(chunks)
+    
+    # Ближайший ';' для каждого токена - одним обратным проходом
+    count = len(kinds)
+    next_semi = [count] * count
+    nearest = count
+    for i in range(count - 1, -1, -1):
+        if values[i] == ';':
+            nearest = i
+        next_semi[i] = nearest
+    ts.next_semi = next_semi
+    
+    return ts
@@ -1,176 +1,27 @@
 """
 Парсер JavaScript для генерации блок-схем
-Исправленная версия
+Работает по потоку токенов (js_lexer) - время разбора линейно от размера файла
 """
 import re
+from functools import lru_cache, partial
 
+from .flowchart_graph import (LOOP_EXIT, NO_EMPTY, RETURN, FlowchartGraph, exit_kind, exit_marker, exit_node,
+                              is_return, run_steps, source_text)
+from .incremental import declaration_digest
+from .js_lexer import WORD, tokenize
+from .metrics import phase
+from .outline import LineIndex, code_record, collect_entries, estimate_size, outline_entry
 
-class JSFlowchartBuilder:
+METHOD_RE = re.compile(r'(?:async\s+)?(\w+)\s*\([^)]*\)\s*\{')
+
+
+class JSFlowchartBuilder(FlowchartGraph):
     """Строитель блок-схем для JavaScript"""
-    
-    def __init__(self):
-        self.nodes = []
-        self.edges = []
-        self.node_id = 0
-        
-    def add_node(self, node_type, text):
-        node = {
-            'id': self.node_id,
-            'type': node_type,
-            'text': text
-        }
-        self.nodes.append(node)
-        self.node_id += 1
-        return node['id']
-    
-    def add_edge(self, from_id, to_id, label='', branch=''):
-        # Не добавляем дубликаты
-        for edge in self.edges:
-            if edge['from'] == from_id and edge['to'] == to_id:
-                if label and not edge['label']:
-                    edge['label'] = label
-                    edge['branch'] = branch
-                return edge
-        
-        edge = {
-            'from': from_id,
-            'to': to_id,
-            'label': label,
-            'branch': branch
-        }
-        self.edges.append(edge)
-        return edge
-    
-    def get_flowchart_data(self):
-        return {'nodes': self.nodes, 'edges': self.edges}
 
 
 def remove_comments(code):
     """Удалить комментарии"""
-    result = []
-    i = 0
-    while i < len(code):
-        if code[i:i+2] == '//':
-            end = code.find('\n', i)
-            if end == -1:
-                break
-            i = end + 1
-        elif code[i:i+2] == '/*':
-            end = code.find('*/', i)
-            if end == -1:
-                break
-            i = end + 2
-        else:
-            result.append(code[i])
-            i += 1
-    return ''.join(result)
-
-
-def find_matching_brace(code, start):
-    """Найти закрывающую фигурную скобку"""
-    depth = 0
-    i = start
-    in_string = False
-    string_char = None
-    
-    while i < len(code):
-        c = code[i]
-        
-        if not in_string and c in '"\'`':
-            in_string = True
-            string_char = c
-            i += 1
-            continue
-        
-        if in_string:
-            if c == '\\' and i + 1 < len(code):
-                i += 2
-                continue
-            if c == string_char:
-                in_string = False
-            i += 1
-            continue
-        
-        if c == '{':
-            depth += 1
-        elif c == '}':
-            depth -= 1
-            if depth == 0:
-                return i
-        i += 1
-    return len(code)
-
-
-def find_matching_paren(code, start):
-    """Найти закрывающую круглую скобку"""
-    depth = 0
-    i = start
-    in_string = False
-    string_char = None
-    
-    while i < len(code):
-        c = code[i]
-        
-        if not in_string and c in '"\'`':
-            in_string = True
-            string_char = c
-            i += 1
-            continue
-        
-        if in_string:
-            if c == '\\' and i + 1 < len(code):
-                i += 2
-                continue
-            if c == string_char:
-                in_string = False
-            i += 1
-            continue
-        
-        if c == '(':
-            depth += 1
-        elif c == ')':
-            depth -= 1
-            if depth == 0:
-                return i
-        i += 1
-    return len(code)
-
-
-def extract_block(code, start):
-    """Извлечь блок в фигурных скобках"""
-    brace_start = code.find('{', start)
-    if brace_start == -1:
-        return "", len(code)
-    brace_end = find_matching_brace(code, brace_start)
-    return code[brace_start + 1:brace_end], brace_end + 1
-
-
-def is_keyword(code, pos, keyword):
-    """Проверить ключевое слово"""
-    if not code[pos:].startswith(keyword):
-        return False
-    end = pos + len(keyword)
-    if end >= len(code):
-        return True
-    return not code[end].isalnum() and code[end] != '_'
-
-
-def connect_nodes(builder, from_id, to_id, label='', branch=''):
-    """Соединить узлы с учётом маркеров"""
-    if from_id is None:
-        return
-    if isinstance(from_id, tuple):
-        marker = from_id[0]
-        node_id = from_id[1]
-        if marker == 'no_empty':
-            builder.add_edge(node_id, to_id, 'нет', 'no')
-        elif marker == 'from_no_branch':
-            builder.add_edge(node_id, to_id, '', 'from_no')
-        elif marker == 'loop_exit':
-            builder.add_edge(node_id, to_id, '', 'loop_exit')
-        # return маркеры НЕ соединяем с обычными блоками
-    else:
-        builder.add_edge(from_id, to_id, label, branch)
+    return tokenize(code).code
 
 
 def filter_returns(prev_ids):
@@ -178,27 +29,26 @@ def filter_returns(prev_ids):
     non_returns = []
     returns = []
     for pid in prev_ids:
-        if isinstance(pid, tuple) and pid[0] == 'return':
+        if is_return(pid):
             returns.append(pid)
         else:
             non_returns.append(pid)
     return non_returns, returns
 
 
-def parse_body(code, builder, prev_ids):
-    """Парсить тело блока"""
-    code = code.strip()
-    if not code:
-        return prev_ids
+def stmt_text(ts, lo, hi):
+    """Текст оператора - токены [lo, hi) - не длиннее TEXT_BUDGET (длинный литерал не копируется)"""
+    if lo >= hi:
+        return ''
+    return source_text(ts.code, ts.starts[lo], ts.pos(hi))
+
+
+def parse_body(ts, lo, hi, builder, prev_ids):
+    """Парсить тело блока - токены [lo, hi); шаг для run_steps, как и парсеры из STATEMENT_PARSERS"""
+    values = ts.values
     
-    i = 0
-    while i < len(code):
-        while i < len(code) and code[i] in ' \t\n\r':
-            i += 1
-        
-        if i >= len(code):
-            break
-        
+    i = lo
+    while i < hi:
         # Отфильтровываем return - после return код недостижим
         non_returns, returns = filter_returns(prev_ids)
         if not non_returns and returns:
@@ -207,67 +57,33 @@ def parse_body(code, builder, prev_ids):
         
         working_prev = non_returns if non_returns else prev_ids
         
-        # IF
-        if is_keyword(code, i, 'if'):
-            i, new_ids = parse_if(code, i, builder, working_prev)
-            prev_ids = new_ids + returns
-            continue
-        
-        # FOR
-        if is_keyword(code, i, 'for'):
-            i, new_ids = parse_for(code, i, builder, working_prev)
-            prev_ids = new_ids + returns
-            continue
-        
-        # WHILE
-        if is_keyword(code, i, 'while'):
-            i, new_ids = parse_while(code, i, builder, working_prev)
-            prev_ids = new_ids + returns
-            continue
-        
-        # DO
-        if is_keyword(code, i, 'do'):
-            i, new_ids = parse_do_while(code, i, builder, working_prev)
-            prev_ids = new_ids + returns
-            continue
-        
-        # SWITCH
-        if is_keyword(code, i, 'switch'):
-            i, new_ids = parse_switch(code, i, builder, working_prev)
-            prev_ids = new_ids + returns
-            continue
-        
-        # TRY
-        if is_keyword(code, i, 'try'):
-            i, new_ids = parse_try(code, i, builder, working_prev)
+        # IF, FOR, WHILE, DO, SWITCH, TRY
+        parser = STATEMENT_PARSERS.get(values[i])
+        if parser:
+            i, new_ids = yield parser(ts, i, hi, builder, working_prev)
             prev_ids = new_ids + returns
             continue
         
         # RETURN
-        if is_keyword(code, i, 'return'):
-            i, new_ids = parse_return(code, i, builder, working_prev)
+        if values[i] == 'return':
+            i, new_ids = parse_return(ts, i, hi, builder, working_prev)
             prev_ids = new_ids + returns
             continue
         
         # BREAK / CONTINUE
-        if is_keyword(code, i, 'break') or is_keyword(code, i, 'continue'):
-            end = code.find(';', i)
-            if end == -1:
-                end = len(code)
-            i = end + 1
+        if values[i] == 'break' or values[i] == 'continue':
+            i = ts.stmt_end(i, hi) + 1
             continue
         
         # Закрывающая скобка
-        if code[i] == '}':
+        if values[i] == '}':
             i += 1
             continue
         
         # Обычный оператор
-        stmt_end = code.find(';', i)
-        if stmt_end == -1:
-            stmt_end = len(code)
+        stmt_end = ts.stmt_end(i, hi)
         
-        stmt = code[i:stmt_end].strip()
+        stmt = stmt_text(ts, i, stmt_end)
         if stmt:
             if 'console.log' in stmt or 'console.error' in stmt:
                 node_id = builder.add_node('output', stmt)
@@ -275,7 +91,7 @@ def parse_body(code, builder, prev_ids):
                 node_id = builder.add_node('process', stmt)
             
             for pid in working_prev:
-                connect_nodes(builder, pid, node_id)
+                builder.connect(pid, node_id)
             
             prev_ids = [node_id] + returns
         
@@ -284,42 +100,36 @@ def parse_body(code, builder, prev_ids):
     return prev_ids
 
 
-def parse_if(code, start, builder, prev_ids):
+def parse_if(ts, start, hi, builder, prev_ids):
     """Парсить if/else if/else"""
-    i = start + 2  # пропустить 'if'
-    
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
+    values = ts.values
+    i = start + 1  # пропустить 'if'
     
     # Условие
     condition = ""
-    if i < len(code) and code[i] == '(':
-        paren_end = find_matching_paren(code, i)
-        condition = code[i + 1:paren_end].strip()
+    if i < hi and values[i] == '(':
+        paren_end = ts.close(i, hi)
+        condition = ts.inner(i, paren_end)
         i = paren_end + 1
     
     cond_id = builder.add_node('condition', condition + '?')
     
     for pid in prev_ids:
-        connect_nodes(builder, pid, cond_id)
-    
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
+        builder.connect(pid, cond_id)
     
     # Ветка "да"
-    edge_idx = len(builder.edges)
+    edge_idx = builder.edge_count
     
-    if i < len(code) and code[i] == '{':
-        body, i = extract_block(code, i)
-        yes_ids = parse_body(body, builder, [cond_id])
+    if i < hi and values[i] == '{':
+        brace_end = ts.close(i, hi)
+        yes_ids = yield builder.owned(cond_id, parse_body(ts, i + 1, brace_end, builder, [cond_id]))
+        i = brace_end + 1
     else:
         # Однострочный if
-        stmt_end = code.find(';', i)
-        if stmt_end == -1:
-            stmt_end = len(code)
-        stmt = code[i:stmt_end].strip()
+        stmt_end = ts.stmt_end(i, hi)
+        stmt = stmt_text(ts, i, stmt_end)
         if stmt:
-            node_id = builder.add_node('process', stmt)
+            node_id = builder.add_node('process', stmt, parent=cond_id)
             builder.add_edge(cond_id, node_id)
             yes_ids = [node_id]
         else:
@@ -327,43 +137,29 @@ def parse_if(code, start, builder, prev_ids):
         i = stmt_end + 1
     
     # Помечаем ребро "да"
-    for j in range(edge_idx, len(builder.edges)):
-        if builder.edges[j]['from'] == cond_id and not builder.edges[j]['label']:
-            builder.edges[j]['label'] = 'да'
-            builder.edges[j]['branch'] = 'yes'
-            break
-    
-    exit_ids = []
+    builder.mark_first_edge(cond_id, edge_idx, 'да', 'yes')
     
     # Собираем выходы из "да"
-    for yid in yes_ids:
-        if yid is not None:
-            exit_ids.append(yid)
-    
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
+    exit_ids = [yid for yid in yes_ids if yid is not None]
     
     # Проверяем else
-    if is_keyword(code, i, 'else'):
-        i += 4
-        while i < len(code) and code[i] in ' \t\n\r':
-            i += 1
+    if i < hi and values[i] == 'else':
+        i += 1
         
-        edge_idx = len(builder.edges)
+        edge_idx = builder.edge_count
         
         # else if
-        if is_keyword(code, i, 'if'):
-            i, no_ids = parse_if(code, i, builder, [cond_id])
-        elif code[i] == '{':
-            body, i = extract_block(code, i)
-            no_ids = parse_body(body, builder, [cond_id])
+        if i < hi and values[i] == 'if':
+            i, no_ids = yield builder.owned(cond_id, parse_if(ts, i, hi, builder, [cond_id]))
+        elif i < hi and values[i] == '{':
+            brace_end = ts.close(i, hi)
+            no_ids = yield builder.owned(cond_id, parse_body(ts, i + 1, brace_end, builder, [cond_id]))
+            i = brace_end + 1
         else:
-            stmt_end = code.find(';', i)
-            if stmt_end == -1:
-                stmt_end = len(code)
-            stmt = code[i:stmt_end].strip()
+            stmt_end = ts.stmt_end(i, hi)
+            stmt = stmt_text(ts, i, stmt_end)
             if stmt:
-                node_id = builder.add_node('process', stmt)
+                node_id = builder.add_node('process', stmt, parent=cond_id)
                 builder.add_edge(cond_id, node_id)
                 no_ids = [node_id]
             else:
@@ -371,312 +167,180 @@ def parse_if(code, start, builder, prev_ids):
             i = stmt_end + 1
         
         # Помечаем ребро "нет"
-        for j in range(edge_idx, len(builder.edges)):
-            if builder.edges[j]['from'] == cond_id and not builder.edges[j]['label']:
-                builder.edges[j]['label'] = 'нет'
-                builder.edges[j]['branch'] = 'no'
-                break
+        builder.mark_first_edge(cond_id, edge_idx, 'нет', 'no')
         
-        # Когда есть else, выходы из ветки "нет" - обычные (без маркеров)
-        for nid in no_ids:
-            if nid is not None:
-                if isinstance(nid, tuple):
-                    # Сохраняем маркеры return и другие
-                    exit_ids.append(nid)
-                else:
-                    # Обычный выход - без маркера
-                    exit_ids.append(nid)
+        # Когда есть else, выходы из ветки "нет" (и маркеры) сливаются с выходами из "да"
+        exit_ids += [nid for nid in no_ids if nid is not None]
     else:
         # Нет else - добавляем маркер
-        exit_ids.append(('no_empty', cond_id))
+        exit_ids.append(exit_marker(NO_EMPTY, cond_id))
     
     return i, exit_ids if exit_ids else [None]
 
 
-def parse_for(code, start, builder, prev_ids):
-    """Парсить for"""
-    i = start + 3
-    
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
+def parse_loop(ts, i, hi, builder, prev_ids, title):
+    """Общая часть for и while: заголовок в скобках, тело, обратная связь"""
+    values = ts.values
     
     header = ""
-    if i < len(code) and code[i] == '(':
-        paren_end = find_matching_paren(code, i)
-        header = code[i + 1:paren_end].strip()
+    if i < hi and values[i] == '(':
+        paren_end = ts.close(i, hi)
+        header = ts.inner(i, paren_end)
         i = paren_end + 1
     
-    loop_id = builder.add_node('loop', f'for ({header})')
+    loop_id = builder.add_node('loop', f'{title} ({header})')
     
     for pid in prev_ids:
-        connect_nodes(builder, pid, loop_id)
-    
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
+        builder.connect(pid, loop_id)
     
     # Запоминаем индекс рёбер чтобы пометить связь к телу
-    edge_idx = len(builder.edges)
+    edge_idx = builder.edge_count
     
-    if i < len(code) and code[i] == '{':
-        body, i = extract_block(code, i)
-        body_ids = parse_body(body, builder, [loop_id])
+    if i < hi and values[i] == '{':
+        brace_end = ts.close(i, hi)
+        body_ids = yield builder.owned(loop_id, parse_body(ts, i + 1, brace_end, builder, [loop_id]))
+        i = brace_end + 1
     else:
-        stmt_end = code.find(';', i)
-        if stmt_end == -1:
-            stmt_end = len(code)
-        i = stmt_end + 1
+        i = ts.stmt_end(i, hi) + 1
         body_ids = [loop_id]
     
     # Помечаем первое ребро от цикла как loop_body
-    for j in range(edge_idx, len(builder.edges)):
-        if builder.edges[j]['from'] == loop_id and not builder.edges[j]['branch']:
-            builder.edges[j]['branch'] = 'loop_body'
-            break
+    builder.mark_first_edge(loop_id, edge_idx, None, 'loop_body', empty='branch')
     
     # Обратная связь цикла (кроме return)
     for bid in body_ids:
-        if bid is not None and not isinstance(bid, tuple):
-            builder.add_edge(bid, loop_id, '', 'loop_back')
-        elif isinstance(bid, tuple) and bid[0] not in ['return']:
-            builder.add_edge(bid[1], loop_id, '', 'loop_back')
+        if bid is not None and exit_kind(bid) != RETURN:
+            builder.add_edge(exit_node(bid), loop_id, '', 'loop_back')
     
     # Возвращаем выход из цикла + return маркеры
-    exits = [('loop_exit', loop_id)]
-    for bid in body_ids:
-        if isinstance(bid, tuple) and bid[0] == 'return':
-            exits.append(bid)
+    exits = [exit_marker(LOOP_EXIT, loop_id)]
+    exits += [bid for bid in body_ids if is_return(bid)]
     
     return i, exits
 
 
-def parse_while(code, start, builder, prev_ids):
+def parse_for(ts, start, hi, builder, prev_ids):
+    """Парсить for"""
+    return (yield parse_loop(ts, start + 1, hi, builder, prev_ids, 'for'))
+
+
+def parse_while(ts, start, hi, builder, prev_ids):
     """Парсить while"""
-    i = start + 5
-    
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
-    
-    condition = ""
-    if i < len(code) and code[i] == '(':
-        paren_end = find_matching_paren(code, i)
-        condition = code[i + 1:paren_end].strip()
-        i = paren_end + 1
-    
-    loop_id = builder.add_node('loop', f'while ({condition})')
-    
-    for pid in prev_ids:
-        connect_nodes(builder, pid, loop_id)
-    
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
-    
-    # Запоминаем индекс рёбер
-    edge_idx = len(builder.edges)
-    
-    if i < len(code) and code[i] == '{':
-        body, i = extract_block(code, i)
-        body_ids = parse_body(body, builder, [loop_id])
-    else:
-        stmt_end = code.find(';', i)
-        if stmt_end == -1:
-            stmt_end = len(code)
-        i = stmt_end + 1
-        body_ids = [loop_id]
-    
-    # Помечаем первое ребро от цикла как loop_body
-    for j in range(edge_idx, len(builder.edges)):
-        if builder.edges[j]['from'] == loop_id and not builder.edges[j]['branch']:
-            builder.edges[j]['branch'] = 'loop_body'
-            break
-    
-    for bid in body_ids:
-        if bid is not None and not isinstance(bid, tuple):
-            builder.add_edge(bid, loop_id, '', 'loop_back')
-        elif isinstance(bid, tuple) and bid[0] not in ['return']:
-            builder.add_edge(bid[1], loop_id, '', 'loop_back')
-    
-    exits = [('loop_exit', loop_id)]
-    for bid in body_ids:
-        if isinstance(bid, tuple) and bid[0] == 'return':
-            exits.append(bid)
-    
-    return i, exits
+    return (yield parse_loop(ts, start + 1, hi, builder, prev_ids, 'while'))
 
 
-def parse_do_while(code, start, builder, prev_ids):
+def parse_do_while(ts, start, hi, builder, prev_ids):
     """Парсить do-while: тело → условие (ромб) → да к началу тела, нет дальше"""
-    i = start + 2
-    
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
+    values = ts.values
+    i = start + 1
     
     # Запоминаем количество узлов до парсинга тела
-    nodes_before = len(builder.nodes)
+    nodes_before = builder.node_count
     
     # Парсим тело цикла напрямую от prev_ids
-    if i < len(code) and code[i] == '{':
-        body, i = extract_block(code, i)
-        body_ids = parse_body(body, builder, prev_ids)
+    if i < hi and values[i] == '{':
+        brace_end = ts.close(i, hi)
+        body_ids = yield parse_body(ts, i + 1, brace_end, builder, prev_ids)
+        i = brace_end + 1
     else:
         body_ids = prev_ids
     
-    while i < len(code) and code[i] in ' \t\n\r':
+    if i < hi and values[i] == 'while':
         i += 1
-    
-    if is_keyword(code, i, 'while'):
-        i += 5
-        while i < len(code) and code[i] in ' \t\n\r':
-            i += 1
         
         condition = ""
-        if i < len(code) and code[i] == '(':
-            paren_end = find_matching_paren(code, i)
-            condition = code[i + 1:paren_end].strip()
+        if i < hi and values[i] == '(':
+            paren_end = ts.close(i, hi)
+            condition = ts.inner(i, paren_end)
             i = paren_end + 1
         
-        # Создаём условие (ромб)
+        # Создаём условие (ромб) - владелец уже построенного тела
         cond_id = builder.add_node('condition', condition + '?')
+        builder.adopt(nodes_before, cond_id)
         
         # Связываем конец тела с условием
         for bid in body_ids:
-            if bid is not None and not isinstance(bid, tuple):
-                builder.add_edge(bid, cond_id)
-            elif isinstance(bid, tuple) and bid[0] != 'return':
-                builder.add_edge(bid[1], cond_id)
+            if bid is not None and exit_kind(bid) != RETURN:
+                builder.add_edge(exit_node(bid), cond_id)
         
         # Первый блок тела - это первый узел добавленный после nodes_before
-        if nodes_before < len(builder.nodes) - 1:  # -1 для cond_id
-            first_body_node = builder.nodes[nodes_before]['id']
-            builder.add_edge(cond_id, first_body_node, 'да', 'yes')
+        if nodes_before < cond_id:
+            builder.add_edge(cond_id, nodes_before, 'да', 'yes')
         
-        while i < len(code) and code[i] in ' \t\n\r;':
+        while i < hi and values[i] == ';':
             i += 1
         
-        exits = [('no_empty', cond_id)]
-        for bid in body_ids:
-            if isinstance(bid, tuple) and bid[0] == 'return':
-                exits.append(bid)
+        exits = [exit_marker(NO_EMPTY, cond_id)]
+        exits += [bid for bid in body_ids if is_return(bid)]
         
         return i, exits
     
     return i, body_ids
 
 
-def find_colon_outside_strings(text, start=0):
-    """Найти : вне строк"""
-    i = start
-    while i < len(text):
-        c = text[i]
-        if c in '"\'`':
-            quote = c
-            i += 1
-            while i < len(text):
-                if text[i] == '\\' and i + 1 < len(text):
-                    i += 2
-                elif text[i] == quote:
-                    i += 1
-                    break
-                else:
-                    i += 1
-        elif c == ':':
+def find_colon(ts, i, hi):
+    """Найти : (строки - отдельные токены, их двоеточия не видны)"""
+    values = ts.values
+    while i < hi:
+        if values[i] == ':':
             return i
-        else:
-            i += 1
+        i += 1
     return -1
 
 
-def parse_switch(code, start, builder, prev_ids):
+def parse_switch(ts, start, hi, builder, prev_ids):
     """Парсить switch как цепочку if-else"""
-    i = start + 6
-    
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
+    values = ts.values
+    i = start + 1
     
     # Получаем выражение switch
     expr = ""
-    if i < len(code) and code[i] == '(':
-        paren_end = find_matching_paren(code, i)
-        expr = code[i + 1:paren_end].strip()
+    if i < hi and values[i] == '(':
+        paren_end = ts.close(i, hi)
+        expr = ts.inner(i, paren_end)
         i = paren_end + 1
     
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
-    
     exit_ids = []
     
-    if i < len(code) and code[i] == '{':
-        body, i = extract_block(code, i)
+    if i < hi and values[i] == '{':
+        body_end = ts.close(i, hi)
+        body_start = i + 1
+        i = body_end + 1
         
-        # Парсим case блоки
-        j = 0
+        # Парсим case блоки: (тип, значение, диапазон токенов тела)
+        j = body_start
         cases = []
         
-        while j < len(body):
-            while j < len(body) and body[j] in ' \t\n\r':
-                j += 1
-            
-            if j >= len(body):
-                break
-            
+        while j < body_end:
             # case
-            if is_keyword(body, j, 'case'):
-                j += 4
-                while j < len(body) and body[j] in ' \t\n\r':
-                    j += 1
-                
-                val_start = j
-                colon_pos = find_colon_outside_strings(body, j)
+            if values[j] == 'case':
+                colon_pos = find_colon(ts, j + 1, body_end)
                 if colon_pos == -1:
                     break
                 
-                case_val = body[val_start:colon_pos].strip()
+                case_val = ts.text(j + 1, colon_pos)
                 j = colon_pos + 1
                 
-                body_start = j
-                depth = 0
-                while j < len(body):
-                    c = body[j]
-                    if c in '"\'`':
-                        quote = c
-                        j += 1
-                        while j < len(body):
-                            if body[j] == '\\' and j + 1 < len(body):
-                                j += 2
-                            elif body[j] == quote:
-                                j += 1
-                                break
-                            else:
-                                j += 1
-                        continue
-                    
-                    if c == '{':
-                        depth += 1
-                        j += 1
-                    elif c == '}':
-                        if depth == 0:
-                            break
-                        depth -= 1
-                        j += 1
-                    elif depth == 0 and (is_keyword(body, j, 'case') or is_keyword(body, j, 'default')):
+                # Тело case - до следующего case/default на том же уровне
+                case_start = j
+                while j < body_end:
+                    value = values[j]
+                    if value == '{':
+                        j = ts.close(j, body_end) + 1
+                    elif value == '}' or value == 'case' or value == 'default':
                         break
                     else:
                         j += 1
                 
-                case_body = body[body_start:j].strip()
-                case_body = re.sub(r'\bbreak\s*;', '', case_body).strip()
-                cases.append(('case', case_val, case_body))
-                
+                cases.append(('case', case_val, case_start, min(j, body_end)))
+            
             # default
-            elif is_keyword(body, j, 'default'):
-                j += 7
-                colon_pos = find_colon_outside_strings(body, j)
+            elif values[j] == 'default':
+                colon_pos = find_colon(ts, j + 1, body_end)
                 if colon_pos == -1:
                     break
-                j = colon_pos + 1
                 
-                default_body = body[j:].strip()
-                default_body = re.sub(r'\bbreak\s*;', '', default_body).strip()
-                cases.append(('default', None, default_body))
+                cases.append(('default', None, colon_pos + 1, body_end))
                 break
             else:
                 j += 1
@@ -684,48 +348,31 @@ def parse_switch(code, start, builder, prev_ids):
         # Строим цепочку if-else if-else
         current_prev = prev_ids
         
-        for idx, (part_type, case_val, case_body) in enumerate(cases):
+        for part_type, case_val, case_start, case_end in cases:
             if part_type == 'case':
                 # Создаём условие: expr == case_val
                 cond_id = builder.add_node('condition', f'{expr} == {case_val}?')
                 
                 for pid in current_prev:
-                    connect_nodes(builder, pid, cond_id)
+                    builder.connect(pid, cond_id)
                 
-                # Ветка "да" - тело case
-                if case_body:
-                    edge_idx = len(builder.edges)
-                    case_exits = parse_body(case_body, builder, [cond_id])
-                    
-                    # Помечаем ребро "да"
-                    for k in range(edge_idx, len(builder.edges)):
-                        if builder.edges[k]['from'] == cond_id and not builder.edges[k]['label']:
-                            builder.edges[k]['label'] = 'да'
-                            builder.edges[k]['branch'] = 'yes'
-                            break
-                    
-                    exit_ids.extend(case_exits)
-                else:
-                    exit_ids.append(cond_id)
+                # Ветка "да" - тело case (break пропускает parse_body)
+                edge_idx = builder.edge_count
+                case_exits = yield builder.owned(cond_id, parse_body(ts, case_start, case_end, builder, [cond_id]))
                 
-                # Следующий case будет в ветке "нет"
-                current_prev = [('no_empty', cond_id)]
+                # Помечаем ребро "да"
+                builder.mark_first_edge(cond_id, edge_idx, 'да', 'yes')
+                
+                exit_ids.extend(case_exits)
                 
+                # Следующий case будет в ветке "нет"
+                current_prev = [exit_marker(NO_EMPTY, cond_id)]
+            
             else:  # default - это else
-                if case_body:
-                    # Если есть предыдущее условие - это его ветка "нет"
-                    edge_idx = len(builder.edges)
-                    default_exits = parse_body(case_body, builder, current_prev)
-                    
-                    # Помечаем ребро "нет"
-                    for k in range(edge_idx, len(builder.edges)):
-                        if builder.edges[k]['branch'] == '' and builder.edges[k]['label'] == '':
-                            # Это первое ребро от последнего условия
-                            pass
-                    
-                    exit_ids.extend(default_exits)
-                else:
-                    exit_ids.extend(current_prev)
+                # Если есть предыдущее условие - это его ветка "нет"
+                # (метку ставит маркер no_empty в current_prev)
+                default_exits = yield parse_body(ts, case_start, case_end, builder, current_prev)
+                exit_ids.extend(default_exits)
                 
                 current_prev = []
         
@@ -736,148 +383,135 @@ def parse_switch(code, start, builder, prev_ids):
     return i, exit_ids if exit_ids else prev_ids
 
 
-def parse_try(code, start, builder, prev_ids):
+def parse_try(ts, start, hi, builder, prev_ids):
     """Парсить try-catch-finally"""
-    i = start + 3
-    
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
+    values = ts.values
+    i = start + 1
     
     try_id = builder.add_node('process', 'try')
     
     for pid in prev_ids:
-        connect_nodes(builder, pid, try_id)
+        builder.connect(pid, try_id)
     
-    if i < len(code) and code[i] == '{':
-        body, i = extract_block(code, i)
-        try_ids = parse_body(body, builder, [try_id])
+    if i < hi and values[i] == '{':
+        brace_end = ts.close(i, hi)
+        try_ids = yield builder.owned(try_id, parse_body(ts, i + 1, brace_end, builder, [try_id]))
+        i = brace_end + 1
     else:
         try_ids = [try_id]
     
     exit_ids = list(try_ids)
     
     # catch
-    while True:
-        while i < len(code) and code[i] in ' \t\n\r':
-            i += 1
-        
-        if not is_keyword(code, i, 'catch'):
-            break
-        
-        i += 5
-        while i < len(code) and code[i] in ' \t\n\r':
-            i += 1
+    while i < hi and values[i] == 'catch':
+        i += 1
         
         exception = ""
-        if i < len(code) and code[i] == '(':
-            paren_end = find_matching_paren(code, i)
-            exception = code[i + 1:paren_end].strip()
+        if i < hi and values[i] == '(':
+            paren_end = ts.close(i, hi)
+            exception = ts.inner(i, paren_end)
             i = paren_end + 1
         
         catch_text = f'catch ({exception})' if exception else 'catch'
-        catch_id = builder.add_node('process', catch_text)
+        catch_id = builder.add_node('process', catch_text, parent=try_id)
         builder.add_edge(try_id, catch_id, 'ошибка', 'no')
         
-        while i < len(code) and code[i] in ' \t\n\r':
-            i += 1
-        
-        if i < len(code) and code[i] == '{':
-            body, i = extract_block(code, i)
-            catch_ids = parse_body(body, builder, [catch_id])
+        if i < hi and values[i] == '{':
+            brace_end = ts.close(i, hi)
+            catch_ids = yield builder.owned(catch_id, parse_body(ts, i + 1, brace_end, builder, [catch_id]))
             exit_ids.extend(catch_ids)
+            i = brace_end + 1
         else:
             exit_ids.append(catch_id)
     
     # finally
-    while i < len(code) and code[i] in ' \t\n\r':
+    if i < hi and values[i] == 'finally':
         i += 1
-    
-    if is_keyword(code, i, 'finally'):
-        i += 7
-        while i < len(code) and code[i] in ' \t\n\r':
-            i += 1
         
-        finally_id = builder.add_node('process', 'finally')
+        finally_id = builder.add_node('process', 'finally', parent=try_id)
         
         for eid in exit_ids:
-            if eid is not None and not isinstance(eid, tuple):
+            if eid is not None and eid >= 0:
                 builder.add_edge(eid, finally_id)
         
-        if i < len(code) and code[i] == '{':
-            body, i = extract_block(code, i)
-            finally_ids = parse_body(body, builder, [finally_id])
+        if i < hi and values[i] == '{':
+            brace_end = ts.close(i, hi)
+            finally_ids = yield builder.owned(finally_id, parse_body(ts, i + 1, brace_end, builder, [finally_id]))
             exit_ids = finally_ids
+            i = brace_end + 1
         else:
             exit_ids = [finally_id]
     
     return i, exit_ids
 
 
-def parse_return(code, start, builder, prev_ids):
+def parse_return(ts, start, hi, builder, prev_ids):
     """Парсить return"""
-    i = start + 6
+    stmt_end = ts.stmt_end(start + 1, hi)
     
-    stmt_end = code.find(';', i)
-    if stmt_end == -1:
-        stmt_end = len(code)
-    
-    value = code[i:stmt_end].strip()
+    value = stmt_text(ts, start + 1, stmt_end)
     text = f'return {value}' if value else 'return'
     
     ret_id = builder.add_node('output', text)
     
     for pid in prev_ids:
-        connect_nodes(builder, pid, ret_id)
+        builder.connect(pid, ret_id)
     
     # Возвращаем маркер return - этот блок ведёт к end
-    return stmt_end + 1, [('return', ret_id)]
+    return stmt_end + 1, [exit_marker(RETURN, ret_id)]
+
+
+# Составные операторы - генераторы-шаги; return без вложенных тел разбирает parse_body
+STATEMENT_PARSERS = {
+    'if': parse_if,
+    'for': parse_for,
+    'while': parse_while,
+    'do': parse_do_while,
+    'switch': parse_switch,
+    'try': parse_try,
+}
 
 
-def parse_function(code, start):
-    """Парсить функцию"""
+def scan_function(ts, start):
+    """Заголовок функции: (индекс после тела, имя, async, параметры, скобка тела или None)"""
+    values = ts.values
+    n = len(ts)
     i = start
     
     # Пропустить async
     is_async = False
-    if is_keyword(code, i, 'async'):
+    if values[i] == 'async':
         is_async = True
-        i += 5
-        while i < len(code) and code[i] in ' \t\n\r':
-            i += 1
+        i += 1
     
     # function
-    if is_keyword(code, i, 'function'):
-        i += 8
-    
-    while i < len(code) and code[i] in ' \t\n\r':
+    if i < n and values[i] == 'function':
         i += 1
     
     # Имя
     name = ""
-    while i < len(code) and (code[i].isalnum() or code[i] == '_'):
-        name += code[i]
-        i += 1
-    
-    while i < len(code) and code[i] in ' \t\n\r':
+    if i < n and ts.kinds[i] == WORD:
+        name = values[i]
         i += 1
     
     # Параметры
     params = []
-    if i < len(code) and code[i] == '(':
-        paren_end = find_matching_paren(code, i)
-        params_str = code[i + 1:paren_end].strip()
+    if i < n and values[i] == '(':
+        paren_end = ts.close(i, n)
+        params_str = ts.inner(i, paren_end)
         if params_str:
             params = [p.strip() for p in params_str.split(',')]
         i = paren_end + 1
     
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
-    
     # Тело
-    if i < len(code) and code[i] == '{':
-        body, end_i = extract_block(code, i)
-    else:
-        return i, None, None
+    if i < n and values[i] == '{':
+        return ts.close(i, n) + 1, name, is_async, params, i
+    return i, name, is_async, params, None
+
+
+def build_function(ts, name, is_async, params, body):
+    """Построить блок-схему функции; body - индекс открывающей скобки тела"""
+    brace_end = ts.close(body, len(ts))
     
     builder = JSFlowchartBuilder()
     prefix = 'async ' if is_async else ''
@@ -890,70 +524,50 @@ def parse_function(code, start):
         builder.add_edge(start_id, param_id)
         prev_ids = [param_id]
     
-    last_ids = parse_body(body, builder, prev_ids)
+    last_ids = run_steps(parse_body(ts, body + 1, brace_end, builder, prev_ids))
     
     end_id = builder.add_node('end', '')
     
     for lid in last_ids:
-        if lid is None:
-            continue
-        if isinstance(lid, tuple):
-            marker = lid[0]
-            node_id = lid[1]
-            if marker == 'return':
-                builder.add_edge(node_id, end_id)
-            elif marker == 'no_empty':
-                builder.add_edge(node_id, end_id, 'нет', 'no')
-            elif marker == 'from_no_branch':
-                builder.add_edge(node_id, end_id, '', 'from_no')
-            elif marker == 'loop_exit':
-                builder.add_edge(node_id, end_id, '', 'loop_exit')
-        else:
-            builder.add_edge(lid, end_id)
+        builder.connect(lid, end_id, returns=True)
     
-    return end_i, name, builder.get_flowchart_data()
+    return builder.get_flowchart_data()
 
 
-def parse_class(code, start):
-    """Парсить класс"""
-    i = start
-    
-    if is_keyword(code, i, 'class'):
-        i += 5
-    
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
+def scan_class(ts, start):
+    """Заголовок класса: (индекс после тела, имя, скобка тела или None)"""
+    values = ts.values
+    n = len(ts)
+    i = start + 1  # пропустить 'class'
     
     # Имя
     name = ""
-    while i < len(code) and (code[i].isalnum() or code[i] == '_'):
-        name += code[i]
+    if i < n and ts.kinds[i] == WORD:
+        name = values[i]
         i += 1
     
     # extends
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
-    if is_keyword(code, i, 'extends'):
-        i += 7
-        while i < len(code) and code[i] not in '{':
+    if i < n and values[i] == 'extends':
+        while i < n and values[i] != '{':
             i += 1
     
-    while i < len(code) and code[i] in ' \t\n\r':
-        i += 1
+    if i >= n or values[i] != '{':
+        return i, name, None
     
-    if i >= len(code) or code[i] != '{':
-        return i, None, None, []
-    
-    body, end_i = extract_block(code, i)
+    return ts.close(i, n) + 1, name, i
+
+
+def build_class(ts, name, body):
+    """Построить блок-схему класса: методы веером"""
+    brace_end = ts.close(body, len(ts))
     
     builder = JSFlowchartBuilder()
     class_id = builder.add_node('class_start', name)
     
     # Найти методы
     methods = []
-    method_pattern = r'(?:async\s+)?(\w+)\s*\([^)]*\)\s*\{'
     
-    for match in re.finditer(method_pattern, body):
+    for match in METHOD_RE.finditer(ts.code, ts.starts[body] + 1, ts.pos(brace_end)):
         method_name = match.group(1)
         if method_name not in ['if', 'for', 'while', 'switch']:
             methods.append(method_name)
@@ -963,73 +577,103 @@ def parse_class(code, start):
         method_id = builder.add_node('method', method_name + '()')
         builder.add_edge(class_id, method_id, '', f'fan_{idx}')
     
-    return end_i, name, builder.get_flowchart_data(), methods
+    return builder.get_flowchart_data()
 
 
-def parse_javascript(code):
-    """Главная функция парсинга JavaScript"""
-    code = remove_comments(code)
-    
-    functions = []
-    classes = []
+def iter_declarations(ts):
+    """Функции и классы верхнего уровня: (имя, тип, первый токен, токен после конца, построитель)"""
+    values = ts.values
+    n = len(ts)
     
     i = 0
-    while i < len(code):
-        while i < len(code) and code[i] in ' \t\n\r':
-            i += 1
-        
-        if i >= len(code):
-            break
-        
-        # async function
-        if is_keyword(code, i, 'async'):
-            j = i + 5
-            while j < len(code) and code[j] in ' \t\n\r':
-                j += 1
-            if is_keyword(code, j, 'function'):
-                end_i, name, flowchart = parse_function(code, i)
-                if name and flowchart:
-                    functions.append({
-                        'name': f'async {name}',
-                        'type': 'function',
-                        'flowchart': flowchart
-                    })
-                i = end_i
-                continue
-        
-        # function
-        if is_keyword(code, i, 'function'):
-            end_i, name, flowchart = parse_function(code, i)
-            if name and flowchart:
-                functions.append({
-                    'name': name,
-                    'type': 'function',
-                    'flowchart': flowchart
-                })
+    while i < n:
+        # function / async function
+        if values[i] == 'function' or (values[i] == 'async' and i + 1 < n and values[i + 1] == 'function'):
+            end_i, name, is_async, params, body = scan_function(ts, i)
+            if name and body is not None:
+                display_name = f'async {name}' if is_async else name
+                yield (display_name, 'function', i, end_i,
+                       partial(build_function, ts, name, is_async, params, body))
             i = end_i
             continue
         
         # class
-        if is_keyword(code, i, 'class'):
-            end_i, name, flowchart, methods = parse_class(code, i)
-            if name and flowchart:
-                classes.append({
-                    'name': name,
-                    'type': 'class',
-                    'flowchart': flowchart
-                })
+        if values[i] == 'class':
+            end_i, name, body = scan_class(ts, i)
+            if name and body is not None:
+                yield name, 'class', i, end_i, partial(build_class, ts, name, body)
             i = end_i
             continue
         
         i += 1
+
+
+def iter_javascript(code):
+    """Блок-схемы функций и классов по мере построения, в конце - код"""
+    with phase('tokenize'):
+        ts = tokenize(code)
+    
+    for name, entry_type, _, _, build in iter_declarations(ts):
+        with phase('build'):
+            flowchart = build()
+        yield {
+            'name': name,
+            'type': entry_type,
+            'flowchart': flowchart
+        }
+    
+    yield code_record(ts.code)
+
+
+def parse_javascript(code):
+    """Главная функция парсинга JavaScript"""
+    return collect_entries(iter_javascript(code))
+
+
+@lru_cache(maxsize=2)
+def load_javascript(code):
+    """Поток токенов документа - кэш процесса для повторных запросов одной схемы"""
+    return tokenize(code)
+
+
+def outline_javascript(code):
+    """Оглавление JavaScript-файла без построения блок-схем"""
+    ts = load_javascript(code)
+    lines = LineIndex(ts.code)
     
-    # Main код
-    main_flowchart = {'nodes': [], 'edges': []}
+    functions = []
+    classes = []
+    
+    for name, entry_type, first, end, _ in iter_declarations(ts):
+        lo = ts.pos(first)
+        hi = ts.pos(end - 1)
+        entry = outline_entry(name, entry_type, lines.line(lo), lines.line(hi),
+                              estimate_size(ts.code, lo, hi))
+        if entry_type == 'class':
+            classes.append(entry)
+        else:
+            functions.append(entry)
     
     return {
         'success': True,
-        'main_flowchart': main_flowchart,
+        'main': None,
         'functions': functions,
         'classes': classes,
-        'code': code
+        'code': ts.code
     }
+
+
+def build_javascript_flowchart(code, name):
+    """Блок-схема одного объявления по имени (None, если не найдено)"""
+    ts = load_javascript(code)
+    for decl_name, entry_type, _, _, build in iter_declarations(ts):
+        if decl_name == name:
+            return {'name': name, 'type': entry_type, 'flowchart': build()}
+    return None
+
+
+def index_javascript(code):
+    """Объявления с хэшем текста (без комментариев): (запись без схемы, хэш, построитель)"""
+    ts = load_javascript(code)
+    for name, entry_type, first, end, build in iter_declarations(ts):
+        yield {'name': name, 'type': entry_type}, declaration_digest(name, entry_type, ts.text(first, end)), build
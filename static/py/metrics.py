@@ -0,0 +1,229 @@
+"""
+Замеры фаз обработки запроса (Server-Timing) и метрики в формате Prometheus
+Выключенный замер - это пустой контекстный менеджер на фазу, без вызовов time
+"""
+import threading
+import time
+
+# Границы гистограмм: секунды, байты, число узлов
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+NODES_BUCKETS = (10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+
+class _Phase:
+    __slots__ = ('timer', 'name', 'start')
+    
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+    
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullPhase:
+    __slots__ = ()
+    
+    def __enter__(self):
+        pass
+    
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_PHASE = _NullPhase()
+
+
+class PhaseTimer:
+    """Длительности фаз одного запроса в секундах (повторный вход суммируется)"""
+    
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+    
+    def phase(self, name):
+        return _Phase(self, name)
+    
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+    
+    def merge(self, phases):
+        for name, seconds in phases.items():
+            self.add(name, seconds)
+    
+    def elapsed(self):
+        return time.perf_counter() - self.start
+    
+    def header(self):
+        """Значение заголовка Server-Timing (миллисекунды)"""
+        parts = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.phases.items()]
+        parts.append(f'total;dur={self.elapsed() * 1000:.2f}')
+        return ', '.join(parts)
+
+
+class NullTimer:
+    """Замер выключен: ничего не записывает"""
+    
+    phases = {}
+    
+    def phase(self, name):
+        return NULL_PHASE
+    
+    def add(self, name, seconds):
+        pass
+    
+    def merge(self, phases):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+# Замер внутри процесса-обработчика: включается через timed(), парсеры отмечают фазы phase()
+_active = None
+
+
+def phase(name):
+    """Фаза текущего задания (пустышка, если замер не включён)"""
+    timer = _active
+    return NULL_PHASE if timer is None else timer.phase(name)
+
+
+def timed(func, *args):
+    """Выполнить func(*args) с замером фаз: (результат, {фаза: секунды})"""
+    global _active
+    _active = timer = PhaseTimer()
+    try:
+        return func(*args), timer.phases
+    finally:
+        _active = None
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+    
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self.values = {}  # значения меток -> [счётчики по корзинам..., сумма, количество]
+        self.lock = threading.Lock()
+    
+    def observe(self, value, *label_values):
+        with self.lock:
+            series = self.values.get(label_values)
+            if series is None:
+                series = self.values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for label_values, series in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = _format_labels(self.labels, label_values, f'le="{bound}"')
+                    lines.append(f'{self.name}_bucket{le} {cumulative}')
+                le = _format_labels(self.labels, label_values, 'le="+Inf"')
+                lines.append(f'{self.name}_bucket{le} {series[-1]}')
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f'{self.name}_sum{labels} {series[-2]:.6f}')
+                lines.append(f'{self.name}_count{labels} {series[-1]}')
+        return lines
+
+
+class Gauges:
+    """Значения, снимаемые при каждом запросе /metrics: func() -> {имя: значение}"""
+    
+    def __init__(self, prefix, help_text, func):
+        self.prefix = prefix
+        self.help = help_text
+        self.func = func
+    
+    def render(self):
+        lines = []
+        for name, value in self.func().items():
+            lines.append(f'# HELP {self.prefix}_{name} {self.help}: {name}')
+            lines.append(f'# TYPE {self.prefix}_{name} gauge')
+            lines.append(f'{self.prefix}_{name} {value}')
+        return lines
+
+
+class Registry:
+    """Набор метрик для /metrics"""
+    
+    def __init__(self):
+        self.metrics = []
+    
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+    
+    def histogram(self, name, help_text, buckets, labels=()):
+        return self._add(Histogram(name, help_text, buckets, labels))
+    
+    def gauges(self, prefix, help_text, func):
+        return self._add(Gauges(prefix, help_text, func))
+    
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+    
+    def render(self):
+        """Текстовый формат экспозиции Prometheus"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def count_nodes(flowchart):
+    """Число узлов блок-схемы в обычном или компактном формате"""
+    nodes = flowchart.get('nodes')
+    return len(nodes) if nodes is not None else len(flowchart.get('t', ()))
+
+
+def result_nodes(result):
+    """Всего узлов во всех блок-схемах ответа /upload"""
+    total = 0
+    if 'main_flowchart' in result:
+        total += count_nodes(result['main_flowchart'])
+    for entry in result.get('functions', ()) + result.get('classes', ()):
+        if 'flowchart' in entry:
+            total += count_nodes(entry['flowchart'])
+    return total
@@ -0,0 +1,69 @@
+"""
+Оглавление документа: функции, методы и классы без построения блок-схем
+Общие помощники для outline- и потокового режимов всех парсеров
+"""
+from bisect import bisect_left
+
+# Имя основной блок-схемы (код вне функций) в оглавлении и в /flowchart
+MAIN_NAME = '__main__'
+
+
+class LineIndex:
+    """Перевод смещений в номера строк (с 1) за O(log n)"""
+    
+    def __init__(self, code):
+        newlines = []
+        pos = code.find('\n')
+        while pos != -1:
+            newlines.append(pos)
+            pos = code.find('\n', pos + 1)
+        self.newlines = newlines
+    
+    def line(self, offset):
+        return bisect_left(self.newlines, offset) + 1
+
+
+def outline_entry(name, entry_type, first_line, last_line, size):
+    """Запись оглавления: имя, тип, строки и оценка числа блоков схемы"""
+    return {
+        'name': name,
+        'type': entry_type,
+        'lines': [first_line, last_line],
+        'size': size
+    }
+
+
+def estimate_size(code, lo, hi):
+    """Грубая оценка числа блоков: операторы и вложенные блоки + начало и конец"""
+    return code.count(';', lo, hi) + code.count('{', lo, hi) + 2
+
+
+def code_record(code):
+    """Последняя запись потока: исходный код для показа"""
+    return {'type': 'code', 'code': code}
+
+
+def collect_entries(records):
+    """Собрать поток записей парсера в полный ответ /upload"""
+    main_flowchart = {'nodes': [], 'edges': []}
+    functions = []
+    classes = []
+    code = ''
+    
+    for record in records:
+        if record['type'] == 'code':
+            code = record['code']
+        elif record['type'] == 'main':
+            main_flowchart = record['flowchart']
+        elif record['type'] == 'class':
+            classes.append(record)
+        else:
+            functions.append(record)
+    
+    return {
+        'success': True,
+        'main_flowchart': main_flowchart,
+        'functions': functions,
+        'classes': classes,
+        'code': code
+    }
@@ -0,0 +1,632 @@
+"""
+Парсер Python для генерации блок-схем
+Блок-схемы строятся по AST из стандартного модуля ast
+"""
+import ast
+from functools import lru_cache, partial
+
+from .flowchart_graph import (NO_EMPTY, RETURN, TEXT_BUDGET, FlowchartGraph, clip_text, exit_kind, exit_marker,
+                              exit_node, is_return, run_steps)
+from .incremental import declaration_digest
+from .metrics import phase
+from .outline import MAIN_NAME, code_record, collect_entries, outline_entry
+
+
+class FlowchartBuilder(FlowchartGraph):
+    """Строитель блок-схем"""
+    
+    def build_function(self, node):
+        """Построить блок-схему функции"""
+        start_id = self.add_node('start', f'начало {node.name}()')
+        prev_ids = [start_id]
+        
+        if node.args.args:
+            params = ', '.join([arg.arg for arg in node.args.args])
+            param_id = self.add_node('input', f'Параметры: {params}')
+            self.add_edge(start_id, param_id)
+            prev_ids = [param_id]
+        
+        body = [stmt for stmt in node.body 
+                if not (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant))]
+        
+        last_ids = run_steps(self.process_body(body, prev_ids))
+        
+        end_id = self.add_node('end', '')
+        for lid in last_ids:
+            self.connect(lid, end_id, returns=True)  # return напрямую к end
+    
+    def build_class(self, node):
+        """Построить блок-схему класса - от полей веером к методам"""
+        class_id = self.add_node('class_start', node.name)
+        
+        fields = []
+        methods = []
+        
+        for item in node.body:
+            if isinstance(item, ast.FunctionDef):
+                methods.append(item.name)
+                if item.name == '__init__':
+                    for stmt in item.body:
+                        if isinstance(stmt, ast.Assign):
+                            for target in stmt.targets:
+                                if isinstance(target, ast.Attribute) and \
+                                   isinstance(target.value, ast.Name) and \
+                                   target.value.id == 'self':
+                                    fields.append(target.attr)
+            elif isinstance(item, ast.Assign):
+                for target in item.targets:
+                    if isinstance(target, ast.Name):
+                        fields.append(target.id)
+        
+        # Блок полей
+        if fields:
+            fields_text = ', '.join(fields)
+            fields_id = self.add_node('input', f'Поля: {fields_text}')
+            self.add_edge(class_id, fields_id)
+            source_id = fields_id
+        else:
+            source_id = class_id
+        
+        # Все методы соединены от полей ВЕЕРОМ (не линейно!)
+        for i, method_name in enumerate(methods):
+            method_id = self.add_node('method', method_name + '()')
+            # Каждый метод напрямую от source_id с указанием позиции
+            self.add_edge(source_id, method_id, '', f'fan_{i}')
+    
+    def process_body(self, statements, prev_ids):
+        """Обработать список операторов (шаг для run_steps, как и process_* ниже)"""
+        current_prev_ids = prev_ids
+        return_ids = []  # Собираем return маркеры
+        
+        for stmt in statements:
+            if isinstance(stmt, (ast.FunctionDef, ast.ClassDef)):
+                continue
+            
+            # Фильтруем return из текущих prev_ids
+            non_return_ids = [p for p in current_prev_ids if not is_return(p)]
+            new_return_ids = [p for p in current_prev_ids if is_return(p)]
+            return_ids.extend(new_return_ids)
+            
+            if non_return_ids:
+                new_prev_ids = yield self.process_statement(stmt, non_return_ids)
+                current_prev_ids = new_prev_ids
+            else:
+                # Все пути закончились return - не обрабатываем дальше
+                break
+        
+        # Возвращаем все return и текущие выходы
+        return current_prev_ids + return_ids
+    
+    def process_statement(self, stmt, prev_ids):
+        """Обработать один оператор"""
+        
+        # Вспомогательная функция для добавления рёбер с учётом маркеров
+        def add_edges_from_prev(target_id):
+            for pid in prev_ids:
+                self.connect(pid, target_id)
+        
+        if isinstance(stmt, ast.Assign):
+            targets = ', '.join([self.get_name(t) for t in stmt.targets])
+            value = self.get_expr_text(stmt.value)
+            node_id = self.add_node('process', f'{targets} = {value}')
+            add_edges_from_prev(node_id)
+            return [node_id]
+        
+        elif isinstance(stmt, ast.AugAssign):
+            target = self.get_name(stmt.target)
+            op = self.get_op(stmt.op)
+            value = self.get_expr_text(stmt.value)
+            node_id = self.add_node('process', f'{target} {op}= {value}')
+            add_edges_from_prev(node_id)
+            return [node_id]
+        
+        elif isinstance(stmt, ast.Expr):
+            if isinstance(stmt.value, ast.Call):
+                func_name = self.get_name(stmt.value.func)
+                
+                if func_name in ['print', 'output']:
+                    node_id = self.add_node('output', self.get_expr_text(stmt.value))
+                elif func_name == 'input':
+                    node_id = self.add_node('input', 'Ввод данных')
+                else:
+                    node_id = self.add_node('process', self.get_expr_text(stmt.value))
+                
+                add_edges_from_prev(node_id)
+                return [node_id]
+            return prev_ids
+        
+        elif isinstance(stmt, ast.If):
+            return (yield self.process_if(stmt, prev_ids))
+        
+        elif isinstance(stmt, ast.While):
+            return (yield self.process_while(stmt, prev_ids))
+        
+        elif isinstance(stmt, ast.For):
+            return (yield self.process_for(stmt, prev_ids))
+        
+        elif isinstance(stmt, ast.Try):
+            return (yield self.process_try(stmt, prev_ids))
+        
+        elif isinstance(stmt, ast.Return):
+            if stmt.value:
+                value = self.get_expr_text(stmt.value)
+                node_id = self.add_node('output', f'return {value}')
+            else:
+                node_id = self.add_node('output', 'return')
+            add_edges_from_prev(node_id)
+            return [exit_marker(RETURN, node_id)]
+        
+        elif isinstance(stmt, ast.Raise):
+            if stmt.exc:
+                exc_text = self.get_expr_text(stmt.exc)
+                node_id = self.add_node('process', f'raise {exc_text}')
+            else:
+                node_id = self.add_node('process', 'raise')
+            add_edges_from_prev(node_id)
+            return [None]
+        
+        elif isinstance(stmt, ast.Break):
+            node_id = self.add_node('process', 'break')
+            add_edges_from_prev(node_id)
+            return [None]
+        
+        elif isinstance(stmt, ast.Continue):
+            node_id = self.add_node('process', 'continue')
+            add_edges_from_prev(node_id)
+            return [None]
+        
+        elif isinstance(stmt, ast.Pass):
+            return prev_ids
+        
+        return prev_ids
+    
+    def process_if(self, stmt, prev_ids):
+        """IF - ромб, да вниз, нет вправо"""
+        condition = self.get_expr_text(stmt.test)
+        cond_id = self.add_node('condition', condition + '?')
+        
+        for pid in prev_ids:
+            self.connect(pid, cond_id)  # return не соединяется
+        
+        exit_ids = []
+        
+        # Ветка "да"
+        if stmt.body:
+            edge_idx = self.edge_count
+            yes_ids = yield self.owned(cond_id, self.process_body(stmt.body, [cond_id]))
+            
+            self.mark_first_edge(cond_id, edge_idx, 'да', 'yes')
+            
+            # Добавляем выходы из ветки "да"
+            exit_ids += [yid for yid in yes_ids if yid is not None]
+        
+        # Ветка "нет"
+        if stmt.orelse:
+            edge_idx = self.edge_count
+            
+            if len(stmt.orelse) == 1 and isinstance(stmt.orelse[0], ast.If):
+                no_ids = yield self.owned(cond_id, self.process_if(stmt.orelse[0], [cond_id]))
+            else:
+                no_ids = yield self.owned(cond_id, self.process_body(stmt.orelse, [cond_id]))
+            
+            self.mark_first_edge(cond_id, edge_idx, 'нет', 'no')
+            
+            # Когда есть else, выходы из ветки "нет" (и маркеры, и return) сливаются
+            # с выходами из "да" к следующему блоку
+            exit_ids += [nid for nid in no_ids if nid is not None]
+        else:
+            # Нет else - помечаем условие как имеющее "пустую" ветку нет
+            exit_ids.append(exit_marker(NO_EMPTY, cond_id))
+        
+        return exit_ids if exit_ids else [None]
+    
+    def process_while(self, stmt, prev_ids):
+        """WHILE - шестиугольник, обратная связь слева, выход справа"""
+        condition = self.get_expr_text(stmt.test)
+        # Тип loop - будет шестиугольник
+        loop_id = self.add_node('loop', condition)
+        
+        for pid in prev_ids:
+            self.connect(pid, loop_id)
+        
+        if stmt.body:
+            edge_idx = self.edge_count
+            body_ids = yield self.owned(loop_id, self.process_body(stmt.body, [loop_id]))
+            
+            # Вход в тело - "да" вниз
+            self.mark_first_edge(loop_id, edge_idx, '', 'loop_body')
+            
+            # Обратная связь от конца тела к циклу (слева)
+            for bid in body_ids:
+                # Маркеры - без метки, просто loop_back; return внутри цикла к циклу не возвращается
+                if bid is not None and exit_kind(bid) != RETURN:
+                    self.add_edge(exit_node(bid), loop_id, '', 'loop_back')
+        
+        # Выход из цикла будет справа от шестиугольника
+        return [loop_id]  # loop_id как точка выхода (справа)
+    
+    def process_for(self, stmt, prev_ids):
+        """FOR - шестиугольник"""
+        target = self.get_name(stmt.target)
+        iter_val = self.get_expr_text(stmt.iter)
+        
+        # Шестиугольник цикла
+        loop_id = self.add_node('loop', f'для {target} в {iter_val}')
+        
+        for pid in prev_ids:
+            self.connect(pid, loop_id)
+        
+        if stmt.body:
+            edge_idx = self.edge_count
+            body_ids = yield self.owned(loop_id, self.process_body(stmt.body, [loop_id]))
+            
+            self.mark_first_edge(loop_id, edge_idx, None, 'loop_body')
+            
+            for bid in body_ids:
+                # Маркеры - без метки, просто loop_back; return внутри цикла к циклу не возвращается
+                if bid is not None and exit_kind(bid) != RETURN:
+                    self.add_edge(exit_node(bid), loop_id, '', 'loop_back')
+        
+        return [loop_id]
+    
+    def process_try(self, stmt, prev_ids):
+        """TRY/EXCEPT"""
+        try_id = self.add_node('try_start', 'try')
+        
+        for pid in prev_ids:
+            self.connect(pid, try_id)
+        
+        exit_ids = []
+        
+        if stmt.body:
+            try_body_ids = yield self.owned(try_id, self.process_body(stmt.body, [try_id]))
+            exit_ids.extend(try_body_ids)
+        
+        for handler in stmt.handlers:
+            if handler.type:
+                exc_name = self.get_name(handler.type)
+                if handler.name:
+                    exc_text = f'except {exc_name} as {handler.name}'
+                else:
+                    exc_text = f'except {exc_name}'
+            else:
+                exc_text = 'except'
+            
+            except_id = self.add_node('except', exc_text, parent=try_id)
+            self.add_edge(try_id, except_id, 'ошибка', 'exception')
+            
+            if handler.body:
+                except_body_ids = yield self.owned(except_id, self.process_body(handler.body, [except_id]))
+                exit_ids.extend(except_body_ids)
+        
+        if stmt.finalbody:
+            finally_id = self.add_node('finally', 'finally', parent=try_id)
+            
+            # Собираем return маркеры отдельно
+            return_markers = []
+            for eid in exit_ids:
+                if eid is None:
+                    continue
+                # Все выходы идут в finally; маркеры return сохраняем
+                self.add_edge(exit_node(eid), finally_id)
+                if exit_kind(eid) == RETURN:
+                    return_markers.append(eid)
+            
+            finally_body_ids = yield self.owned(finally_id, self.process_body(stmt.finalbody, [finally_id]))
+            
+            # Если были return в try/except, они должны пройти через finally и потом к end
+            # Возвращаем выходы из finally + return маркеры
+            result = []
+            for fid in finally_body_ids:
+                if fid is not None:
+                    result.append(fid)
+            
+            # Добавляем return маркеры - они уже прошли через finally
+            result.extend(return_markers)
+            
+            return result if result else [None]
+        
+        exit_ids = [eid for eid in exit_ids if eid is not None]
+        return exit_ids if exit_ids else [None]
+    
+    def get_name(self, node):
+        return self.render_expr(node, True)
+    
+    def get_expr_text(self, node):
+        return self.render_expr(node, False)
+    
+    def render_expr(self, node, as_name):
+        """Текст выражения без рекурсии: стек итераторов по частям; обход останавливается,
+        как только набрано больше TEXT_BUDGET символов - огромный литерал дальше не разбирается"""
+        pieces = self.name_pieces(node) if as_name else self.expr_pieces(node)
+        if pieces.__class__ is str:
+            return clip_text(pieces)
+        
+        parts = []
+        length = 0
+        stack = [iter(pieces)]
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+                continue
+            if item.__class__ is tuple:
+                node, as_name = item
+                item = self.name_pieces(node) if as_name else self.expr_pieces(node)
+            if item.__class__ is str:
+                parts.append(item)
+                length += len(item)
+                if length > TEXT_BUDGET:
+                    break
+            else:
+                stack.append(iter(item))
+        return clip_text(''.join(parts))
+    
+    def name_pieces(self, node):
+        """Части имени в get_name: строки, (узел, как имя) и ленивые последовательности частей"""
+        if isinstance(node, ast.Name):
+            return node.id
+        elif isinstance(node, ast.Attribute):
+            return [(node.value, True), '.' + node.attr]
+        elif isinstance(node, ast.Subscript):
+            return [(node.value, True), '[', (node.slice, False), ']']
+        elif isinstance(node, ast.Tuple):
+            return self.joined(node.elts, ', ', True)
+        return 'var'
+    
+    def expr_pieces(self, node):
+        """Части текста выражения: строки, (узел, как имя) для дочерних узлов и ленивые
+        последовательности частей (элементы длинного списка создаются, только пока нужны)"""
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, str):
+                s = node.value
+                if len(s) > 20:
+                    s = s[:17] + '...'
+                return f'"{s}"'
+            return str(node.value)
+        elif isinstance(node, ast.Name):
+            return node.id
+        elif isinstance(node, ast.BinOp):
+            return [(node.left, False), f' {self.get_op(node.op)} ', (node.right, False)]
+        elif isinstance(node, ast.UnaryOp):
+            return [self.get_unary_op(node.op), (node.operand, False)]
+        elif isinstance(node, ast.Compare):
+            parts = [(node.left, False)]
+            for op, comp in zip(node.ops, node.comparators):
+                parts += [f' {self.get_op(op)} ', (comp, False)]
+            return parts
+        elif isinstance(node, ast.BoolOp):
+            op = ' and ' if isinstance(node.op, ast.And) else ' or '
+            return self.joined(node.values, op)
+        elif isinstance(node, ast.Call):
+            return [(node.func, True), '(', self.joined(node.args, ', '), ')']
+        elif isinstance(node, ast.List):
+            return ['[', self.joined(node.elts, ', '), ']']
+        elif isinstance(node, ast.Tuple):
+            return ['(', self.joined(node.elts, ', '), ')']
+        elif isinstance(node, ast.Dict):
+            return ['{', self.dict_items(node), '}']
+        elif isinstance(node, ast.Subscript):
+            return [(node.value, False), '[', (node.slice, False), ']']
+        elif isinstance(node, ast.Attribute):
+            return [(node.value, False), '.' + node.attr]
+        elif isinstance(node, ast.IfExp):
+            return [(node.body, False), ' if ', (node.test, False), ' else ', (node.orelse, False)]
+        elif isinstance(node, ast.ListComp):
+            return '[...]'
+        elif isinstance(node, ast.Slice):
+            parts = [(node.lower, False)] if node.lower else []
+            parts.append(':')
+            if node.upper:
+                parts.append((node.upper, False))
+            return parts
+        elif isinstance(node, ast.JoinedStr):
+            # f-string - собираем части; обрезка нужна целиком, поэтому отдельный вызов
+            parts = []
+            for val in node.values:
+                if isinstance(val, ast.Constant):
+                    parts.append(str(val.value))
+                elif isinstance(val, ast.FormattedValue):
+                    parts.append('{' + self.get_expr_text(val.value) + '}')
+                else:
+                    parts.append(self.get_expr_text(val))
+            result = ''.join(parts)
+            if len(result) > 25:
+                result = result[:22] + '...'
+            return f'f"{result}"'
+        return 'expr'
+    
+    def joined(self, nodes, sep, as_name=False):
+        """Узлы через разделитель - части для render_expr (генератор)"""
+        for i, node in enumerate(nodes):
+            if i:
+                yield sep
+            yield node, as_name
+    
+    def dict_items(self, node):
+        """Пары словаря 'ключ: значение' через запятую (генератор; **распаковка пропускается)"""
+        first = True
+        for k, v in zip(node.keys, node.values):
+            if k is not None:
+                if not first:
+                    yield ', '
+                first = False
+                yield from ((k, False), ': ', (v, False))
+    
+    def get_op(self, op):
+        ops = {
+            ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/',
+            ast.Mod: '%', ast.Pow: '**', ast.FloorDiv: '//',
+            ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=',
+            ast.Gt: '>', ast.GtE: '>=', 
+            ast.And: 'and', ast.Or: 'or',
+            ast.In: 'in', ast.NotIn: 'not in',
+            ast.Is: 'is', ast.IsNot: 'is not',
+        }
+        return ops.get(type(op), '?')
+    
+    def get_unary_op(self, op):
+        ops = {
+            ast.Not: 'not ',
+            ast.UAdd: '+',
+            ast.USub: '-',
+        }
+        return ops.get(type(op), '?')
+
+
+def ast_structure(*nodes):
+    """Структура AST строкой для хэша объявления - как ast.dump, но без рекурсии"""
+    parts = []
+    stack = list(reversed(nodes))
+    push = stack.extend
+    while stack:
+        item = stack.pop()
+        if isinstance(item, ast.AST):
+            parts.append(item.__class__.__name__)
+            push([getattr(item, field, None) for field in reversed(item._fields)])
+        elif item.__class__ is list:
+            # Длина списка - чтобы разные вложенности не давали одну строку
+            parts.append(f'[{len(item)}')
+            push(item[::-1])
+        else:
+            parts.append(repr(item))
+    return ' '.join(parts)
+
+
+def iter_declarations(tree):
+    """Функции, классы и методы верхнего уровня: (имя, тип, узел AST)"""
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef):
+            yield node.name, 'function', node
+        elif isinstance(node, ast.ClassDef):
+            yield node.name, 'class', node
+            for item in node.body:
+                if isinstance(item, ast.FunctionDef):
+                    yield f'{node.name}.{item.name}', 'method', item
+
+
+def main_statements(tree):
+    """Код вне функций и классов"""
+    return [stmt for stmt in tree.body 
+            if not isinstance(stmt, (ast.FunctionDef, ast.ClassDef))]
+
+
+def build_declaration(entry_type, node):
+    """Блок-схема функции, метода или класса"""
+    builder = FlowchartBuilder()
+    if entry_type == 'class':
+        builder.build_class(node)
+    else:
+        builder.build_function(node)
+    return builder.get_flowchart_data()
+
+
+def build_main(main_body):
+    """Блок-схема кода вне функций"""
+    main_builder = FlowchartBuilder()
+    start_id = main_builder.add_node('start', 'начало main()')
+    last_ids = run_steps(main_builder.process_body(main_body, [start_id]))
+    end_id = main_builder.add_node('end', '')
+    for lid in last_ids:
+        main_builder.connect(lid, end_id, returns=True)
+    return main_builder.get_flowchart_data()
+
+
+def iter_python(code):
+    """Блок-схемы по мере построения: функции и классы по порядку, затем main и код"""
+    with phase('parse'):
+        tree = ast.parse(code)  # SyntaxError обрабатывает вызывающий код
+    
+    for name, entry_type, node in iter_declarations(tree):
+        with phase('build'):
+            flowchart = build_declaration(entry_type, node)
+        yield {
+            'name': name,
+            'type': entry_type,
+            'flowchart': flowchart
+        }
+    
+    main_body = main_statements(tree)
+    if main_body:
+        with phase('build'):
+            flowchart = build_main(main_body)
+        yield {'name': MAIN_NAME, 'type': 'main', 'flowchart': flowchart}
+    
+    yield code_record(code)
+
+
+def parse_python(code):
+    """Парсинг Python кода"""
+    return collect_entries(iter_python(code))
+
+
+@lru_cache(maxsize=2)
+def load_python(code):
+    """AST документа - кэш процесса для повторных запросов одной схемы"""
+    return ast.parse(code)
+
+
+def statement_count(nodes):
+    """Число операторов во вложенных узлах - оценка размера схемы"""
+    return sum(isinstance(n, ast.stmt) for node in nodes for n in ast.walk(node))
+
+
+def outline_python(code):
+    """Оглавление Python-файла без построения блок-схем"""
+    tree = load_python(code)
+    
+    functions = []
+    classes = []
+    
+    for name, entry_type, node in iter_declarations(tree):
+        if entry_type == 'class':
+            # Схема класса - поля и методы веером
+            size = len(node.body) + 1
+            classes.append(outline_entry(name, entry_type, node.lineno, node.end_lineno, size))
+        else:
+            size = statement_count(node.body) + 2
+            functions.append(outline_entry(name, entry_type, node.lineno, node.end_lineno, size))
+    
+    main = None
+    main_body = main_statements(tree)
+    if main_body:
+        main = outline_entry(MAIN_NAME, 'main', main_body[0].lineno, main_body[-1].end_lineno,
+                             statement_count(main_body) + 2)
+    
+    return {
+        'success': True,
+        'main': main,
+        'functions': functions,
+        'classes': classes,
+        'code': code
+    }
+
+
+def build_python_flowchart(code, name):
+    """Блок-схема одного объявления по полному имени (None, если не найдено)"""
+    tree = load_python(code)
+    
+    if name == MAIN_NAME:
+        main_body = main_statements(tree)
+        if not main_body:
+            return None
+        return {'name': name, 'type': 'main', 'flowchart': build_main(main_body)}
+    
+    for decl_name, entry_type, node in iter_declarations(tree):
+        if decl_name == name:
+            return {'name': name, 'type': entry_type, 'flowchart': build_declaration(entry_type, node)}
+    return None
+
+
+def index_python(code):
+    """Объявления со структурным хэшем AST: (запись без схемы, хэш, построитель)"""
+    tree = load_python(code)
+    
+    for name, entry_type, node in iter_declarations(tree):
+        digest = declaration_digest(name, entry_type, ast_structure(node))
+        yield {'name': name, 'type': entry_type}, digest, partial(build_declaration, entry_type, node)
+    
+    main_body = main_statements(tree)
+    if main_body:
+        digest = declaration_digest(MAIN_NAME, 'main', ast_structure(*main_body))
+        yield {'name': MAIN_NAME, 'type': 'main'}, digest, partial(build_main, main_body)
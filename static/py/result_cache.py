@@ -0,0 +1,75 @@
+"""
+Кэш готовых ответов /upload
+Ключ - хэш содержимого файла, LRU-вытеснение по суммарному размеру
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """LRU-кэш сериализованных ответов с ограничением по байтам"""
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(data, ext, version):
+        """Ключ по содержимому: исходные байты + расширение + версия парсера"""
+        h = hashlib.sha256()
+        h.update(f'{version}\0{ext}\0'.encode('utf-8'))
+        h.update(data)
+        return h.hexdigest()
+    
+    def get(self, key):
+        """Получить ответ из кэша (None при промахе)"""
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key, value):
+        """Сохранить ответ, вытесняя самые старые записи"""
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= len(old)
+            
+            self.entries[key] = value
+            self.total_bytes += size
+            
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+                self.evictions += 1
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+    
+    def stats(self):
+        """Счётчики кэша"""
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,569 @@
+"""
+Серверная отрисовка блок-схем в SVG - порт FlowchartRenderer и FlowchartLayout
+(static/js/flowchart-renderer.js, static/js/flowchart-layout.js)
+Раскладка, маршруты связей и фигуры те же, что в браузере; SVG пишется строками в буфер, без DOM
+При изменении раскладки в JS менять и здесь
+"""
+from html import escape
+
+from .wire_format import decode_flowchart
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+
+# Цвета линий по типам веток
+LINE_COLORS = {
+    'yes': '#16a34a',        # зелёный - ветка "да"
+    'no': '#dc2626',         # красный - ветка "нет"
+    'loop_back': '#9333ea',  # фиолетовый - обратная связь цикла
+    'loop_exit': '#f59e0b',  # оранжевый - выход из цикла
+    'from_no': '#dc2626',    # красный - продолжение ветки "нет"
+    'exception': '#ef4444',  # красный - исключение
+}
+
+# Фигура (<symbol> в <defs>) по типу узла; остальные типы - прямоугольник
+NODE_SHAPES = {
+    'start': 'start',
+    'class_start': 'start',
+    'end': 'end',
+    'method': 'terminator',
+    'input': 'parallelogram',
+    'output': 'parallelogram',
+    'condition': 'diamond',
+    'loop': 'hexagon',
+    'try_start': 'dashed',
+    'except': 'dashed',
+    'finally': 'dashed',
+}
+
+
+def _num(value):
+    """Число как в JS: 350, а не 350.0"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class SvgRenderer:
+    """Раскладка и отрисовка одной блок-схемы"""
+    
+    def __init__(self):
+        # Размеры
+        self.node_width = 180
+        self.node_height = 40
+        self.condition_size = 45
+        self.hex_width = 180
+        self.hex_height = 40
+        self.vertical_gap = 70
+        self.horizontal_gap = 200
+        self.padding = 80
+        self.loop_left_offset = 50
+        self.arrow_gap = 25
+        
+        # Цвета
+        self.fill = '#dbeafe'
+        self.stroke = '#2563eb'
+        self.text_color = '#1e293b'
+    
+    def render(self, flowchart):
+        """Готовый SVG-документ (с белым фоном, как при скачивании из браузера)"""
+        flowchart = decode_flowchart(flowchart)
+        nodes = flowchart.get('nodes') if flowchart else None
+        if not nodes:
+            return (f'<svg xmlns="{SVG_NS}" width="400" height="200" viewBox="0 0 400 200">'
+                    '<rect width="100%" height="100%" fill="white"/>'
+                    f'<text x="200" y="100" text-anchor="middle" font-family="Arial, sans-serif" font-size="14" '
+                    f'fill="{self.text_color}">Нет данных</text></svg>')
+        
+        edges = flowchart['edges']
+        
+        self.positions = {}
+        self.edge_offsets = {}
+        self.nodes = {}
+        for node in nodes:
+            self.nodes.setdefault(node['id'], node)
+        self.build_graph(nodes, edges)
+        
+        if any(n['type'] == 'class_start' for n in nodes):
+            self.calculate_class_positions(nodes)
+        else:
+            self.calculate_positions(nodes)
+        
+        width, height = self.get_bounds()
+        
+        # Связи пишутся раньше узлов; маркеры стрелок и фигуры узлов собираются по пути
+        # и выводятся в <defs>, общие атрибуты - на группах
+        self.markers = {}
+        self.used_shapes = {}
+        out = ['<g fill="none" stroke-width="2">']
+        for edge in edges:
+            self.draw_edge(out, edge)
+        out.append(f'</g><g text-anchor="middle" font-family="Arial, sans-serif" font-size="11" '
+                   f'fill="{self.text_color}">')
+        for node in nodes:
+            self.draw_node(out, node)
+        out.append('</g>')
+        
+        head = [
+            f'<svg xmlns="{SVG_NS}" width="{_num(width)}" height="{_num(height)}" '
+            f'viewBox="0 0 {_num(width)} {_num(height)}">',
+            '<rect width="100%" height="100%" fill="white"/>',
+            '<defs>',
+        ]
+        for marker_id, color in self.markers.items():
+            head.append(f'<marker id="{marker_id}" viewBox="0 0 10 10" refX="9" refY="5" markerWidth="6" '
+                        f'markerHeight="6" orient="auto-start-reverse"><path d="M 0 0 L 10 5 L 0 10 z" '
+                        f'fill="{color}"/></marker>')
+        for shape in self.used_shapes:
+            head.append(f'<symbol id="shape-{shape}" overflow="visible">{self.create_shape(shape)}</symbol>')
+        head.append('</defs>')
+        return ''.join(head) + ''.join(out) + '</svg>'
+    
+    def build_graph(self, nodes, edges):
+        self.children = {n['id']: [] for n in nodes}
+        for e in edges:
+            children = self.children.get(e['from'])
+            if children is not None:
+                children.append(e)
+    
+    def calculate_class_positions(self, nodes):
+        class_node = next((n for n in nodes if n['type'] == 'class_start'), None)
+        fields_node = next((n for n in nodes if n['type'] == 'input'), None)
+        method_nodes = [n for n in nodes if n['type'] == 'method']
+        
+        center_x = 300
+        y = self.padding
+        
+        if class_node:
+            self.positions[class_node['id']] = [center_x, y]
+            y += self.node_height + self.vertical_gap
+        
+        if fields_node:
+            self.positions[fields_node['id']] = [center_x, y]
+            y += self.node_height + self.vertical_gap
+        
+        if method_nodes:
+            total_width = (len(method_nodes) - 1) * (self.node_width + 30)
+            start_x = center_x - total_width / 2
+            for i, method in enumerate(method_nodes):
+                self.positions[method['id']] = [start_x + i * (self.node_width + 30), y]
+    
+    def calculate_positions(self, nodes):
+        start_node = next((n for n in nodes if n['type'] == 'start'), nodes[0])
+        end_node = next((n for n in nodes if n['type'] == 'end'), None)
+        end_id = end_node['id'] if end_node else None
+        center_x = 350
+        
+        # Позиционируем все узлы кроме end
+        max_y = self.position_tree(start_node['id'], center_x, self.padding, end_id)
+        
+        # End всегда в самом низу по центру
+        if end_node and end_id not in self.positions:
+            self.positions[end_id] = [center_x, max_y + self.vertical_gap + self.node_height]
+    
+    def position_tree(self, node_id, x, y, end_id):
+        """positionNode из JS без рекурсии: стек генераторов вместо стека вызовов"""
+        stack = [self.position_node(node_id, x, y, end_id)]
+        value = None
+        while stack:
+            try:
+                child = stack[-1].send(value)
+            except StopIteration as stop:
+                stack.pop()
+                value = stop.value
+                continue
+            stack.append(self.position_node(*child, end_id))
+            value = None
+        return value
+    
+    def position_node(self, node_id, x, y, end_id):
+        """Генератор: выдаёт (ребёнок, x, y) и получает нижнюю Y его поддерева"""
+        # Пропускаем end - он будет позиционирован отдельно
+        if node_id == end_id:
+            return y
+        
+        if node_id in self.positions:
+            return self.positions[node_id][1] or y
+        
+        node = self.nodes.get(node_id)
+        if node is None:
+            return y
+        
+        self.positions[node_id] = [x, y]
+        positioned = self.positions
+        
+        forward = [c for c in self.children.get(node_id, ()) if c['branch'] != 'loop_back' and c['to'] != end_id]
+        
+        max_y = y
+        node_h = self.get_node_full_height(node)
+        
+        # Условие (if)
+        if node['type'] == 'condition':
+            yes_child = next((c for c in forward if c['branch'] == 'yes'), None)
+            no_child = next((c for c in forward if c['branch'] == 'no'), None)
+            other_children = [c for c in forward if c['branch'] not in ('yes', 'no')]
+            
+            # Ветка "да" - вниз
+            if yes_child and yes_child['to'] not in positioned:
+                yes_y = yield yes_child['to'], x, y + self.vertical_gap + node_h
+                max_y = max(max_y, yes_y)
+            
+            # Ветка "нет" - вправо
+            if no_child and no_child['to'] not in positioned:
+                no_x = x + self.horizontal_gap + self.node_width / 2
+                no_y = yield no_child['to'], no_x, y
+                max_y = max(max_y, no_y)
+            
+            for child in other_children:
+                if child['to'] not in positioned:
+                    exit_y = yield child['to'], x, max_y + self.vertical_gap + self.node_height
+                    max_y = max(max_y, exit_y)
+            
+            return max_y
+        
+        # Цикл (loop)
+        if node['type'] == 'loop':
+            body_child = next((c for c in forward if c['branch'] == 'loop_body'), None)
+            exit_children = [c for c in forward if c['branch'] != 'loop_body']
+            
+            if body_child and body_child['to'] not in positioned:
+                body_y = yield body_child['to'], x, y + self.vertical_gap + node_h
+                max_y = max(max_y, body_y)
+            
+            for child in exit_children:
+                if child['to'] not in positioned:
+                    exit_y = yield child['to'], x, max_y + self.vertical_gap + self.node_height
+                    max_y = max(max_y, exit_y)
+            
+            return max_y
+        
+        # Обычный узел
+        next_y = y + self.vertical_gap + node_h
+        for child in forward:
+            if child['to'] not in positioned:
+                child_y = yield child['to'], x, next_y
+                max_y = max(max_y, child_y)
+                next_y = max_y + self.vertical_gap + self.node_height
+        
+        return max(y, max_y)
+    
+    def get_node_full_height(self, node):
+        if node['type'] == 'condition':
+            return self.condition_size * 2
+        if node['type'] == 'loop':
+            return self.hex_height
+        if node['type'] == 'end':
+            return 30
+        return self.node_height
+    
+    def get_bounds(self):
+        """Сдвинуть схему к отступам; (ширина, высота) холста"""
+        if not self.positions:
+            return 600, 400
+        
+        half = self.node_width / 2
+        min_x = min(x for x, _ in self.positions.values()) - half - self.loop_left_offset
+        max_x = max(x for x, _ in self.positions.values()) + half + self.horizontal_gap
+        min_y = min(y for _, y in self.positions.values()) - self.node_height - 30
+        max_y = max(y for _, y in self.positions.values()) + self.node_height + 30
+        
+        offset_x = self.padding - min_x
+        offset_y = self.padding - min_y
+        for pos in self.positions.values():
+            pos[0] += offset_x
+            pos[1] += offset_y
+        
+        return max(500, (max_x - min_x) + self.padding * 2), max(300, (max_y - min_y) + self.padding * 2)
+    
+    # Отрисовка узлов
+    
+    def draw_node(self, out, node):
+        """Узел - ссылка <use> на фигуру из <defs> и подпись"""
+        pos = self.positions.get(node['id'])
+        if pos is None:
+            return
+        x, y = pos
+        shape = NODE_SHAPES.get(node['type'], 'rectangle')
+        self.used_shapes[shape] = True
+        out.append(f'<use href="#shape-{shape}" x="{_num(x)}" y="{_num(y)}"/>')
+        
+        if shape != 'end':
+            self.create_text(out, x, y, node['text'], self.get_text_width(node['type']))
+    
+    def get_text_width(self, node_type):
+        if node_type == 'condition':
+            return self.condition_size * 1.6
+        if node_type == 'loop':
+            return self.hex_width - 50
+        return 160
+    
+    def create_shape(self, shape):
+        """Фигура узла с центром в (0, 0) - содержимое <symbol>"""
+        style = f'fill="{self.fill}" stroke="{self.stroke}" stroke-width="2"'
+        w = self.node_width / 2
+        h = self.node_height / 2
+        rect = f'x="{_num(-w)}" y="{_num(-h)}" width="{self.node_width}" height="{self.node_height}"'
+        
+        if shape == 'start':
+            return f'<circle cx="0" cy="{_num(-h - 15)}" r="8" fill="{self.stroke}"/>' + self.create_shape('terminator')
+        if shape == 'terminator':
+            return f'<rect {rect} rx="{_num(h)}" {style}/>'
+        if shape == 'end':
+            size = 15
+            return (f'<polygon points="0,{-size} {size},0 0,{size} {-size},0" fill="white" '
+                    f'stroke="{self.stroke}" stroke-width="2"/><circle cx="0" cy="0" r="6" fill="{self.stroke}"/>')
+        if shape == 'parallelogram':
+            skew = 15
+            return self._polygon([(-w + skew, -h), (w + skew, -h), (w - skew, h), (-w - skew, h)], style)
+        if shape == 'diamond':
+            size = self.condition_size
+            return self._polygon([(0, -size), (size, 0), (0, size), (-size, 0)], style)
+        if shape == 'hexagon':
+            hw = self.hex_width / 2
+            hh = self.hex_height / 2
+            cut = 20
+            return self._polygon([(-hw + cut, -hh), (hw - cut, -hh), (hw, 0), (hw - cut, hh), (-hw + cut, hh), (-hw, 0)],
+                                 style)
+        if shape == 'dashed':
+            return f'<rect {rect} {style} stroke-dasharray="5,3"/>'
+        return f'<rect {rect} {style}/>'
+    
+    def _polygon(self, points, style):
+        return f'<polygon points="{" ".join(f"{_num(px)},{_num(py)}" for px, py in points)}" {style}/>'
+    
+    # Отрисовка связей
+    
+    def draw_edge(self, out, edge):
+        from_pos = self.positions.get(edge['from'])
+        to_pos = self.positions.get(edge['to'])
+        if from_pos is None or to_pos is None:
+            return
+        
+        from_node = self.nodes.get(edge['from'])
+        to_node = self.nodes.get(edge['to'])
+        
+        path = self.calculate_path(from_pos, to_pos, from_node, to_node, edge)
+        color = LINE_COLORS.get(edge['branch'], self.stroke)
+        
+        # Свой маркер для каждого цвета
+        marker_id = f'arrow-{color[1:]}'
+        self.markers.setdefault(marker_id, color)
+        out.append(f'<path d="{path}" stroke="{color}" marker-end="url(#{marker_id})"/>')
+        
+        if edge['label']:
+            self.draw_edge_label(out, from_pos, edge, color)
+    
+    def get_edge_offset(self, to_id, branch):
+        """Смещение линии к узлу, чтобы множественные линии не накладывались"""
+        key = (to_id, branch or 'default')
+        offset = self.edge_offsets.get(key, 0)
+        self.edge_offsets[key] = offset + 8
+        return offset
+    
+    def calculate_path(self, frm, to, from_node, to_node, edge):
+        branch = edge['branch'] or ''
+        
+        from_bottom = self.get_bottom_point(frm, from_node)
+        from_right = self.get_right_point(frm, from_node)
+        from_left = self.get_left_point(frm, from_node)
+        to_top = self.get_top_point(to, to_node)
+        to_left = self.get_left_point(to, to_node)
+        
+        def path(*points):
+            return 'M ' + ' L '.join(f'{_num(px)} {_num(py)}' for px, py in points)
+        
+        # Веер от полей класса к методам
+        if branch.startswith('fan_'):
+            x1, y1 = frm[0], from_bottom[1]
+            x2, y2 = to[0], to_top[1]
+            mid_y = y1 + (y2 - y1) / 3
+            return path((x1, y1), (x1, mid_y), (x2, mid_y), (x2, y2))
+        
+        # Обратная связь цикла - слева от блока к циклу выше
+        if branch == 'loop_back':
+            x1, y1 = from_left
+            x2, y2 = to_left
+            loop_x = min(x1, x2) - self.loop_left_offset
+            return path((x1, y1), (loop_x, y1), (loop_x, y2), (x2, y2))
+        
+        # Тело цикла - вниз
+        if branch == 'loop_body':
+            x1, y1 = from_bottom
+            x2, y2 = to_top
+            if abs(x1 - x2) < 5:
+                return path((x1, y1), (x2, y2))
+            mid_y = y1 + self.arrow_gap
+            return path((x1, y1), (x1, mid_y), (x2, mid_y), (x2, y2))
+        
+        # Выход из цикла - справа и потом вниз к центру следующего блока
+        if branch == 'loop_exit' or (from_node and from_node['type'] == 'loop' and not branch):
+            x1, y1 = from_right
+            x2, y2 = to_top
+            if y2 > y1:
+                right_x = frm[0] + self.horizontal_gap
+                approach_y = y2 - self.arrow_gap
+                return path((x1, y1), (right_x, y1), (right_x, approach_y), (x2, approach_y), (x2, y2))
+            return path((x1, y1), (x2, y1), (x2, y2))
+        
+        # "да" от условия - вниз или вверх (для do-while)
+        if branch == 'yes':
+            x1, y1 = from_bottom
+            x2, y2 = to_top
+            
+            # Цель выше источника (do-while) - обход слева
+            if to[1] < frm[1]:
+                left_x1 = from_left[0]
+                left_x2 = to_left[0]
+                loop_x = min(left_x1, left_x2) - self.loop_left_offset
+                return path((left_x1, frm[1]), (loop_x, frm[1]), (loop_x, to[1]), (left_x2, to[1]))
+            
+            if abs(x1 - x2) < 5:
+                return path((x1, y1), (x2, y2))
+            mid_y = y1 + self.arrow_gap
+            return path((x1, y1), (x1, mid_y), (x2, mid_y), (x2, y2))
+        
+        # "нет" от условия - вправо к следующему блоку
+        if branch == 'no':
+            x1, y1 = from_right
+            x2, y2 = to_top
+            
+            if to[0] > frm[0]:
+                # Цель на том же уровне или близко - просто горизонталь
+                if abs(y1 - to[1]) < self.vertical_gap:
+                    return path((x1, y1), to_left)
+                # Цель ниже справа - вправо, вниз, к цели
+                if to[1] > frm[1]:
+                    mid_x = (x1 + to_left[0]) / 2
+                    return path((x1, y1), (mid_x, y1), (mid_x, to_left[1]), to_left)
+            
+            # Цель ниже слева - обходим справа
+            right_x = max(frm[0], to[0]) + self.horizontal_gap
+            approach_y = y2 - self.arrow_gap
+            return path((x1, y1), (right_x, y1), (right_x, approach_y), (x2, approach_y), (x2, y2))
+        
+        # Выход из ветки "нет" к следующему блоку - обходим справа
+        if branch == 'from_no':
+            x1, y1 = from_right
+            x2, y2 = to_top
+            offset = self.get_edge_offset(edge['to'], 'from_no')
+            bypass_x = max(frm[0] + self.horizontal_gap + offset, x2 + self.node_width / 2 + self.arrow_gap + offset)
+            approach_y = y2 - self.arrow_gap - offset
+            return path((x1, y1), (bypass_x, y1), (bypass_x, approach_y), (x2, approach_y), (x2, y2))
+        
+        # Исключение
+        if branch == 'exception':
+            x1, y1 = frm[0] + self.node_width / 2, frm[1]
+            x2, y2 = to_top
+            mid_x = x1 + self.arrow_gap
+            top_y = y2 - self.arrow_gap
+            return path((x1, y1), (mid_x, y1), (mid_x, top_y), (x2, top_y), (x2, y2))
+        
+        # Связь к end - всегда вниз к центру end
+        if to_node and to_node['type'] == 'end':
+            x1, y1 = from_bottom
+            x2, y2 = to[0], to_top[1]
+            if y2 <= y1:
+                return path((x1, y1), (x2, y2))
+            approach_y = y2 - self.arrow_gap
+            if abs(frm[0] - to[0]) > 30:
+                return path((x1, y1), (x1, approach_y), (x2, approach_y), (x2, y2))
+            return path((x1, y1), (x2, y2))
+        
+        # Обычная связь - вниз с вертикальным входом сверху
+        x1, y1 = from_bottom
+        x2, y2 = to_top
+        if abs(x1 - x2) < 5:
+            return path((x1, y1), (x2, y2))
+        mid_y = y1 + self.arrow_gap
+        return path((x1, y1), (x1, mid_y), (x2, mid_y), (x2, y2))
+    
+    # Точки выхода/входа для разных типов узлов
+    
+    def get_bottom_point(self, pos, node):
+        node_type = node['type'] if node else None
+        if node_type == 'condition':
+            return pos[0], pos[1] + self.condition_size
+        if node_type == 'loop':
+            return pos[0], pos[1] + self.hex_height / 2
+        if node_type == 'end':
+            return pos[0], pos[1] + 15
+        return pos[0], pos[1] + self.node_height / 2
+    
+    def get_top_point(self, pos, node):
+        node_type = node['type'] if node else None
+        if node_type == 'condition':
+            return pos[0], pos[1] - self.condition_size
+        if node_type == 'loop':
+            return pos[0], pos[1] - self.hex_height / 2
+        if node_type == 'end':
+            return pos[0], pos[1] - 15
+        return pos[0], pos[1] - self.node_height / 2
+    
+    def get_right_point(self, pos, node):
+        node_type = node['type'] if node else None
+        if node_type == 'condition':
+            return pos[0] + self.condition_size, pos[1]
+        if node_type == 'loop':
+            return pos[0] + self.hex_width / 2, pos[1]
+        return pos[0] + self.node_width / 2, pos[1]
+    
+    def get_left_point(self, pos, node):
+        node_type = node['type'] if node else None
+        if node_type == 'condition':
+            return pos[0] - self.condition_size, pos[1]
+        if node_type == 'loop':
+            return pos[0] - self.hex_width / 2, pos[1]
+        return pos[0] - self.node_width / 2, pos[1]
+    
+    def draw_edge_label(self, out, frm, edge, color):
+        branch = edge['branch']
+        if branch == 'yes':
+            x, y = frm[0] - 20, frm[1] + self.condition_size + 18
+        elif branch == 'no':
+            x, y = frm[0] + self.condition_size + 8, frm[1] - 8
+        elif branch == 'exception':
+            x, y = frm[0] + self.node_width / 2 + 8, frm[1] - 8
+        else:
+            return
+        
+        out.append(f'<text x="{_num(x)}" y="{_num(y)}" font-family="Arial, sans-serif" font-size="12" '
+                   f'font-weight="bold" fill="{color or self.text_color}">{escape(edge["label"], False)}</text>')
+    
+    def create_text(self, out, x, y, text, max_width=160):
+        """Подпись узла: перенос по словам, не больше трёх строк (как createText в JS); шрифт - у группы"""
+        if not text:
+            return
+        
+        lines = []
+        current = ''
+        for word in text.split(' '):
+            test = current + ' ' + word if current else word
+            if len(test) * 6.5 > max_width and current:
+                lines.append(current)
+                current = word
+            else:
+                current = test
+        if current:
+            lines.append(current)
+        if not lines:
+            return
+        
+        if len(lines) > 3:
+            del lines[3:]
+            lines[2] = lines[2][:max(0, len(lines[2]) - 3)] + '...'
+        
+        opening = f'<text x="{_num(x)}" y="{_num(y)}" dominant-baseline="middle">'
+        if len(lines) == 1:
+            out.append(opening + escape(text[:25] + '...' if len(text) > 28 else text, False) + '</text>')
+            return
+        
+        line_height = 13
+        start_y = y - ((len(lines) - 1) * line_height) / 2
+        out.append(opening)
+        for i, line in enumerate(lines):
+            line = line[:21] + '...' if len(line) > 24 else line
+            out.append(f'<tspan x="{_num(x)}" y="{_num(start_y + i * line_height)}">{escape(line, False)}</tspan>')
+        out.append('</text>')
+
+def render_svg(flowchart):
+    """SVG-документ блок-схемы (обычный или компактный формат)"""
+    return SvgRenderer().render(flowchart)
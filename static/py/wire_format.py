@@ -0,0 +1,103 @@
+"""
+Компактный формат блок-схем: столбцы вместо объектов, типы узлов и ветки - номерами
+Декодеры - decode_flowchart ниже и FlowchartLayout.decode в static/js/flowchart-layout.js
+(таблицы должны совпадать)
+"""
+
+# Порядок менять нельзя - это номера в формате
+NODE_TYPES = ('start', 'end', 'process', 'condition', 'loop', 'input', 'output',
+              'method', 'class_start', 'try_start', 'except', 'finally')
+BRANCHES = ('', 'yes', 'no', 'from_no', 'loop_back', 'loop_body', 'loop_exit', 'exception')
+FAN_PREFIX = 'fan_'  # fan_N кодируется как len(BRANCHES) + N
+
+_NODE_TYPE_CODES = {name: code for code, name in enumerate(NODE_TYPES)}
+_BRANCH_CODES = {name: code for code, name in enumerate(BRANCHES)}
+
+
+def _branch_code(branch):
+    code = _BRANCH_CODES.get(branch)
+    if code is not None:
+        return code
+    if branch.startswith(FAN_PREFIX):
+        return len(BRANCHES) + int(branch[len(FAN_PREFIX):])
+    raise ValueError(f'Неизвестная ветка: {branch}')
+
+
+def encode_flowchart(flowchart):
+    """Блок-схема по столбцам: id узла = его индекс, рёбра - разностями"""
+    # t - типы узлов, x - тексты, p - id минус id владельца (0 - верхний уровень);
+    # f - from минус from предыдущего ребра, d - to минус from, b - ветки, l - номера подписей в таблице L
+    labels = {'': 0}
+    from_deltas = []
+    to_deltas = []
+    branches = []
+    label_codes = []
+    
+    prev_from = 0
+    for edge in flowchart['edges']:
+        from_id = edge['from']
+        from_deltas.append(from_id - prev_from)
+        to_deltas.append(edge['to'] - from_id)
+        prev_from = from_id
+        branches.append(_branch_code(edge['branch']))
+        label_codes.append(labels.setdefault(edge['label'], len(labels)))
+    
+    nodes = flowchart['nodes']
+    return {
+        't': [_NODE_TYPE_CODES[node['type']] for node in nodes],
+        'x': [node['text'] for node in nodes],
+        'p': [node['id'] - node['parent'] if 'parent' in node else 0 for node in nodes],
+        'f': from_deltas,
+        'd': to_deltas,
+        'b': branches,
+        'l': label_codes,
+        'L': list(labels)
+    }
+
+
+def decode_flowchart(flowchart):
+    """Обратное к encode_flowchart; схема в обычном формате возвращается как есть"""
+    if 't' not in flowchart:
+        return flowchart
+    
+    nodes = [{'id': i, 'type': NODE_TYPES[t], 'text': text}
+             for i, (t, text) in enumerate(zip(flowchart['t'], flowchart['x']))]
+    for node, delta in zip(nodes, flowchart.get('p', ())):
+        if delta:
+            node['parent'] = node['id'] - delta
+    edges = []
+    from_id = 0
+    for delta, to_delta, branch, label in zip(flowchart['f'], flowchart['d'], flowchart['b'], flowchart['l']):
+        from_id += delta
+        edges.append({
+            'from': from_id,
+            'to': from_id + to_delta,
+            'label': flowchart['L'][label],
+            'branch': BRANCHES[branch] if branch < len(BRANCHES) else f'{FAN_PREFIX}{branch - len(BRANCHES)}'
+        })
+    return {'nodes': nodes, 'edges': edges}
+
+
+def encode_record(record, compact=False, code=True):
+    """Запись с блок-схемой или с кодом в выбранном варианте (None - запись не нужна)"""
+    if record['type'] == 'code':
+        return record if code else None
+    if compact and 'flowchart' in record:
+        record = dict(record, flowchart=encode_flowchart(record['flowchart']))
+    return record
+
+
+def encode_result(result, compact=False, code=True):
+    """Полный ответ /upload (или оглавление): компактные схемы и/или без эха кода"""
+    if not compact and code:
+        return result
+    
+    result = dict(result)
+    if not code:
+        result.pop('code', None)
+    if compact:
+        if 'main_flowchart' in result:
+            result['main_flowchart'] = encode_flowchart(result['main_flowchart'])
+        for key in ('functions', 'classes'):
+            result[key] = [encode_record(entry, compact) for entry in result[key]]
+    return result
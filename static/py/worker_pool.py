@@ -0,0 +1,247 @@
+"""
+Пул изолированных процессов-обработчиков для разбора файлов
+Каждое задание ограничено по времени и памяти (RSS); процесс, превысивший лимит,
+убивается и заменяется новым в фоне - остальные задания не ждут
+"""
+import atexit
+import importlib
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_INTERVAL = 0.02   # как часто проверять RSS во время задания, с
+READY_TIMEOUT = 60     # сколько ждать запуска нового процесса, с
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+class WorkerError(Exception):
+    """Задание не выполнено из-за лимита или падения процесса"""
+    
+    status = 500
+    message = 'Ошибка обработчика'
+    
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+        if message:
+            self.message = message
+
+
+class JobTimeout(WorkerError):
+    status = 504
+    message = 'Превышено время разбора'
+
+
+class PoolBusy(WorkerError):
+    status = 503
+    message = 'Все обработчики заняты, повторите запрос позже'
+
+
+class JobMemoryError(WorkerError):
+    status = 422
+    message = 'Превышен лимит памяти при разборе'
+
+
+class WorkerCrashed(WorkerError):
+    status = 422
+    message = 'Не удалось разобрать файл: обработчик аварийно завершился'
+
+
+def _rss_bytes(pid):
+    """Resident set size процесса (None, если /proc недоступен)"""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _worker_main(conn, preload):
+    """Цикл процесса-обработчика: получить (функция, аргументы, поток?) - вернуть результат"""
+    for name in preload:
+        importlib.import_module(name)
+    conn.send(('ready', None))
+    
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+        
+        func, args, stream = job
+        try:
+            if stream:
+                # Генератор: каждый элемент отправляется сразу, как готов
+                for item in func(*args):
+                    conn.send(('item', item))
+                reply = ('ok', None)
+            else:
+                reply = ('ok', func(*args))
+        except Exception as e:
+            reply = ('error', e)
+        
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Результат или исключение не сериализуется
+            conn.send(('error', RuntimeError(f'{type(e).__name__}: {e}')))
+
+
+class Worker:
+    """Процесс-обработчик и его конец канала"""
+    
+    def __init__(self, context, preload):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, preload), daemon=True)
+        self.process.start()
+        child_conn.close()
+    
+    def wait_ready(self, timeout):
+        """Дождаться, пока процесс импортирует модули"""
+        try:
+            return self.conn.poll(timeout) and self.conn.recv()[0] == 'ready'
+        except (EOFError, OSError):
+            return False
+    
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(1)
+        except (OSError, ValueError):
+            pass
+        self.conn.close()
+
+
+class WorkerPool:
+    """Пул заранее запущенных процессов с лимитами на каждое задание"""
+    
+    def __init__(self, size, timeout, max_rss=None, preload=(), start_method='spawn', acquire_timeout=None):
+        self.size = size
+        self.timeout = timeout
+        # Ожидание свободного процесса - не время задания: оно считается с момента отправки
+        self.acquire_timeout = acquire_timeout  # None - ждать сколько угодно
+        self.max_rss = max_rss
+        self.preload = tuple(preload)
+        self.context = multiprocessing.get_context(start_method)
+        self.idle = queue.Queue()
+        self.closed = False
+        # Потоки-диспетчеры для submit(): каждый ведёт одно задание в одном процессе
+        self.dispatcher = ThreadPoolExecutor(max_workers=size, thread_name_prefix='worker-pool')
+        
+        for _ in range(size):
+            self._spawn()
+        atexit.register(self.shutdown)
+    
+    def _spawn(self):
+        """Запустить новый процесс в фоне; в очередь он попадёт после импорта модулей"""
+        threading.Thread(target=self._start_worker, daemon=True).start()
+    
+    def _start_worker(self):
+        while not self.closed:
+            worker = Worker(self.context, self.preload)
+            if worker.wait_ready(READY_TIMEOUT):
+                self.idle.put(worker)
+                return
+            worker.kill()
+            time.sleep(1)
+    
+    def _replace(self, worker):
+        worker.kill()
+        if not self.closed:
+            self._spawn()
+    
+    def run(self, func, *args):
+        """Выполнить func(*args) в процессе пула и вернуть результат"""
+        # Исключения func пробрасываются как есть, лимиты и падения - как WorkerError
+        worker = self._acquire()
+        try:
+            deadline = self._send(worker, func, args, False)
+            status, value = self._receive(worker, deadline)
+        except BaseException:
+            self._replace(worker)
+            raise
+        return self._release(worker, status, value)
+    
+    def stream(self, func, *args):
+        """Выполнить генератор func(*args) в процессе пула, выдавая элементы по мере готовности"""
+        # Лимит времени - на весь генератор; если потребитель бросил поток, процесс заменяется
+        worker = self._acquire()
+        try:
+            deadline = self._send(worker, func, args, True)
+            while True:
+                status, value = self._receive(worker, deadline)
+                if status != 'item':
+                    break
+                yield value
+        except BaseException:
+            self._replace(worker)
+            raise
+        self._release(worker, status, value)
+    
+    def submit(self, func, *args):
+        """То же, что run, но без ожидания: concurrent.futures.Future"""
+        return self.dispatcher.submit(self.run, func, *args)
+    
+    def _acquire(self):
+        try:
+            return self.idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise PoolBusy()
+    
+    def _release(self, worker, status, value):
+        """Вернуть процесс в очередь и пробросить результат или исключение задания"""
+        if isinstance(value, MemoryError):
+            # После MemoryError состояние процесса ненадёжно
+            self._replace(worker)
+            raise JobMemoryError()
+        
+        self.idle.put(worker)
+        if status == 'error':
+            raise value
+        return value
+    
+    def _send(self, worker, func, args, stream):
+        """Отправить задание; возвращает срок, к которому оно должно завершиться"""
+        try:
+            worker.conn.send((func, args, stream))
+        except (OSError, EOFError):
+            raise WorkerCrashed()
+        return time.monotonic() + self.timeout
+    
+    def _receive(self, worker, deadline):
+        """Ждать следующего сообщения процесса, следя за временем и памятью"""
+        pid = worker.process.pid
+        
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise JobTimeout()
+            
+            if worker.conn.poll(min(POLL_INTERVAL, remaining)):
+                try:
+                    return worker.conn.recv()
+                except (EOFError, OSError):
+                    raise WorkerCrashed()
+            
+            if self.max_rss:
+                rss = _rss_bytes(pid)
+                if rss is not None and rss > self.max_rss:
+                    raise JobMemoryError()
+    
+    def shutdown(self):
+        """Остановить все процессы пула"""
+        if self.closed:
+            return
+        self.closed = True
+        self.dispatcher.shutdown(wait=False, cancel_futures=True)
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.kill()